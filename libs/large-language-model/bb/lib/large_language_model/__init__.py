@@ -1 +1,71 @@
-from bb.lib.large_language_model.llm import LLMMistral
+from bb.lib.large_language_model.cache import LLMCache
+from bb.lib.large_language_model.coalescing import SINGLE_FLIGHT, SingleFlight
+from bb.lib.large_language_model.event_loop import (
+    LLM_EVENT_LOOP,
+    EventLoopThread,
+    run_sync,
+)
+from bb.lib.large_language_model.factory import get_llm
+from bb.lib.large_language_model.llm import LLM, Completion, LLMMistral
+from bb.lib.large_language_model.metrics import (
+    LLM_METRICS,
+    CallRecord,
+    LLMMetrics,
+)
+from bb.lib.large_language_model.rate_limiter import RateLimiter
+from bb.lib.large_language_model.registry import (
+    CLIENT_REGISTRY,
+    ClientRegistry,
+)
+from bb.lib.large_language_model.replay import (
+    LatencyModel,
+    LLMReplay,
+    RateLimitError,
+)
+from bb.lib.large_language_model.retry import (
+    BATCH_RETRY_POLICY,
+    INTERACTIVE_RETRY_POLICY,
+    DeadlineExceededError,
+    RetryPolicy,
+)
+from bb.lib.large_language_model.scheduler import (
+    BACKGROUND,
+    INTERACTIVE,
+    LLM_SCHEDULER,
+    PRIORITIES,
+    LLMScheduler,
+)
+from bb.lib.large_language_model.stream import AsyncTextStream, TextStream
+
+__all__ = [
+    "AsyncTextStream",
+    "BACKGROUND",
+    "BATCH_RETRY_POLICY",
+    "CallRecord",
+    "CLIENT_REGISTRY",
+    "ClientRegistry",
+    "Completion",
+    "DeadlineExceededError",
+    "EventLoopThread",
+    "INTERACTIVE",
+    "INTERACTIVE_RETRY_POLICY",
+    "LatencyModel",
+    "LLM",
+    "LLM_EVENT_LOOP",
+    "LLM_METRICS",
+    "LLM_SCHEDULER",
+    "LLMCache",
+    "LLMMetrics",
+    "LLMMistral",
+    "LLMReplay",
+    "LLMScheduler",
+    "PRIORITIES",
+    "RateLimiter",
+    "RateLimitError",
+    "RetryPolicy",
+    "SINGLE_FLIGHT",
+    "SingleFlight",
+    "TextStream",
+    "get_llm",
+    "run_sync",
+]
@@ -0,0 +1,241 @@
+"""On-disk cache for LLM responses.
+
+This module provides a persistent, prompt-keyed cache for LLM completions.
+Entries are stored in a SQLite database so that the cache survives restarts
+and can be shared between processes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+
+class LLMCache:
+    """Persistent LLM response cache with TTL and LRU eviction.
+
+    Entries are keyed on the model, the prompt and the sampling parameters.
+    When the cache grows above `max_entries` or `max_bytes`, the least
+    recently used entries are evicted. Entries older than `ttl` seconds are
+    considered expired.
+
+    Attributes
+    ----------
+    hits (int): Number of lookups served from the cache.
+    misses (int): Number of lookups not found in the cache.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int | None = 10000,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+    ):
+        """Initialize the cache.
+
+        Parameters
+        ----------
+        path : str | Path
+            Path of the SQLite database file.
+        max_entries : int | None
+            Maximum number of entries kept, None for no limit.
+        max_bytes : int | None
+            Maximum total size of the cached responses in bytes, None for
+            no limit.
+        ttl : float | None
+            Time to live of an entry in seconds, None for no expiration.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, "
+                "response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: dict | None = None) -> str:
+        """Build the cache key of a request.
+
+        Parameters
+        ----------
+        model : str
+            The model identifier
+        prompt : str
+            The input prompt text
+        params : dict | None
+            The sampling parameters of the request
+
+        Returns
+        -------
+        str: The hexadecimal digest identifying the request
+        """
+        payload = json.dumps(
+            {"model": model, "prompt": prompt, "params": params or {}},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Get a cached response.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, see `make_key`
+
+        Returns
+        -------
+        str | None: The cached response or None if missing or expired
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and self._is_expired(row[1], now):
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key = ?", (key,)
+                )
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str):
+        """Store a response and evict entries above the configured limits.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, see `make_key`
+        response : str
+            The response to cache
+        """
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            self._evict(now)
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Get the cache statistics.
+
+        Returns
+        -------
+        dict: The hits, misses, number of entries and total size in bytes
+        """
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "bytes": size,
+            }
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones over limits.
+
+        Must be called with the lock held, inside a transaction.
+        """
+        if self.ttl is not None:
+            self._connection.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (now - self.ttl,),
+            )
+        if self.max_entries is not None:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        if self.max_bytes is not None:
+            (total,) = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return
+            rows = self._connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+            )
+            to_delete = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                to_delete.append((key,))
+                total -= size
+            self._connection.executemany(
+                "DELETE FROM responses WHERE key = ?", to_delete
+            )
+
+
+@lru_cache(maxsize=None)
+def get_default_cache() -> LLMCache | None:
+    """Get the response cache at `BONBON_LLM_CACHE`, shared in the process.
+
+    The limits are read from `BONBON_LLM_CACHE_SIZE` (10000 entries by
+    default) and `BONBON_LLM_CACHE_TTL` (seconds, no expiration by default).
+
+    Returns
+    -------
+    LLMCache | None: The response cache, None if `BONBON_LLM_CACHE` is not
+        set.
+    """
+    path = os.getenv("BONBON_LLM_CACHE")
+    if not path:
+        return None
+    ttl = os.getenv("BONBON_LLM_CACHE_TTL")
+    return LLMCache(
+        path,
+        max_entries=int(os.getenv("BONBON_LLM_CACHE_SIZE", "10000")),
+        ttl=float(ttl) if ttl else None,
+    )
@@ -0,0 +1,123 @@
+"""Single-flight coalescing of identical in-flight LLM requests.
+
+When a request is already in flight, later identical requests wait for its
+result instead of being sent again. This saves the cost and the rate limit
+budget of the duplicates, and they finish as soon as the first one does.
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable
+
+
+class _InFlightCall:
+    """Result of a synchronous call shared with the waiting callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls sharing the same key.
+
+    Synchronous calls are coalesced across threads, asynchronous calls are
+    coalesced within their event loop.
+    """
+
+    def __init__(self):
+        """Initialize without any call in flight."""
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = weakref.WeakKeyDictionary()
+
+    def do(
+        self, key: str, fn: Callable[..., Any], *args
+    ) -> tuple[Any, bool]:
+        """Call `fn`, or wait for the identical call already in flight.
+
+        Parameters
+        ----------
+        key : str
+            The key identifying identical calls.
+        fn : Callable[..., Any]
+            The function to call.
+        *args
+            The arguments of the function.
+
+        Returns
+        -------
+        tuple[Any, bool]: The result, and whether it was shared from
+            another call
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _InFlightCall()
+                    self._calls[key] = call
+            if leader:
+                break
+            call.done.wait()
+            if call.error is None:
+                return call.result, True
+            if isinstance(call.error, Exception):
+                raise call.error
+            # The leader was interrupted (KeyboardInterrupt, ...), not the
+            # call, a follower takes the call over
+        try:
+            call.result = fn(*args)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def ado(
+        self, key: str, fn: Callable[..., Awaitable[Any]], *args
+    ) -> tuple[Any, bool]:
+        """Await `fn`, or wait for the identical call already in flight.
+
+        See `do`. When the task running the call is cancelled, the first
+        waiting task makes the call again for the others.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.setdefault(loop, {})
+        while key in calls:
+            future = calls[key]
+            try:
+                # A cancelled follower must not cancel the shared call
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled, not the call, a follower takes
+                # the call over
+        future = loop.create_future()
+        calls[key] = future
+        try:
+            result = await fn(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # Mark the error as retrieved when no caller was waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del calls[key]
+        return result, False
+
+
+# Shared by all the LLM instances of the process
+SINGLE_FLIGHT = SingleFlight()
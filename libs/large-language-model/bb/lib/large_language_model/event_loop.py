@@ -0,0 +1,85 @@
+"""Process-wide event loop of the synchronous wrappers.
+
+Async HTTP connections are bound to the event loop that opened them. The
+synchronous wrappers of the async API (`LLM.generate_many`, ...) run their
+coroutines on one long-lived event loop, in a daemon thread, instead of a new
+loop per call, so that the pooled async clients of the `ClientRegistry` and
+their keep-alive connections are reused from one call to the next.
+"""
+
+import asyncio
+import threading
+from typing import Any, Coroutine
+
+
+class EventLoopThread:
+    """Event loop running forever in a daemon thread, started on first use."""
+
+    def __init__(self, name: str = "llm-event-loop"):
+        """Initialize the event loop thread, without starting it.
+
+        Parameters
+        ----------
+        name : str
+            Name of the thread running the loop.
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the event loop, started in its thread on the first call.
+
+        Returns
+        -------
+        asyncio.AbstractEventLoop: The running event loop
+        """
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name=self.name, daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def run(self, coroutine: Coroutine[Any, Any, Any]) -> Any:
+        """Run a coroutine on the event loop and wait for its result.
+
+        Parameters
+        ----------
+        coroutine : Coroutine[Any, Any, Any]
+            The coroutine to run.
+
+        Returns
+        -------
+        The result of the coroutine
+
+        Raises
+        ------
+        RuntimeError: If called from the event loop thread, which would
+            wait for itself.
+        """
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError(
+                "Invalid synchronous call from the LLM event loop thread"
+            )
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.get_loop())
+        try:
+            return future.result()
+        except BaseException:
+            # The caller gave up, e.g. on KeyboardInterrupt
+            future.cancel()
+            raise
+
+
+# Shared by all the synchronous wrappers of the process
+LLM_EVENT_LOOP = EventLoopThread()
+
+
+def run_sync(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine on `LLM_EVENT_LOOP`, see `EventLoopThread.run`."""
+    return LLM_EVENT_LOOP.run(coroutine)
@@ -0,0 +1,71 @@
+"""Configuration based selection of the LLM backend.
+
+The backend is selected with the `BONBON_LLM` environment variable, so that
+the libraries and services can run against the record/replay backend
+without code changes:
+- `BONBON_LLM`: "LLMMistral" (default) or "LLMReplay"
+- `BONBON_LLM_RECORDING`: path of the LLMReplay recording file
+- `BONBON_LLM_REPLAY_MODE`: "replay" (default) or "record"
+- `BONBON_LLM_REPLAY_LATENCY`: latency spec, e.g. "lognormal:-0.5,0.4",
+  see `LatencyModel.from_spec`
+- `BONBON_LLM_REPLAY_ERROR_RATE`: probability of a simulated 429 error
+- `BONBON_LLM_CACHE`: path of the response cache shared by the LLMs that
+  do not pass their own `cache`, see `get_default_cache`
+"""
+
+import os
+
+from bb.lib.large_language_model.cache import get_default_cache
+from bb.lib.large_language_model.llm import LLM, LLMMistral
+from bb.lib.large_language_model.metrics import LLMMetrics
+from bb.lib.large_language_model.replay import LatencyModel, LLMReplay
+from bb.lib.large_language_model.scheduler import BACKGROUND
+
+
+def get_llm(model_name: str | None = None, **kwargs) -> LLM:
+    """Create the configured LLM backend.
+
+    Parameters
+    ----------
+    model_name : str | None
+        "LLMMistral" or "LLMReplay", read from `BONBON_LLM` if None.
+    **kwargs
+        Forwarded to the LLM constructor (cache, rate_limiter, ...). Without
+        `cache`, the cache at `BONBON_LLM_CACHE` is used if set, pass
+        `cache=None` to disable it.
+
+    Returns
+    -------
+    LLM: The LLM instance
+    """
+    if model_name is None:
+        model_name = os.getenv("BONBON_LLM", "LLMMistral")
+    if "cache" not in kwargs:
+        kwargs["cache"] = get_default_cache()
+    if model_name == "LLMMistral":
+        return LLMMistral(**kwargs)
+    elif model_name == "LLMReplay":
+        mode = os.getenv("BONBON_LLM_REPLAY_MODE", "replay")
+        # Replayed responses already follow the format they were recorded with
+        response_format = kwargs.pop("response_format", None)
+        return LLMReplay(
+            path=os.getenv("BONBON_LLM_RECORDING", "llm_recording.jsonl"),
+            mode=mode,
+            # The recorded calls are measured by the LLMReplay itself
+            llm=(
+                LLMMistral(
+                    metrics=LLMMetrics(),
+                    priority=kwargs.get("priority", BACKGROUND),
+                    response_format=response_format,
+                )
+                if mode == "record"
+                else None
+            ),
+            latency=LatencyModel.from_spec(
+                os.getenv("BONBON_LLM_REPLAY_LATENCY", "recorded")
+            ),
+            error_rate=float(os.getenv("BONBON_LLM_REPLAY_ERROR_RATE", "0")),
+            **kwargs,
+        )
+    else:
+        raise ValueError(f"Invalid model name: {model_name}")
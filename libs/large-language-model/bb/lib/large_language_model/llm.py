@@ -1,19 +1,143 @@
+import asyncio
 import os
+import time
+import weakref
+from functools import partial
+from typing import AsyncIterator, Callable, Iterator
 
-from mistralai import Mistral
-from tenacity import retry, stop_after_attempt, wait_fixed
+from bb.lib.large_language_model.cache import LLMCache
+from bb.lib.large_language_model.coalescing import SINGLE_FLIGHT, SingleFlight
+from bb.lib.large_language_model.event_loop import run_sync
+from bb.lib.large_language_model.metrics import (
+    LLM_METRICS,
+    CallRecord,
+    LLMMetrics,
+)
+from bb.lib.large_language_model.rate_limiter import RateLimiter
+from bb.lib.large_language_model.registry import (
+    CLIENT_REGISTRY,
+    ClientRegistry,
+)
+from bb.lib.large_language_model.retry import (
+    DeadlineExceededError,
+    RetryPolicy,
+)
+from bb.lib.large_language_model.scheduler import (
+    BACKGROUND,
+    LLM_SCHEDULER,
+    LLMScheduler,
+)
+from bb.lib.large_language_model.stream import AsyncTextStream, TextStream
+
+
+class Completion(str):
+    """Generated text carrying the token usage reported by the provider.
+
+    Providers may return a `Completion` instead of a plain string, so that
+    the usage is recorded in the call metrics.
+
+    Attributes
+    ----------
+    prompt_tokens (int | None): Number of prompt tokens.
+    completion_tokens (int | None): Number of completion tokens.
+    """
+
+    def __new__(
+        cls,
+        text: str,
+        prompt_tokens: int | None = None,
+        completion_tokens: int | None = None,
+    ):
+        completion = super().__new__(cls, text)
+        completion.prompt_tokens = prompt_tokens
+        completion.completion_tokens = completion_tokens
+        return completion
+
+
+def _get_remaining(deadline: float | None) -> float | None:
+    """Get the time left before a monotonic deadline, None without deadline.
+
+    Raises
+    ------
+    DeadlineExceededError: If the deadline passed while waiting for a slot
+        or for the rate limit.
+    """
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError(
+            "LLM call exceeded its deadline waiting for a slot"
+        )
+    return remaining
 
 
 class LLM:
     """Base class for Large Language Models.
 
     This abstract class defines the interface for different LLM
-    implementations.
+    implementations. Subclasses implement `_generate_text` (and optionally
+    `_agenerate_text`), the public methods add the optional response cache,
+    the coalescing of identical in-flight requests, the priority scheduler,
+    rate limiter, the retry policy and the call metrics on top of them.
     """
 
-    def __init__(self):
-        """Initialize the LLM base class."""
-        pass
+    def __init__(
+        self,
+        cache: LLMCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy | None = None,
+        caller: str = "unknown",
+        metrics: LLMMetrics | None = None,
+        coalesce: bool = True,
+        single_flight: SingleFlight | None = None,
+        priority: str = BACKGROUND,
+        scheduler: LLMScheduler | None = None,
+    ):
+        """Initialize the LLM base class.
+
+        Parameters
+        ----------
+        cache : LLMCache | None
+            Optional on-disk response cache, disabled by default.
+        rate_limiter : RateLimiter | None
+            Optional rate limiter applied to every provider call. It can be
+            shared between several LLM instances.
+        retry_policy : RetryPolicy | None
+            Retry policy of the provider calls, 3 attempts with exponential
+            backoff by default. See `INTERACTIVE_RETRY_POLICY` and
+            `BATCH_RETRY_POLICY` for presets.
+        caller : str
+            Tag of the component using the LLM, e.g. "Asker", used to
+            attribute the calls in the metrics.
+        metrics : LLMMetrics | None
+            Collector of the call metrics, the process-wide `LLM_METRICS`
+            by default.
+        coalesce : bool
+            Whether identical requests in flight at the same time share a
+            single provider call. Disable it when the prompts intentionally
+            expect diverse outputs.
+        single_flight : SingleFlight | None
+            Registry of the requests in flight, the process-wide
+            `SINGLE_FLIGHT` by default so that all the LLM instances
+            coalesce together.
+        priority : str
+            Scheduling priority class of the calls, "interactive" for the
+            calls a child is waiting on, "background" otherwise.
+        scheduler : LLMScheduler | None
+            Scheduler admitting the provider calls, the process-wide
+            `LLM_SCHEDULER` by default so that interactive calls preempt
+            the queued background work of every LLM instance.
+        """
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.caller = caller
+        self.metrics = metrics or LLM_METRICS
+        self.coalesce = coalesce
+        self.single_flight = single_flight or SINGLE_FLIGHT
+        self.priority = priority
+        self.scheduler = scheduler or LLM_SCHEDULER
 
     def get_api_key(self) -> str:
         """Get the API key for the LLM service.
@@ -33,13 +157,245 @@ class LLM:
         """
         raise NotImplementedError("Subclasses must implement this method")
 
-    def generate_text(self, prompt: str) -> str:
+    def get_sampling_params(self) -> dict:
+        """Get the sampling parameters sent with every request.
+
+        Returns
+        -------
+        dict: The sampling parameters, empty for the provider defaults
+        """
+        return {}
+
+    def generate_text(
+        self, prompt: str, use_cache: bool = True, coalesce: bool | None = None
+    ) -> str:
         """Generate text response for the given prompt.
 
         Parameters
         ----------
         prompt : str
             The input prompt text
+        use_cache : bool
+            Whether to look the prompt up in the cache. When False, a fresh
+            response is generated and replaces the cached one.
+        coalesce : bool | None
+            Whether to share the result of an identical request already in
+            flight, the `coalesce` attribute if None.
+
+        Returns
+        -------
+        str: The generated response text
+        """
+        record = self._start_call()
+        error = None
+        try:
+            key = self._get_cache_key(prompt)
+            if key is not None and use_cache:
+                response = self.cache.get(key)
+                if response is not None:
+                    record.cached = True
+                    return response
+            if self.coalesce if coalesce is None else coalesce:
+                response, record.coalesced = self.single_flight.do(
+                    self._get_request_key(prompt),
+                    self._call_provider,
+                    prompt,
+                    record,
+                )
+            else:
+                response = self._call_provider(prompt, record)
+            if key is not None:
+                self.cache.set(key, response)
+            return response
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            self.metrics.record(record.finish(error=error))
+
+    async def agenerate_text(
+        self, prompt: str, use_cache: bool = True, coalesce: bool | None = None
+    ) -> str:
+        """Generate text response for the given prompt asynchronously.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        use_cache : bool
+            Whether to look the prompt up in the cache, see `generate_text`.
+        coalesce : bool | None
+            Whether to share the result of an identical request already in
+            flight, see `generate_text`.
+
+        Returns
+        -------
+        str: The generated response text
+        """
+        record = self._start_call()
+        error = None
+        try:
+            key = self._get_cache_key(prompt)
+            if key is not None and use_cache:
+                response = self.cache.get(key)
+                if response is not None:
+                    record.cached = True
+                    return response
+            if self.coalesce if coalesce is None else coalesce:
+                response, record.coalesced = await self.single_flight.ado(
+                    self._get_request_key(prompt),
+                    self._acall_provider,
+                    prompt,
+                    record,
+                )
+            else:
+                response = await self._acall_provider(prompt, record)
+            if key is not None:
+                self.cache.set(key, response)
+            return response
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            self.metrics.record(record.finish(error=error))
+
+    def generate_many(
+        self,
+        prompts: list[str],
+        use_cache: bool = True,
+        callback: Callable[[int, str], None] | None = None,
+        coalesce: bool | None = None,
+    ) -> list[str]:
+        """Generate the responses of several prompts concurrently.
+
+        The requests are sent as fast as the rate limiter and the provider
+        concurrency cap allow.
+
+        Parameters
+        ----------
+        prompts : list[str]
+            The input prompt texts
+        use_cache : bool
+            Whether to look the prompts up in the cache, see `generate_text`.
+        callback : Callable[[int, str], None] | None
+            Called with the prompt index and the response as soon as each
+            response arrives, e.g. to report progress.
+        coalesce : bool | None
+            Whether identical prompts share a single request, see
+            `generate_text`.
+
+        Returns
+        -------
+        list[str]: The generated responses, in the order of the prompts
+        """
+        # On the shared event loop, where the pooled async clients live
+        return run_sync(
+            self.agenerate_many(prompts, use_cache, callback, coalesce)
+        )
+
+    async def agenerate_many(
+        self,
+        prompts: list[str],
+        use_cache: bool = True,
+        callback: Callable[[int, str], None] | None = None,
+        coalesce: bool | None = None,
+    ) -> list[str]:
+        """Generate the responses of several prompts concurrently.
+
+        See `generate_many`.
+        """
+
+        async def generate(index: int, prompt: str) -> str:
+            response = await self.agenerate_text(
+                prompt, use_cache=use_cache, coalesce=coalesce
+            )
+            if callback is not None:
+                callback(index, response)
+            return response
+
+        tasks = [
+            asyncio.ensure_future(generate(index, prompt))
+            for index, prompt in enumerate(prompts)
+        ]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            # The event loop outlives the call, stop the remaining requests
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def generate_text_stream(
+        self, prompt: str, use_cache: bool = True
+    ) -> TextStream:
+        """Stream the text response for the given prompt.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        use_cache : bool
+            Whether to look the prompt up in the cache, see `generate_text`.
+            A cached response is yielded as a single delta.
+
+        Returns
+        -------
+        TextStream: Iterator over the text deltas, exposing
+            `time_to_first_token` and the accumulated `text`
+        """
+        record = self._start_call(stream=True)
+        key = self._get_cache_key(prompt)
+        if key is not None and use_cache:
+            response = self.cache.get(key)
+            if response is not None:
+                record.cached = True
+                return TextStream(
+                    iter([response]),
+                    on_complete=partial(self._finish_stream, record, None),
+                )
+        return TextStream(
+            self._stream_scheduled_text(prompt, record),
+            on_complete=partial(self._finish_stream, record, key),
+            on_error=partial(self._fail_stream, record),
+        )
+
+    def agenerate_text_stream(
+        self, prompt: str, use_cache: bool = True
+    ) -> AsyncTextStream:
+        """Stream the text response for the given prompt asynchronously.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        use_cache : bool
+            Whether to look the prompt up in the cache, see `generate_text`.
+
+        Returns
+        -------
+        AsyncTextStream: Async iterator over the text deltas, exposing
+            `time_to_first_token` and the accumulated `text`
+        """
+        record = self._start_call(stream=True)
+        key = self._get_cache_key(prompt)
+        return AsyncTextStream(
+            self._astream_cached_text(prompt, key, use_cache, record),
+            on_complete=partial(self._finish_stream, record, key),
+            on_error=partial(self._fail_stream, record),
+        )
+
+    def _generate_text(
+        self, prompt: str, timeout: float | None = None
+    ) -> str:
+        """Call the provider once to generate a response, without caching.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        timeout : float | None
+            Time in seconds after which the request is given up, the
+            remaining deadline budget of the call, None for the default.
 
         Returns
         -------
@@ -47,15 +403,256 @@ class LLM:
         """
         raise NotImplementedError("Subclasses must implement this method")
 
+    async def _agenerate_text(
+        self, prompt: str, timeout: float | None = None
+    ) -> str:
+        """Call the provider once asynchronously, without caching.
+
+        The default implementation runs `_generate_text` in a worker thread,
+        subclasses with a native async client should override it. A worker
+        thread cannot be cancelled, it stops at the `timeout`.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        timeout : float | None
+            See `_generate_text`.
+
+        Returns
+        -------
+        str: The generated response text
+        """
+        return await asyncio.to_thread(self._generate_text, prompt, timeout)
+
+    def _stream_text(self, prompt: str) -> Iterator[str]:
+        """Call the provider and yield the text deltas, without caching.
+
+        The default implementation yields the full response as a single
+        delta, subclasses with a streaming API should override it.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+
+        Yields
+        ------
+        str: The text deltas
+        """
+        yield self.retry_policy.call(
+            self._generate_text, prompt, pass_timeout=True
+        )
+
+    async def _astream_text(self, prompt: str) -> AsyncIterator[str]:
+        """Call the provider asynchronously and yield the text deltas.
+
+        The default implementation yields the full response as a single
+        delta, subclasses with a streaming API should override it.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+
+        Yields
+        ------
+        str: The text deltas
+        """
+        yield await self.retry_policy.acall(
+            self._agenerate_text, prompt, pass_timeout=True
+        )
+
+    async def _astream_cached_text(
+        self,
+        prompt: str,
+        key: str | None,
+        use_cache: bool,
+        record: CallRecord,
+    ) -> AsyncIterator[str]:
+        """Yield the cached response if any, else stream from the provider."""
+        if key is not None and use_cache:
+            response = self.cache.get(key)
+            if response is not None:
+                record.cached = True
+                yield response
+                return
+        async with self.scheduler.aslot(self.priority, self.caller) as wait:
+            record.add_queue_time(wait)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(prompt)
+            async for delta in self._astream_text(prompt):
+                yield delta
+
+    def _stream_scheduled_text(
+        self, prompt: str, record: CallRecord
+    ) -> Iterator[str]:
+        """Stream from the provider once admitted by the scheduler."""
+        with self.scheduler.slot(self.priority, self.caller) as wait:
+            record.add_queue_time(wait)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(prompt)
+            yield from self._stream_text(prompt)
+
+    def _call_provider(self, prompt: str, record: CallRecord) -> str:
+        """Call the provider with retries, see `_call_attempt`.
+
+        Hedged calls run on the async path, on the shared event loop, where
+        the losing attempt is cancelled.
+        """
+        if self.retry_policy.hedge:
+            return run_sync(self._acall_provider(prompt, record))
+        response = self.retry_policy.call(
+            self._call_attempt,
+            prompt,
+            record,
+            on_retry=record.add_retry,
+            pass_timeout=True,
+        )
+        record.set_usage(response)
+        return response
+
+    async def _acall_provider(self, prompt: str, record: CallRecord) -> str:
+        """Call the provider asynchronously, see `_call_provider`."""
+        response = await self.retry_policy.acall(
+            self._acall_attempt,
+            prompt,
+            record,
+            on_retry=record.add_retry,
+            pass_timeout=True,
+        )
+        record.set_usage(response)
+        return response
+
+    def _call_attempt(
+        self, prompt: str, record: CallRecord, timeout: float | None = None
+    ) -> str:
+        """Call the provider once, within a scheduler slot and the rate limit.
+
+        Every attempt, retried or hedged, waits for its own slot and its own
+        share of the rate limit: the slot is not held during the backoffs,
+        and every request sent is counted by the rate limiter. The slot is
+        taken before the rate limit is reserved, so that queued background
+        calls do not hold reservations ahead of interactive ones.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.scheduler.slot(self.priority, self.caller) as wait:
+            record.add_queue_time(wait)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(prompt)
+            return self._generate_text(prompt, _get_remaining(deadline))
+
+    async def _acall_attempt(
+        self, prompt: str, record: CallRecord, timeout: float | None = None
+    ) -> str:
+        """Call the provider once asynchronously, see `_call_attempt`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        async with self.scheduler.aslot(self.priority, self.caller) as wait:
+            record.add_queue_time(wait)
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(prompt)
+            return await self._agenerate_text(
+                prompt, _get_remaining(deadline)
+            )
+
+    def _start_call(self, stream: bool = False) -> CallRecord:
+        """Start the measurements of a call."""
+        return CallRecord(
+            caller=self.caller,
+            model=self.get_model(),
+            stream=stream,
+            priority=self.priority,
+        )
+
+    def _finish_stream(
+        self, record: CallRecord, key: str | None, stream: TextStream
+    ):
+        """Cache the text of an exhausted stream and record the call."""
+        if key is not None and not record.cached:
+            self.cache.set(key, stream.text)
+        record.prompt_tokens = stream.prompt_tokens
+        record.completion_tokens = stream.completion_tokens
+        self.metrics.record(
+            record.finish(time_to_first_token=stream.time_to_first_token)
+        )
+
+    def _fail_stream(
+        self, record: CallRecord, stream: TextStream, error: Exception
+    ):
+        """Record a stream that failed."""
+        self.metrics.record(record.finish(error=error))
+
+    def _get_request_key(self, prompt: str) -> str:
+        """Get the key identifying identical requests."""
+        return LLMCache.make_key(
+            self.get_model(), prompt, self.get_sampling_params()
+        )
+
+    def _get_cache_key(self, prompt: str) -> str | None:
+        """Get the cache key of a prompt, None when caching is disabled."""
+        if self.cache is None:
+            return None
+        return self._get_request_key(prompt)
+
 
 class LLMMistral(LLM):
     """Mistral AI large language model implementation."""
 
-    def __init__(self):
-        """Initialize the Mistral LLM client."""
-        super().__init__()
-        self.client = Mistral(api_key=self.get_api_key())
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        response_format: dict | None = None,
+        cache: LLMCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy | None = None,
+        registry: ClientRegistry | None = None,
+        **kwargs,
+    ):
+        """Initialize the Mistral LLM client.
+
+        Parameters
+        ----------
+        max_concurrency : int
+            Maximum number of `agenerate_text` requests in flight at the
+            same time on one event loop.
+        temperature : float | None
+            Sampling temperature, None for the model default.
+        max_tokens : int | None
+            Maximum number of generated tokens, None for no limit.
+        response_format : dict | None
+            Constraint on the output format, e.g. `{"type": "json_schema",
+            "json_schema": {...}}` for structured outputs, None for free
+            text.
+        cache : LLMCache | None
+            Optional on-disk response cache, disabled by default.
+        rate_limiter : RateLimiter | None
+            Optional rate limiter applied to every Mistral call.
+        retry_policy : RetryPolicy | None
+            Retry policy of the Mistral calls.
+        registry : ClientRegistry | None
+            Registry of the pooled Mistral clients, the process-wide
+            `CLIENT_REGISTRY` by default.
+        **kwargs
+            Forwarded to the LLM base class (caller, metrics).
+        """
+        super().__init__(
+            cache=cache,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            **kwargs,
+        )
+        self.registry = registry or CLIENT_REGISTRY
         self.model = self.get_model()
+        self.client = self.registry.get_client(
+            "mistral", self.model, self.get_api_key()
+        )
+        self.max_concurrency = max_concurrency
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.response_format = response_format
+        self._semaphores = weakref.WeakKeyDictionary()
 
     def get_api_key(self) -> str:
         """Get the Mistral API key from environment variables.
@@ -75,14 +672,107 @@ class LLMMistral(LLM):
         """
         return "mistral-small-2503"
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-    def generate_text(self, prompt: str) -> str:
+    def get_sampling_params(self) -> dict:
+        """Get the sampling parameters that differ from the model defaults.
+
+        Returns
+        -------
+        dict: The sampling parameters
+        """
+        params = {
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "response_format": self.response_format,
+        }
+        return {name: val for name, val in params.items() if val is not None}
+
+    def _generate_text(
+        self, prompt: str, timeout: float | None = None
+    ) -> str:
         """Generate text using the Mistral chat completion API.
 
         Parameters
         ----------
         prompt : str
             The input prompt text
+        timeout : float | None
+            Timeout of the request in seconds, the pool timeout if None.
+
+        Returns
+        -------
+        str: The generated response from Mistral
+        """
+        messages = [{"role": "user", "content": prompt}]
+        chat_response = self.client.chat.complete(
+            model=self.model,
+            messages=messages,
+            **self.get_sampling_params(),
+            **self._get_request_options(timeout),
+        )
+        return self._to_completion(chat_response)
+
+    @staticmethod
+    def _to_completion(chat_response) -> Completion:
+        """Convert a Mistral chat response to a `Completion` with its usage."""
+        usage = chat_response.usage
+        return Completion(
+            chat_response.choices[0].message.content,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+        )
+
+    @staticmethod
+    def _to_delta(chunk) -> Completion:
+        """Convert a Mistral stream chunk to a delta, with the usage if any.
+
+        The usage is only sent with the last chunk of the stream.
+        """
+        content = chunk.choices[0].delta.content if chunk.choices else None
+        usage = chunk.usage
+        return Completion(
+            content or "",
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None,
+        )
+
+    @staticmethod
+    def _get_request_options(timeout: float | None) -> dict:
+        """Get the per-request options of the Mistral SDK."""
+        if timeout is None:
+            return {}
+        return {"timeout_ms": max(1, int(timeout * 1000))}
+
+    def _get_async_client(self):
+        """Get the pooled Mistral client bound to the running event loop."""
+        return self.registry.get_async_client(
+            "mistral", self.model, self.get_api_key()
+        )
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the concurrency semaphore bound to the running event loop.
+
+        Returns
+        -------
+        asyncio.Semaphore: The semaphore capping in-flight requests
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _agenerate_text(
+        self, prompt: str, timeout: float | None = None
+    ) -> str:
+        """Generate text using the async Mistral chat completion API.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        timeout : float | None
+            Timeout of the request in seconds, the pool timeout if None.
 
         Returns
         -------
@@ -90,9 +780,81 @@ class LLMMistral(LLM):
 
         Notes
         -----
-        Uses retry decorator to attempt the API call up to 3 times with
-        2 second delays.
+        At most `max_concurrency` requests are in flight at once, the slot
+        is released while waiting between retries.
         """
         messages = [{"role": "user", "content": prompt}]
-        chat_response = self.client.chat.complete(model=self.model, messages=messages)
-        return chat_response.choices[0].message.content
+        client = self._get_async_client()
+        async with self._get_semaphore():
+            chat_response = await client.chat.complete_async(
+                model=self.model,
+                messages=messages,
+                **self.get_sampling_params(),
+                **self._get_request_options(timeout),
+            )
+        return self._to_completion(chat_response)
+
+    def _open_stream(self, prompt: str):
+        """Open a Mistral chat completion stream."""
+        messages = [{"role": "user", "content": prompt}]
+        return self.client.chat.stream(
+            model=self.model, messages=messages, **self.get_sampling_params()
+        )
+
+    async def _aopen_stream(self, prompt: str):
+        """Open an async Mistral chat completion stream."""
+        messages = [{"role": "user", "content": prompt}]
+        return await self._get_async_client().chat.stream_async(
+            model=self.model, messages=messages, **self.get_sampling_params()
+        )
+
+    def _stream_text(self, prompt: str) -> Iterator[str]:
+        """Yield the text deltas of a Mistral chat completion stream.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+
+        Yields
+        ------
+        str: The text deltas
+
+        Notes
+        -----
+        Only opening the stream is retried, a failure after the first delta
+        is raised to the caller.
+        """
+        events = self.retry_policy.call(self._open_stream, prompt)
+        with events:
+            for event in events:
+                delta = self._to_delta(event.data)
+                if delta or delta.completion_tokens is not None:
+                    yield delta
+
+    async def _astream_text(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the text deltas of an async Mistral chat completion stream.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+
+        Yields
+        ------
+        str: The text deltas
+
+        Notes
+        -----
+        The stream holds one of the `max_concurrency` slots until it is
+        exhausted.
+        """
+        async with self._get_semaphore():
+            events = await self.retry_policy.acall(
+                self._aopen_stream, prompt, allow_hedge=False
+            )
+            async with events:
+                async for event in events:
+                    delta = self._to_delta(event.data)
+                    if delta or delta.completion_tokens is not None:
+                        yield delta
@@ -0,0 +1,359 @@
+"""Per-call instrumentation of LLM calls.
+
+This module records the wall time, time to first token, token usage, retry
+count and caller of every LLM call. The calls are aggregated in in-process
+histograms and counters, and can be exported as JSONL records or in the
+Prometheus text format.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+# Latency buckets in seconds, from cache hits to slow story generations
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+
+
+@dataclass
+class CallRecord:
+    """Measurements of a single LLM call.
+
+    Attributes
+    ----------
+    caller (str): Tag of the calling component, e.g. "Asker".
+    model (str): The model identifier.
+    timestamp (float): Unix time at which the call started.
+    wall_time (float | None): Duration of the call in seconds.
+    time_to_first_token (float | None): Seconds until the first token. For
+        non-streamed calls, the whole response arrives at once.
+    prompt_tokens (int | None): Prompt tokens reported by the provider.
+    completion_tokens (int | None): Completion tokens reported by the
+        provider.
+    retries (int): Number of retried attempts.
+    cached (bool): Whether the response came from the cache.
+    coalesced (bool): Whether the response was shared from an identical
+        request in flight.
+    stream (bool): Whether the call was streamed.
+    priority (str | None): Scheduling priority class of the call.
+    queue_time (float | None): Seconds spent waiting for a scheduler slot,
+        summed over the attempts.
+    error (str | None): Error type if the call failed.
+    """
+
+    caller: str
+    model: str
+    timestamp: float = field(default_factory=time.time)
+    wall_time: float | None = None
+    time_to_first_token: float | None = None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    retries: int = 0
+    cached: bool = False
+    coalesced: bool = False
+    stream: bool = False
+    priority: str | None = None
+    queue_time: float | None = None
+    error: str | None = None
+
+    def __post_init__(self):
+        self._start_time = time.perf_counter()
+
+    def add_retry(self):
+        """Count a retried attempt."""
+        self.retries += 1
+
+    def add_queue_time(self, wait: float):
+        """Add the time an attempt waited for a scheduler slot."""
+        self.queue_time = (self.queue_time or 0.0) + wait
+
+    def set_usage(self, response: str):
+        """Read the token usage attached to a provider response, if any.
+
+        Must not be called for shared responses, whose tokens are already
+        counted by the call that fetched them.
+        """
+        prompt_tokens = getattr(response, "prompt_tokens", None)
+        completion_tokens = getattr(response, "completion_tokens", None)
+        if prompt_tokens is not None:
+            self.prompt_tokens = prompt_tokens
+        if completion_tokens is not None:
+            self.completion_tokens = completion_tokens
+
+    def finish(
+        self,
+        time_to_first_token: float | None = None,
+        error: BaseException | None = None,
+    ) -> "CallRecord":
+        """Stop the clock.
+
+        Parameters
+        ----------
+        time_to_first_token : float | None
+            Time to first token of a streamed call, the wall time otherwise.
+        error : BaseException | None
+            The error that made the call fail.
+
+        Returns
+        -------
+        CallRecord: The record itself
+        """
+        self.wall_time = time.perf_counter() - self._start_time
+        if time_to_first_token is None and error is None:
+            time_to_first_token = self.wall_time
+        self.time_to_first_token = time_to_first_token
+        if error is not None:
+            self.error = type(error).__name__
+        return self
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, Prometheus style."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        """Initialize an empty histogram.
+
+        Parameters
+        ----------
+        buckets : tuple[float, ...]
+            Upper bounds of the buckets, an infinite bucket is implied.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Add a value to the histogram."""
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a quantile as the upper bound of its bucket.
+
+        Parameters
+        ----------
+        q : float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        float | None: The estimated quantile, None if the histogram is empty
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+class LLMMetrics:
+    """Collector of the LLM call records.
+
+    Records are aggregated per caller and model. The most recent records are
+    kept in memory for the JSONL export, and can also be appended to a JSONL
+    file as they arrive.
+    """
+
+    def __init__(
+        self, jsonl_path: str | Path | None = None, max_records: int = 10000
+    ):
+        """Initialize the collector.
+
+        Parameters
+        ----------
+        jsonl_path : str | Path | None
+            File to which every record is appended, None to keep them in
+            memory only.
+        max_records : int
+            Number of most recent records kept in memory.
+        """
+        self.jsonl_path = None if jsonl_path is None else Path(jsonl_path)
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all the recorded calls and aggregates."""
+        with self._lock:
+            self.records.clear()
+            self.wall_time = defaultdict(Histogram)
+            self.time_to_first_token = defaultdict(Histogram)
+            self.counters = defaultdict(int)
+
+    def record(self, record: CallRecord):
+        """Add a finished call record.
+
+        Parameters
+        ----------
+        record : CallRecord
+            The finished call record.
+        """
+        labels = (record.caller, record.model)
+        with self._lock:
+            self.records.append(record)
+            self.counters[("calls", labels, record.cached)] += 1
+            self.counters[("retries", labels)] += record.retries
+            if record.error is not None:
+                self.counters[("errors", labels)] += 1
+            if record.prompt_tokens is not None:
+                self.counters[
+                    ("prompt_tokens", labels)
+                ] += record.prompt_tokens
+            if record.completion_tokens is not None:
+                self.counters[
+                    ("completion_tokens", labels)
+                ] += record.completion_tokens
+            if record.wall_time is not None:
+                self.wall_time[labels].observe(record.wall_time)
+            if record.time_to_first_token is not None:
+                self.time_to_first_token[labels].observe(
+                    record.time_to_first_token
+                )
+            if self.jsonl_path is not None:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps(asdict(record)) + "\n")
+
+    def summary(self) -> dict:
+        """Summarize the calls per caller and model.
+
+        Returns
+        -------
+        dict: For each "caller/model", the number of calls, cache hits,
+            errors, retries, tokens and the p50/p95 wall time
+        """
+        with self._lock:
+            summary = {}
+            counters = self.counters
+            for labels, histogram in self.wall_time.items():
+                summary["/".join(labels)] = {
+                    "calls": histogram.count,
+                    "cached": counters.get(("calls", labels, True), 0),
+                    "errors": counters.get(("errors", labels), 0),
+                    "retries": counters.get(("retries", labels), 0),
+                    "prompt_tokens": counters.get(
+                        ("prompt_tokens", labels), 0
+                    ),
+                    "completion_tokens": counters.get(
+                        ("completion_tokens", labels), 0
+                    ),
+                    "wall_time_p50": histogram.quantile(0.5),
+                    "wall_time_p95": histogram.quantile(0.95),
+                }
+            return summary
+
+    def export_jsonl(self, path: str | Path):
+        """Write the records kept in memory to a JSONL file.
+
+        Parameters
+        ----------
+        path : str | Path
+            The output file.
+        """
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w") as f:
+            for record in records:
+                f.write(json.dumps(asdict(record)) + "\n")
+
+    def to_prometheus(self) -> str:
+        """Render the aggregates in the Prometheus text exposition format.
+
+        Returns
+        -------
+        str: The metrics text
+        """
+        lines = []
+        with self._lock:
+            counters = [
+                ("llm_calls_total", "calls", "Number of LLM calls"),
+                ("llm_errors_total", "errors", "Number of failed LLM calls"),
+                ("llm_retries_total", "retries", "Number of retried attempts"),
+                ("llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens"),
+                (
+                    "llm_completion_tokens_total",
+                    "completion_tokens",
+                    "Completion tokens",
+                ),
+            ]
+            for name, kind, help_text in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self.counters.items(), key=str):
+                    if key[0] != kind:
+                        continue
+                    labels = _format_labels(key[1])
+                    if kind == "calls":
+                        cached = "true" if key[2] else "false"
+                        labels = labels[:-1] + f',cached="{cached}"}}'
+                    lines.append(f"{name}{labels} {value}")
+            histograms = [
+                (
+                    "llm_call_duration_seconds",
+                    self.wall_time,
+                    "Wall time of the LLM calls",
+                ),
+                (
+                    "llm_time_to_first_token_seconds",
+                    self.time_to_first_token,
+                    "Time to first token of the LLM calls",
+                ),
+            ]
+            for name, histograms_by_labels, help_text in histograms:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(histograms_by_labels.items()):
+                    lines.extend(
+                        _format_histogram(
+                            name, _format_labels(labels), histogram
+                        )
+                    )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | Path):
+        """Write the Prometheus text to a file, e.g. for a textfile collector.
+
+        Parameters
+        ----------
+        path : str | Path
+            The output file.
+        """
+        with open(path, "w") as f:
+            f.write(self.to_prometheus())
+
+
+def _format_labels(labels: tuple[str, str]) -> str:
+    caller, model = labels
+    return f'{{caller="{caller}",model="{model}"}}'
+
+
+def _format_histogram(
+    name: str, labels: str, histogram: Histogram
+) -> list[str]:
+    lines = []
+    label_text = labels[:-1]
+    cumulative = 0
+    bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+    for bound, count in zip(bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{label_text},le="{bound}"}} {cumulative}')
+    lines.append(f"{name}_sum{label_text}}} {histogram.sum}")
+    lines.append(f"{name}_count{label_text}}} {histogram.count}")
+    return lines
+
+
+# Process-wide collector, records are also appended to BONBON_LLM_METRICS_JSONL
+LLM_METRICS = LLMMetrics(jsonl_path=os.getenv("BONBON_LLM_METRICS_JSONL"))
@@ -0,0 +1,152 @@
+"""Token bucket rate limiter for LLM requests.
+
+This module provides a rate limiter that can be shared between LLM instances,
+threads and event loops to keep the request rate and the token throughput
+under the provider limits.
+"""
+
+import asyncio
+import math
+import threading
+import time
+
+
+class TokenBucket:
+    """A token bucket refilled continuously at a fixed rate.
+
+    Reservations are taken immediately and may bring the level below zero,
+    the caller then waits for the deficit to be refilled. This keeps the
+    bucket fair between concurrent callers without a queue.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """Initialize a full bucket.
+
+        Parameters
+        ----------
+        rate : float
+            Number of units added per second.
+        capacity : float
+            Maximum number of units the bucket holds.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` units from the bucket.
+
+        Parameters
+        ----------
+        amount : float
+            Number of units to take, clamped to the capacity.
+        now : float
+            Current monotonic time.
+
+        Returns
+        -------
+        float: Number of seconds to wait before the reservation is valid
+        """
+        self.level = min(
+            self.capacity, self.level + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    """Rate limiter on requests per second and tokens per minute.
+
+    The default limits match the Mistral free tier.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 1.0,
+        tokens_per_minute: float | None = 500_000,
+        completion_tokens: int = 256,
+    ):
+        """Initialize the rate limiter.
+
+        Parameters
+        ----------
+        requests_per_second : float
+            Maximum sustained number of requests per second.
+        tokens_per_minute : float | None
+            Maximum sustained number of tokens (prompt and completion) per
+            minute, None for no token limit.
+        completion_tokens : int
+            Number of completion tokens reserved for each request, since
+            the actual count is only known once the response arrives.
+        """
+        self.requests = TokenBucket(
+            rate=requests_per_second, capacity=max(1.0, requests_per_second)
+        )
+        self.tokens = None
+        if tokens_per_minute is not None:
+            self.tokens = TokenBucket(
+                rate=tokens_per_minute / 60, capacity=tokens_per_minute
+            )
+        self.completion_tokens = completion_tokens
+        self._lock = threading.Lock()
+
+    def estimate_tokens(self, prompt: str) -> int:
+        """Estimate the number of tokens consumed by a request.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+
+        Returns
+        -------
+        int: About four characters per prompt token, plus the reserved
+            completion tokens
+        """
+        return math.ceil(len(prompt) / 4) + self.completion_tokens
+
+    def reserve(self, prompt: str) -> float:
+        """Reserve the budget of one request.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+
+        Returns
+        -------
+        float: Number of seconds to wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self.requests.reserve(1, now)
+            if self.tokens is not None:
+                tokens = self.estimate_tokens(prompt)
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            return wait
+
+    def acquire(self, prompt: str):
+        """Block until a request for `prompt` may be sent.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        """
+        wait = self.reserve(prompt)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, prompt: str):
+        """Wait without blocking the event loop until `prompt` may be sent.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        """
+        wait = self.reserve(prompt)
+        if wait > 0:
+            await asyncio.sleep(wait)
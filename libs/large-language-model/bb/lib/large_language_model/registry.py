@@ -0,0 +1,158 @@
+"""Process-wide registry of pooled LLM provider clients.
+
+Creating a provider client opens new HTTP connections, with their own TLS
+handshakes. The registry hands out one client per provider and model, backed
+by keep-alive connection pools, so that every LLM instance of the process
+reuses the same connections.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+from mistralai import Mistral
+
+
+class ClientRegistry:
+    """Registry of provider clients sharing keep-alive connection pools.
+
+    Async HTTP connections are bound to the event loop that opened them, so
+    the async clients are kept per event loop. The synchronous wrappers all
+    run on the long-lived `LLM_EVENT_LOOP`, whose clients live as long as
+    the process. Code running its own event loops closes their clients with
+    `aclose_async_clients` before the loop ends.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 60.0,
+    ):
+        """Initialize the registry.
+
+        Parameters
+        ----------
+        max_connections : int
+            Maximum number of connections of each pool.
+        max_keepalive_connections : int
+            Maximum number of idle connections kept alive in each pool.
+        keepalive_expiry : float
+            Seconds after which an idle connection is closed.
+        timeout : float
+            Timeout of the HTTP requests in seconds.
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._http_client = None
+        self._clients = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_http_clients = weakref.WeakKeyDictionary()
+
+    def get_client(self, provider: str, model: str, api_key: str):
+        """Get the shared client of a provider and model.
+
+        Parameters
+        ----------
+        provider : str
+            The provider name, only "mistral" is supported.
+        model : str
+            The model identifier.
+        api_key : str
+            The API key used when the client is created.
+
+        Returns
+        -------
+        The provider client, for synchronous calls
+        """
+        with self._lock:
+            key = (provider, model)
+            if key not in self._clients:
+                self._clients[key] = self._create_client(
+                    provider, api_key, async_client=None
+                )
+            return self._clients[key]
+
+    def get_async_client(self, provider: str, model: str, api_key: str):
+        """Get the shared client of a provider and model for the running loop.
+
+        Parameters
+        ----------
+        provider : str
+            The provider name, only "mistral" is supported.
+        model : str
+            The model identifier.
+        api_key : str
+            The API key used when the client is created.
+
+        Returns
+        -------
+        The provider client, for asynchronous calls on the running loop
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            key = (provider, model)
+            if key not in clients:
+                clients[key] = self._create_client(
+                    provider,
+                    api_key,
+                    async_client=self._get_async_http_client(loop),
+                )
+            return clients[key]
+
+    async def aclose_async_clients(self):
+        """Close the async clients of the running loop, with their pools."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._async_clients.pop(loop, None)
+            async_http_client = self._async_http_clients.pop(loop, None)
+        if async_http_client is not None:
+            await async_http_client.aclose()
+
+    def _get_http_client(self) -> httpx.Client:
+        """Get the synchronous HTTP client shared by all the providers."""
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=self.limits, timeout=self.timeout
+            )
+        return self._http_client
+
+    def _get_async_http_client(
+        self, loop: asyncio.AbstractEventLoop
+    ) -> httpx.AsyncClient:
+        """Get the async HTTP client shared by all the providers of a loop."""
+        if loop not in self._async_http_clients:
+            self._async_http_clients[loop] = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout
+            )
+        return self._async_http_clients[loop]
+
+    def _create_client(
+        self,
+        provider: str,
+        api_key: str,
+        async_client: httpx.AsyncClient | None,
+    ):
+        """Create a provider client on top of the pooled HTTP clients."""
+        if provider == "mistral":
+            return Mistral(
+                api_key=api_key,
+                client=self._get_http_client(),
+                async_client=async_client,
+            )
+        else:
+            raise ValueError(f"Invalid provider: {provider}")
+
+
+CLIENT_REGISTRY = ClientRegistry(
+    max_connections=int(os.getenv("BONBON_LLM_POOL_SIZE", "20"))
+)
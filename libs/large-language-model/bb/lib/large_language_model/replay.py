@@ -0,0 +1,315 @@
+"""Record and replay LLM backend.
+
+This module provides an LLM implementation that records the completions of a
+real LLM to a JSONL file, and replays them offline with synthetic latencies
+and simulated rate limit errors. It is meant for benchmarks and tests that
+must not depend on the network.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from bb.lib.large_language_model.llm import LLM, Completion
+from bb.lib.large_language_model.retry import (
+    DeadlineExceededError,
+    RetryPolicy,
+)
+from bb.lib.large_language_model.scheduler import LLMScheduler
+
+
+class RateLimitError(Exception):
+    """Simulated HTTP 429 error raised by the replay backend."""
+
+    status_code = 429
+
+
+class LatencyModel:
+    """Distribution of the synthetic latency of replayed completions.
+
+    Supported distributions and their parameters:
+    - "recorded": the latency measured while recording
+    - "constant" (value): a fixed latency
+    - "uniform" (low, high): uniform between low and high
+    - "normal" (mean, std): gaussian, clipped at zero
+    - "lognormal" (mu, sigma): log-normal, heavy tailed like real APIs
+    """
+
+    def __init__(
+        self,
+        distribution: str = "recorded",
+        params: tuple[float, ...] = (),
+        seed: int | None = None,
+    ):
+        """Initialize the latency model.
+
+        Parameters
+        ----------
+        distribution : str
+            The distribution name.
+        params : tuple[float, ...]
+            The distribution parameters.
+        seed : int | None
+            Seed of the random generator, for reproducible runs.
+        """
+        if distribution not in [
+            "recorded",
+            "constant",
+            "uniform",
+            "normal",
+            "lognormal",
+        ]:
+            raise ValueError(f"Invalid latency distribution: {distribution}")
+        self.distribution = distribution
+        self.params = params
+        self.random = random.Random(seed)
+
+    @classmethod
+    def from_spec(cls, spec: str, seed: int | None = None) -> "LatencyModel":
+        """Create a latency model from a spec like "lognormal:-0.5,0.4".
+
+        Parameters
+        ----------
+        spec : str
+            The distribution name, optionally followed by a colon and the
+            comma separated parameters.
+        seed : int | None
+            Seed of the random generator.
+
+        Returns
+        -------
+        LatencyModel: The latency model
+        """
+        distribution, _, params = spec.partition(":")
+        params = tuple(float(param) for param in params.split(",") if param)
+        return cls(distribution.strip(), params, seed=seed)
+
+    def sample(self, recorded: float = 0.0) -> float:
+        """Sample a latency in seconds.
+
+        Parameters
+        ----------
+        recorded : float
+            The latency measured while recording the completion.
+
+        Returns
+        -------
+        float: The latency in seconds
+        """
+        if self.distribution == "recorded":
+            return recorded
+        if self.distribution == "constant":
+            return self.params[0]
+        if self.distribution == "uniform":
+            return self.random.uniform(*self.params)
+        if self.distribution == "normal":
+            return max(0.0, self.random.gauss(*self.params))
+        return self.random.lognormvariate(*self.params)
+
+
+class LLMReplay(LLM):
+    """LLM backend that records or replays completions.
+
+    In "record" mode, every call is forwarded to the wrapped LLM and the
+    prompt, response and latency are appended to the recording file. In
+    "replay" mode, the responses are read from the recording file. A prompt
+    recorded several times replays its responses in turn.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        mode: str = "replay",
+        llm: LLM | None = None,
+        latency: LatencyModel | None = None,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+        **kwargs,
+    ):
+        """Initialize the record/replay backend.
+
+        Parameters
+        ----------
+        path : str | Path
+            Path of the JSONL recording file.
+        mode : str
+            "record" or "replay".
+        llm : LLM | None
+            The LLM to record, required in "record" mode.
+        latency : LatencyModel | None
+            Synthetic latency of the replayed completions, the recorded
+            latency by default.
+        error_rate : float
+            Probability that a replayed call raises a simulated 429
+            `RateLimitError`.
+        seed : int | None
+            Seed of the random generator of the simulated errors.
+        **kwargs
+            Forwarded to the LLM base class (cache, rate_limiter,
+            retry_policy, ...). By default only the simulated rate limit
+            errors are retried. In "record" mode, the calls are scheduled
+            by the wrapped LLM only, since waiting for a second slot of the
+            same scheduler could deadlock.
+        """
+        kwargs.setdefault(
+            "retry_policy", RetryPolicy(retry_on=(RateLimitError,))
+        )
+        if mode == "record":
+            kwargs.setdefault("scheduler", LLMScheduler(max_concurrency=None))
+        super().__init__(**kwargs)
+        if mode not in ["record", "replay"]:
+            raise ValueError(f"Invalid mode: {mode}")
+        if mode == "record" and llm is None:
+            raise ValueError("An LLM to record is required in record mode")
+        self.path = Path(path)
+        self.mode = mode
+        self.llm = llm
+        self.latency = latency or LatencyModel()
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recordings = defaultdict(list)
+        self._next_index = defaultdict(int)
+        if self.mode == "replay":
+            self._load()
+
+    def get_api_key(self) -> str:
+        """Get the API key of the recorded LLM, empty when replaying.
+
+        Returns
+        -------
+        str: The API key
+        """
+        return "" if self.llm is None else self.llm.get_api_key()
+
+    def get_model(self) -> str:
+        """Get the model identifier, the recorded one when recording.
+
+        Returns
+        -------
+        str: The model identifier
+        """
+        return "replay" if self.llm is None else self.llm.get_model()
+
+    def _load(self):
+        """Load the recorded completions from the recording file."""
+        if not self.path.exists():
+            raise FileNotFoundError(f"No LLM recording at {self.path}")
+        with open(self.path, "r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._recordings[record["prompt"]].append(record)
+
+    def _record(self, prompt: str, response: str, latency: float):
+        """Append a completion, with its token usage, to the recording file."""
+        record = {
+            "prompt": prompt,
+            "response": response,
+            "latency": latency,
+            "prompt_tokens": getattr(response, "prompt_tokens", None),
+            "completion_tokens": getattr(response, "completion_tokens", None),
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _next_record(self, prompt: str) -> dict:
+        """Pick the next recorded completion of a prompt.
+
+        Raises
+        ------
+        RateLimitError: Randomly, with probability `error_rate`.
+        KeyError: If the prompt was never recorded.
+        """
+        with self._lock:
+            if self.random.random() < self.error_rate:
+                raise RateLimitError("Simulated rate limit error (429)")
+            records = self._recordings.get(prompt)
+            if not records:
+                raise KeyError(f"Prompt not found in {self.path}: {prompt}")
+            index = self._next_index[prompt]
+            self._next_index[prompt] = (index + 1) % len(records)
+            return records[index]
+
+    @staticmethod
+    def _to_completion(record: dict) -> Completion:
+        """Convert a recorded completion to a `Completion` with its usage."""
+        return Completion(
+            record["response"],
+            prompt_tokens=record.get("prompt_tokens"),
+            completion_tokens=record.get("completion_tokens"),
+        )
+
+    def _generate_text(
+        self, prompt: str, timeout: float | None = None
+    ) -> str:
+        """Record a completion of the wrapped LLM, or replay one.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        timeout : float | None
+            Time after which a replayed call times out, the wrapped LLM
+            applies its own retry policy when recording.
+
+        Returns
+        -------
+        str: The generated or replayed response
+        """
+        if self.mode == "record":
+            # Identical requests are already coalesced by this LLM, the
+            # wrapped one would wait for its own caller
+            start_time = time.perf_counter()
+            response = self.llm.generate_text(prompt, coalesce=False)
+            self._record(prompt, response, time.perf_counter() - start_time)
+            return response
+        record = self._next_record(prompt)
+        latency = self.latency.sample(record.get("latency", 0.0))
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise DeadlineExceededError(
+                f"Replayed call exceeded its {timeout:.2f}s timeout"
+            )
+        time.sleep(latency)
+        return self._to_completion(record)
+
+    async def _agenerate_text(
+        self, prompt: str, timeout: float | None = None
+    ) -> str:
+        """Record a completion of the wrapped LLM, or replay one.
+
+        Replayed latencies are awaited, so concurrent calls overlap like
+        real network calls.
+
+        Parameters
+        ----------
+        prompt : str
+            The input prompt text
+        timeout : float | None
+            See `_generate_text`.
+
+        Returns
+        -------
+        str: The generated or replayed response
+        """
+        if self.mode == "record":
+            start_time = time.perf_counter()
+            response = await self.llm.agenerate_text(prompt, coalesce=False)
+            self._record(prompt, response, time.perf_counter() - start_time)
+            return response
+        record = self._next_record(prompt)
+        latency = self.latency.sample(record.get("latency", 0.0))
+        if timeout is not None and latency > timeout:
+            await asyncio.sleep(timeout)
+            raise DeadlineExceededError(
+                f"Replayed call exceeded its {timeout:.2f}s timeout"
+            )
+        await asyncio.sleep(latency)
+        return self._to_completion(record)
@@ -0,0 +1,349 @@
+"""Deadline-aware retry policy for LLM calls.
+
+This module provides a retry policy with a per-call deadline budget,
+exponential backoff with jitter, and optional hedged requests: when an
+attempt is slower than the recent p95 latency, a duplicate request is sent
+and the first response wins. No attempt is left running in the background:
+the synchronous attempts get the remaining budget as their own timeout, and
+hedging, which needs attempts that can be interrupted, is done on the async
+path, where the losing attempt is cancelled.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call does not succeed within its deadline budget."""
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies."""
+
+    def __init__(self, window: int = 100):
+        """Initialize the tracker.
+
+        Parameters
+        ----------
+        window : int
+            Number of most recent latencies kept.
+        """
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency: float):
+        """Record the latency of a successful call."""
+        with self._lock:
+            self.latencies.append(latency)
+
+    def quantile(self, q: float) -> float | None:
+        """Get a latency quantile.
+
+        Parameters
+        ----------
+        q : float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        float | None: The quantile in seconds, None without any sample
+        """
+        with self._lock:
+            if not self.latencies:
+                return None
+            latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+class RetryPolicy:
+    """Retry policy with a deadline budget, backoff with jitter and hedging.
+
+    The same policy instance can be shared by several LLMs, it then shares
+    the latency statistics used to compute the hedging delay.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        deadline: float | None = None,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 10.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = 0.5,
+        retry_on: tuple[type[BaseException], ...] = (Exception,),
+    ):
+        """Initialize the retry policy.
+
+        Parameters
+        ----------
+        max_attempts : int
+            Maximum number of attempts, hedged duplicates not included.
+        deadline : float | None
+            Budget in seconds of the whole call, retries and backoffs
+            included, None for no deadline.
+        initial_backoff : float
+            Backoff before the second attempt, doubled at each retry.
+        max_backoff : float
+            Maximum backoff between two attempts.
+        hedge : bool
+            Whether to send a duplicate request when an attempt is slower
+            than the `hedge_quantile` of the recent latencies.
+        hedge_quantile : float
+            Latency quantile after which a hedged request is sent.
+        min_hedge_delay : float
+            Minimum delay before a hedged request, also used until enough
+            latencies are recorded.
+        retry_on : tuple[type[BaseException], ...]
+            Exception types that trigger a retry, others are raised
+            immediately.
+        """
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.retry_on = retry_on
+        self.latency_tracker = LatencyTracker()
+
+    def get_backoff(self, attempt: int) -> float:
+        """Get the backoff after a failed attempt, with full jitter.
+
+        Parameters
+        ----------
+        attempt : int
+            The number of the failed attempt, starting at 1.
+
+        Returns
+        -------
+        float: The backoff in seconds
+        """
+        backoff = min(
+            self.max_backoff, self.initial_backoff * 2 ** (attempt - 1)
+        )
+        return random.uniform(0, backoff)
+
+    def get_hedge_delay(self) -> float:
+        """Get the delay after which a hedged request is sent.
+
+        Returns
+        -------
+        float: The delay in seconds
+        """
+        quantile = self.latency_tracker.quantile(self.hedge_quantile)
+        if quantile is None:
+            return self.min_hedge_delay
+        return max(self.min_hedge_delay, quantile)
+
+    def call(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        on_retry: Callable[[], None] | None = None,
+        pass_timeout: bool = False,
+    ) -> Any:
+        """Call `fn` with retries, in the calling thread.
+
+        A synchronous attempt cannot be interrupted, so it is never hedged,
+        see `acall`, and the deadline is checked between the attempts. Use
+        `pass_timeout` so that the attempt itself stops at the deadline.
+
+        Parameters
+        ----------
+        fn : Callable[..., Any]
+            The function to call.
+        *args
+            The arguments of the function.
+        on_retry : Callable[[], None] | None
+            Called before each retried attempt, e.g. to count retries.
+        pass_timeout : bool
+            Whether to pass the remaining deadline budget to `fn` as its
+            `timeout` keyword argument, e.g. for a per-request HTTP timeout.
+
+        Returns
+        -------
+        The result of the first successful attempt
+
+        Raises
+        ------
+        DeadlineExceededError: If the deadline is exceeded.
+        Exception: The last error once the attempts are exhausted.
+        """
+        start_time = time.monotonic()
+        for attempt in range(1, self.max_attempts + 1):
+            remaining = self._get_remaining(start_time)
+            kwargs = {"timeout": remaining} if pass_timeout else {}
+            try:
+                attempt_start = time.monotonic()
+                result = fn(*args, **kwargs)
+                self.latency_tracker.add(time.monotonic() - attempt_start)
+                return result
+            except self.retry_on as error:
+                if isinstance(error, DeadlineExceededError):
+                    raise
+                if attempt == self.max_attempts:
+                    raise
+                time.sleep(
+                    self._get_backoff_within(start_time, attempt, error)
+                )
+                if on_retry is not None:
+                    on_retry()
+
+    async def acall(
+        self,
+        fn: Callable[..., Awaitable[Any]],
+        *args,
+        allow_hedge: bool = True,
+        on_retry: Callable[[], None] | None = None,
+        pass_timeout: bool = False,
+    ) -> Any:
+        """Await `fn` with retries and hedging.
+
+        The deadline is enforced by cancelling the running attempt, and the
+        attempt losing a hedged race is cancelled.
+
+        Parameters
+        ----------
+        fn : Callable[..., Awaitable[Any]]
+            The coroutine function to call.
+        *args
+            The arguments of the function.
+        allow_hedge : bool
+            Whether hedging may be used for this call. Disable it for calls
+            whose duplicates would leak resources, like opened streams.
+        on_retry : Callable[[], None] | None
+            Called before each retried attempt, e.g. to count retries.
+        pass_timeout : bool
+            Whether to pass the remaining deadline budget to `fn` as its
+            `timeout` keyword argument, see `call`.
+
+        Returns
+        -------
+        The result of the first successful attempt
+
+        Raises
+        ------
+        DeadlineExceededError: If the deadline is exceeded.
+        Exception: The last error once the attempts are exhausted.
+        """
+        start_time = time.monotonic()
+        hedge = self.hedge and allow_hedge
+        for attempt in range(1, self.max_attempts + 1):
+            remaining = self._get_remaining(start_time)
+            try:
+                return await self._acall_attempt(
+                    fn, args, remaining, hedge, pass_timeout
+                )
+            except self.retry_on as error:
+                if isinstance(error, DeadlineExceededError):
+                    raise
+                if attempt == self.max_attempts:
+                    raise
+                await asyncio.sleep(
+                    self._get_backoff_within(start_time, attempt, error)
+                )
+                if on_retry is not None:
+                    on_retry()
+
+    def _get_remaining(self, start_time: float) -> float | None:
+        """Get the remaining deadline budget, None without deadline."""
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - (time.monotonic() - start_time)
+        if remaining <= 0:
+            raise DeadlineExceededError(
+                f"LLM call exceeded its {self.deadline}s deadline"
+            )
+        return remaining
+
+    def _get_backoff_within(
+        self, start_time: float, attempt: int, error: BaseException
+    ) -> float:
+        """Draw the next backoff, give up if it does not fit the deadline."""
+        backoff = self.get_backoff(attempt)
+        remaining = self._get_remaining(start_time)
+        if remaining is not None and backoff >= remaining:
+            raise DeadlineExceededError(
+                f"LLM call exceeded its {self.deadline}s deadline"
+            ) from error
+        return backoff
+
+    async def _acall_attempt(
+        self,
+        fn: Callable[..., Awaitable[Any]],
+        args: tuple,
+        remaining: float | None,
+        hedge: bool,
+        pass_timeout: bool,
+    ) -> Any:
+        """Run one attempt, and its hedged duplicate, as tasks.
+
+        The task that loses the race is cancelled.
+        """
+        start_time = time.monotonic()
+
+        async def timed() -> Any:
+            attempt_start = time.monotonic()
+            kwargs = {}
+            if pass_timeout:
+                elapsed = attempt_start - start_time
+                kwargs["timeout"] = (
+                    None if remaining is None else remaining - elapsed
+                )
+            result = await fn(*args, **kwargs)
+            self.latency_tracker.add(time.monotonic() - attempt_start)
+            return result
+
+        tasks = {asyncio.ensure_future(timed())}
+        try:
+            if hedge:
+                delay = self.get_hedge_delay()
+                if remaining is not None:
+                    delay = min(delay, remaining)
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    tasks.add(asyncio.ensure_future(timed()))
+            while tasks:
+                timeout = None
+                if remaining is not None:
+                    elapsed = time.monotonic() - start_time
+                    timeout = max(0.0, remaining - elapsed)
+                done, tasks = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise DeadlineExceededError(
+                        f"LLM call exceeded its {self.deadline}s deadline"
+                    )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not tasks:
+                    raise done.pop().exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+# Live interactions with a child: fail fast and hedge slow requests
+INTERACTIVE_RETRY_POLICY = RetryPolicy(
+    max_attempts=3,
+    deadline=8.0,
+    initial_backoff=0.2,
+    max_backoff=1.0,
+    hedge=True,
+)
+
+# Offline generation: be patient with rate limits and transient errors
+BATCH_RETRY_POLICY = RetryPolicy(
+    max_attempts=6,
+    deadline=300.0,
+    initial_backoff=1.0,
+    max_backoff=30.0,
+)
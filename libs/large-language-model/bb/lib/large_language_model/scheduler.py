@@ -0,0 +1,363 @@
+"""Priority-aware admission of the LLM provider calls.
+
+Live interactions with a child and offline generation share the same
+provider rate limit. The scheduler bounds the number of provider calls in
+flight and admits the queued ones by priority class, so that a bulk
+generation run cannot delay an interactive call by more than the calls
+already in flight.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from bb.lib.large_language_model.metrics import Histogram, _format_histogram
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Priority classes, the lower the value the higher the priority
+PRIORITIES = {INTERACTIVE: 0, BACKGROUND: 1}
+
+
+class _Waiter:
+    """A call waiting for a slot, from a thread or from an event loop."""
+
+    def __init__(
+        self,
+        priority: str,
+        caller: str,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        self.priority = priority
+        self.caller = caller
+        self.loop = loop
+        self.enqueued_at = time.monotonic()
+        self.wait_time = 0.0
+        self.admitted = False
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        """Admit the call and wake up its thread or task."""
+        self.admitted = True
+        self.wait_time = time.monotonic() - self.enqueued_at
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_set_result, self.future)
+
+
+def _set_result(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMScheduler:
+    """Admission of the provider calls by priority class.
+
+    At most `max_concurrency` calls hold a slot at the same time, the others
+    wait in a queue. When a slot is released, queued calls of a higher
+    priority class are always admitted first: queued background work is
+    preempted by interactive calls arriving later, calls already in flight
+    are never interrupted. Slots can be reserved to a priority class, so
+    that its calls do not wait for the lower classes to finish. Within a
+    priority class, the callers (e.g. "Asker" and "Writer") share the slots
+    by weighted fair queueing, so that a bulk run of one caller cannot
+    starve the others.
+
+    Synchronous calls from several threads and asynchronous calls from
+    several event loops can share the same scheduler.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        priorities: dict[str, int] | None = None,
+        weights: dict[str, float] | None = None,
+        reserved: dict[str, int] | None = None,
+    ):
+        """Initialize the scheduler.
+
+        Parameters
+        ----------
+        max_concurrency : int | None
+            Maximum number of calls holding a slot, None for no limit.
+        priorities : dict[str, int] | None
+            Priority of each class, the lower the value the higher the
+            priority. `PRIORITIES` (interactive, background) by default.
+        weights : dict[str, float] | None
+            Share of the slots of each caller within its priority class,
+            1 for the callers not listed.
+        reserved : dict[str, int] | None
+            Number of slots of each priority class that the lower classes
+            cannot hold, none by default.
+
+        Raises
+        ------
+        ValueError: If a reserved class is unknown, or if the reserved slots
+            leave no slot to the lowest class.
+        """
+        self.max_concurrency = max_concurrency
+        self.priorities = dict(priorities or PRIORITIES)
+        self.weights = dict(weights or {})
+        self.reserved = dict(reserved or {})
+        for priority in self.reserved:
+            if priority not in self.priorities:
+                raise ValueError(f"Invalid priority: {priority}")
+        if (
+            max_concurrency is not None
+            and sum(self.reserved.values()) >= max_concurrency
+        ):
+            raise ValueError(f"Invalid reserved slots: {self.reserved}")
+        self._lock = threading.Lock()
+        self._queues = {priority: {} for priority in self.priorities}
+        self._virtual_time = {priority: 0.0 for priority in self.priorities}
+        self._finish_tags = {priority: {} for priority in self.priorities}
+        self._running = {priority: 0 for priority in self.priorities}
+        self._admitted = {priority: 0 for priority in self.priorities}
+        self._wait_time = {
+            priority: Histogram() for priority in self.priorities
+        }
+
+    def acquire(self, priority: str, caller: str = "unknown") -> float:
+        """Wait for a slot.
+
+        Parameters
+        ----------
+        priority : str
+            The priority class of the call.
+        caller : str
+            Tag of the calling component, the flow of the fair queueing.
+
+        Returns
+        -------
+        float: The time spent waiting in the queue, in seconds
+        """
+        waiter = self._enqueue(priority, caller)
+        waiter.event.wait()
+        return waiter.wait_time
+
+    async def aacquire(self, priority: str, caller: str = "unknown") -> float:
+        """Wait for a slot asynchronously, see `acquire`."""
+        waiter = self._enqueue(priority, caller, asyncio.get_running_loop())
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                admitted = waiter.admitted
+                if not admitted:
+                    self._remove(waiter)
+            if admitted:
+                self.release(priority)
+            raise
+        return waiter.wait_time
+
+    def release(self, priority: str):
+        """Release a slot and admit the next queued call, if any.
+
+        Parameters
+        ----------
+        priority : str
+            The priority class of the finished call.
+        """
+        with self._lock:
+            self._running[priority] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: str, caller: str = "unknown") -> Iterator[float]:
+        """Hold a slot for the duration of the block.
+
+        Yields
+        ------
+        float: The time spent waiting in the queue, in seconds
+        """
+        wait_time = self.acquire(priority, caller)
+        try:
+            yield wait_time
+        finally:
+            self.release(priority)
+
+    @asynccontextmanager
+    async def aslot(
+        self, priority: str, caller: str = "unknown"
+    ) -> AsyncIterator[float]:
+        """Hold a slot for the duration of the async block, see `slot`."""
+        wait_time = await self.aacquire(priority, caller)
+        try:
+            yield wait_time
+        finally:
+            self.release(priority)
+
+    def stats(self) -> dict:
+        """Get the queue depth and wait time of each priority class.
+
+        Returns
+        -------
+        dict: For each priority class, the number of queued and running
+            calls, the number of admitted calls and the p50/p95 wait time
+        """
+        with self._lock:
+            return {
+                priority: {
+                    "queued": sum(
+                        len(queue) for queue in self._queues[priority].values()
+                    ),
+                    "running": self._running[priority],
+                    "admitted": self._admitted[priority],
+                    "wait_time_p50": self._wait_time[priority].quantile(0.5),
+                    "wait_time_p95": self._wait_time[priority].quantile(0.95),
+                }
+                for priority in self.priorities
+            }
+
+    def to_prometheus(self) -> str:
+        """Render the queue metrics in the Prometheus text exposition format.
+
+        Returns
+        -------
+        str: The metrics text
+        """
+        stats = self.stats()
+        lines = []
+        gauges = [
+            (
+                "llm_scheduler_queue_depth",
+                "queued",
+                "Calls waiting for a slot",
+            ),
+            ("llm_scheduler_running", "running", "Calls holding a slot"),
+        ]
+        for name, kind, help_text in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for priority, priority_stats in stats.items():
+                lines.append(
+                    f'{name}{{priority="{priority}"}} {priority_stats[kind]}'
+                )
+        name = "llm_scheduler_wait_seconds"
+        lines.append(f"# HELP {name} Time spent waiting for a slot")
+        lines.append(f"# TYPE {name} histogram")
+        with self._lock:
+            for priority, histogram in self._wait_time.items():
+                lines.extend(
+                    _format_histogram(
+                        name, f'{{priority="{priority}"}}', histogram
+                    )
+                )
+        return "\n".join(lines) + "\n"
+
+    def _enqueue(
+        self,
+        priority: str,
+        caller: str,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ) -> _Waiter:
+        """Queue a call, it is admitted right away if a slot is free."""
+        if priority not in self.priorities:
+            raise ValueError(f"Invalid priority: {priority}")
+        waiter = _Waiter(priority, caller, loop)
+        with self._lock:
+            flows = self._queues[priority]
+            if caller not in flows:
+                # A flow becoming backlogged starts at the current virtual
+                # time, it gets no credit for the time it was idle
+                finish_tags = self._finish_tags[priority]
+                finish_tags[caller] = max(
+                    self._virtual_time[priority], finish_tags.get(caller, 0.0)
+                )
+                flows[caller] = deque()
+            flows[caller].append(waiter)
+            self._dispatch()
+        return waiter
+
+    def _remove(self, waiter: _Waiter):
+        """Remove a call that gave up before being admitted."""
+        flows = self._queues[waiter.priority]
+        queue = flows[waiter.caller]
+        queue.remove(waiter)
+        if not queue:
+            del flows[waiter.caller]
+
+    def _dispatch(self):
+        """Admit queued calls while slots are free, under the lock."""
+        while True:
+            waiter = self._pop_next()
+            if waiter is None:
+                return
+            self._running[waiter.priority] += 1
+            self._admitted[waiter.priority] += 1
+            waiter.wake()
+            self._wait_time[waiter.priority].observe(waiter.wait_time)
+
+    def _has_free_slot(self, priority: str) -> bool:
+        """Whether a call of a class can be admitted, under the lock.
+
+        The slots reserved to the higher classes are taken for it, whether
+        the higher classes use them or not.
+        """
+        if self.max_concurrency is None:
+            return True
+        taken = sum(
+            max(running, self.reserved.get(other, 0))
+            if self.priorities[other] < self.priorities[priority]
+            else running
+            for other, running in self._running.items()
+        )
+        return taken < self.max_concurrency
+
+    def _pop_next(self) -> _Waiter | None:
+        """Pop the next call: highest priority class, then fair queueing.
+
+        Each caller of a class is a flow whose virtual finish tag advances
+        by the inverse of its weight at each admission, the flow with the
+        smallest finish tag is served first. None if no call is queued or
+        if the first queued class has no free slot, then the lower classes
+        have none either.
+        """
+        for priority in sorted(self.priorities, key=self.priorities.get):
+            flows = self._queues[priority]
+            if not flows:
+                continue
+            if not self._has_free_slot(priority):
+                return None
+            finish_tags = self._finish_tags[priority]
+            best = None
+            for caller in flows:
+                start = finish_tags[caller]
+                finish = start + 1 / self.weights.get(caller, 1.0)
+                if best is None or finish < best[0]:
+                    best = (finish, start, caller)
+            finish, start, caller = best
+            self._virtual_time[priority] = start
+            finish_tags[caller] = finish
+            queue = flows[caller]
+            waiter = queue.popleft()
+            if not queue:
+                del flows[caller]
+            return waiter
+        return None
+
+
+# Shared by all the LLM instances of the process. It admits as many calls
+# as the connection pool holds, so that the per-client concurrency caps stay
+# in effect, and keeps slots for the interactive calls, so that they never
+# wait behind the background calls in flight.
+LLM_SCHEDULER = LLMScheduler(
+    max_concurrency=int(
+        os.getenv(
+            "BONBON_LLM_SCHEDULER_CONCURRENCY",
+            os.getenv("BONBON_LLM_POOL_SIZE", "20"),
+        )
+    ),
+    reserved={
+        INTERACTIVE: int(os.getenv("BONBON_LLM_INTERACTIVE_SLOTS", "2"))
+    },
+)
@@ -0,0 +1,149 @@
+"""Streaming wrappers for LLM completions.
+
+This module provides iterators over the text deltas of a completion that
+also record the time to first token, the accumulated text and the token
+usage reported by the provider.
+"""
+
+import time
+from typing import AsyncIterator, Callable, Iterator
+
+
+class _BaseTextStream:
+    """Bookkeeping shared by the sync and async text streams.
+
+    Attributes
+    ----------
+    text (str): The text received so far.
+    time_to_first_token (float | None): Seconds between the start of the
+        iteration and the first non-empty delta, None until it arrives.
+    prompt_tokens (int | None): Prompt tokens reported by the provider.
+    completion_tokens (int | None): Completion tokens reported by the
+        provider, usually with the last delta.
+    """
+
+    def __init__(
+        self,
+        on_complete: Callable[["_BaseTextStream"], None] | None = None,
+        on_error: Callable[["_BaseTextStream", Exception], None] | None = None,
+    ):
+        """Initialize the stream.
+
+        Parameters
+        ----------
+        on_complete : Callable[[_BaseTextStream], None] | None
+            Called with the stream once it is exhausted.
+        on_error : Callable[[_BaseTextStream, Exception], None] | None
+            Called with the stream and the error if the provider fails.
+        """
+        self._on_complete = on_complete
+        self._on_error = on_error
+        self._start_time = None
+        self.text = ""
+        self.time_to_first_token = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+
+    def _start(self):
+        if self._start_time is None:
+            self._start_time = time.perf_counter()
+
+    def _record(self, delta: str):
+        if delta and self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self._start_time
+        self.text += delta
+        # Providers attach the usage to a delta, see `Completion`
+        if getattr(delta, "prompt_tokens", None) is not None:
+            self.prompt_tokens = delta.prompt_tokens
+        if getattr(delta, "completion_tokens", None) is not None:
+            self.completion_tokens = delta.completion_tokens
+
+    def _complete(self):
+        if self._on_complete is not None:
+            self._on_complete(self)
+            self._on_complete = None
+
+    def _fail(self, error: Exception):
+        if self._on_error is not None:
+            self._on_error(self, error)
+            self._on_error = None
+
+
+class TextStream(_BaseTextStream):
+    """Iterator over the text deltas of a completion."""
+
+    def __init__(
+        self,
+        deltas: Iterator[str],
+        on_complete: Callable[["TextStream"], None] | None = None,
+        on_error: Callable[["TextStream", Exception], None] | None = None,
+    ):
+        """Initialize the stream.
+
+        Parameters
+        ----------
+        deltas : Iterator[str]
+            The provider iterator of text deltas.
+        on_complete : Callable[[TextStream], None] | None
+            Called with the stream once it is exhausted.
+        on_error : Callable[[TextStream, Exception], None] | None
+            Called with the stream and the error if the provider fails.
+        """
+        super().__init__(on_complete, on_error)
+        self._deltas = deltas
+
+    def __iter__(self) -> "TextStream":
+        return self
+
+    def __next__(self) -> str:
+        self._start()
+        try:
+            delta = next(self._deltas)
+        except StopIteration:
+            self._complete()
+            raise
+        except Exception as error:
+            self._fail(error)
+            raise
+        self._record(delta)
+        return delta
+
+
+class AsyncTextStream(_BaseTextStream):
+    """Asynchronous iterator over the text deltas of a completion."""
+
+    def __init__(
+        self,
+        deltas: AsyncIterator[str],
+        on_complete: Callable[["AsyncTextStream"], None] | None = None,
+        on_error: Callable[["AsyncTextStream", Exception], None] | None = None,
+    ):
+        """Initialize the stream.
+
+        Parameters
+        ----------
+        deltas : AsyncIterator[str]
+            The provider async iterator of text deltas.
+        on_complete : Callable[[AsyncTextStream], None] | None
+            Called with the stream once it is exhausted.
+        on_error : Callable[[AsyncTextStream, Exception], None] | None
+            Called with the stream and the error if the provider fails.
+        """
+        super().__init__(on_complete, on_error)
+        self._deltas = deltas
+
+    def __aiter__(self) -> "AsyncTextStream":
+        return self
+
+    async def __anext__(self) -> str:
+        self._start()
+        try:
+            delta = await self._deltas.__anext__()
+        except StopAsyncIteration:
+            self._complete()
+            raise
+        except Exception as error:
+            self._fail(error)
+            raise
+        self._record(delta)
+        return delta
@@ -1,14 +1,15 @@
 import time
 
-from bb.lib.large_language_model import LLMMistral
+from bb.lib.large_language_model import LLM_METRICS, get_llm
 
 
 def main():
-    # Test LLMMistral
-    llm = LLMMistral()
+    # Test the LLM configured by BONBON_LLM (LLMMistral by default). Use
+    # BONBON_LLM=LLMReplay to benchmark offline against a recording.
+    llm = get_llm()
     print(llm.generate_text("What is the best French cheese?"))
 
-    # Test LLMMistral speed
+    # Test LLM speed
     times = []
     for i in range(10):
         start_time = time.time()
@@ -17,7 +18,11 @@ def main():
         time_of_execution = end_time - start_time
         print(f"Time taken: {time_of_execution} seconds")
         times.append(time_of_execution)
-    print(f"LLM Mistral: Average time taken is {sum(times) / len(times)} seconds.")
+    print(
+        f"{llm.__class__.__name__}: Average time taken is "
+        f"{sum(times) / len(times)} seconds."
+    )
+    print(LLM_METRICS.to_prometheus())
 
 
 if __name__ == "__main__":
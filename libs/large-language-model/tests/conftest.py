@@ -0,0 +1,150 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from bb.lib.large_language_model import (
+    LLM,
+    LLMMetrics,
+    LLMMistral,
+    LLMScheduler,
+)
+
+
+class FakeLLM(LLM):
+    """LLM answering with the prompt, recording the provider calls."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("metrics", LLMMetrics())
+        kwargs.setdefault("scheduler", LLMScheduler())
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    def get_model(self) -> str:
+        return "fake-model"
+
+    def _generate_text(self, prompt: str, timeout: float | None = None) -> str:
+        self.prompts.append(prompt)
+        return f"Response to {prompt}"
+
+
+@pytest.fixture
+def make_llm():
+    """Create a `FakeLLM` with its own metrics and scheduler."""
+    return FakeLLM
+
+
+def make_chunk(content: str | None, usage: dict | None = None):
+    """A Mistral stream event carrying a text delta."""
+    return SimpleNamespace(
+        data=SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(**usage) if usage else None,
+        )
+    )
+
+
+class FakeEvents:
+    """Mistral stream events, usable in `with` and `async with` blocks."""
+
+    def __init__(self, events: list):
+        self.events = events
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return None
+
+    def __iter__(self):
+        return iter(self.events)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    async def __aiter__(self):
+        for event in self.events:
+            yield event
+
+
+class FakeChat:
+    """Mistral chat API answering with the prompt after `delay` seconds."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _respond(self, messages: list[dict]):
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(
+                        content=f"Response to {messages[0]['content']}"
+                    )
+                )
+            ],
+            usage=SimpleNamespace(prompt_tokens=3, completion_tokens=4),
+        )
+
+    def complete(self, model: str, messages: list[dict], **kwargs):
+        self.requests.append(kwargs)
+        time.sleep(self.delay)
+        return self._respond(messages)
+
+    async def complete_async(self, model: str, messages: list[dict], **kwargs):
+        self.requests.append(kwargs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return self._respond(messages)
+
+    def _events(self, messages: list[dict]) -> FakeEvents:
+        words = f"Response to {messages[0]['content']}".split(" ")
+        events = [make_chunk(word + " ") for word in words[:-1]]
+        events.append(make_chunk(words[-1]))
+        events.append(
+            make_chunk(None, {"prompt_tokens": 3, "completion_tokens": 4})
+        )
+        return FakeEvents(events)
+
+    def stream(self, model: str, messages: list[dict], **kwargs):
+        self.requests.append(kwargs)
+        return self._events(messages)
+
+    async def stream_async(self, model: str, messages: list[dict], **kwargs):
+        self.requests.append(kwargs)
+        return self._events(messages)
+
+
+class FakeRegistry:
+    """Client registry handing out one fake Mistral client."""
+
+    def __init__(self, delay: float = 0.0):
+        self.client = SimpleNamespace(chat=FakeChat(delay))
+
+    def get_client(self, provider: str, model: str, api_key: str):
+        return self.client
+
+    def get_async_client(self, provider: str, model: str, api_key: str):
+        return self.client
+
+
+@pytest.fixture
+def make_mistral():
+    """Create an `LLMMistral` on a fake Mistral client."""
+
+    def make_mistral(delay: float = 0.0, **kwargs) -> LLMMistral:
+        kwargs.setdefault("metrics", LLMMetrics())
+        kwargs.setdefault("scheduler", LLMScheduler())
+        return LLMMistral(registry=FakeRegistry(delay), **kwargs)
+
+    return make_mistral
@@ -0,0 +1,48 @@
+import asyncio
+
+from bb.lib.large_language_model import Completion
+
+
+def test_agenerate_text(make_llm):
+    llm = make_llm()
+    assert asyncio.run(llm.agenerate_text("prompt")) == "Response to prompt"
+    assert llm.prompts == ["prompt"]
+
+
+def test_agenerate_text_concurrently(make_llm):
+    llm = make_llm()
+
+    async def main():
+        return await asyncio.gather(
+            *(llm.agenerate_text(f"prompt {i}") for i in range(5))
+        )
+
+    assert asyncio.run(main()) == [f"Response to prompt {i}" for i in range(5)]
+
+
+def test_mistral_agenerate_text(make_mistral):
+    llm = make_mistral()
+    response = asyncio.run(llm.agenerate_text("prompt"))
+    assert response == "Response to prompt"
+    assert isinstance(response, Completion)
+    assert (response.prompt_tokens, response.completion_tokens) == (3, 4)
+
+
+def test_mistral_caps_the_requests_in_flight(make_mistral):
+    llm = make_mistral(delay=0.02, max_concurrency=2)
+
+    async def main():
+        return await asyncio.gather(
+            *(llm.agenerate_text(f"prompt {i}") for i in range(6))
+        )
+
+    responses = asyncio.run(main())
+    assert responses == [f"Response to prompt {i}" for i in range(6)]
+    assert llm.client.chat.max_in_flight == 2
+
+
+def test_mistral_sends_the_sampling_params(make_mistral):
+    llm = make_mistral(temperature=0.2, max_tokens=10)
+    asyncio.run(llm.agenerate_text("prompt"))
+    assert llm.client.chat.requests[0]["temperature"] == 0.2
+    assert llm.client.chat.requests[0]["max_tokens"] == 10
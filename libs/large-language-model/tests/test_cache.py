@@ -0,0 +1,107 @@
+import pytest
+
+from bb.lib.large_language_model import LLMCache, get_llm
+from bb.lib.large_language_model.cache import get_default_cache
+
+
+@pytest.fixture
+def cache(tmp_path) -> LLMCache:
+    return LLMCache(tmp_path / "cache.sqlite")
+
+
+def test_cache_get_and_set(cache):
+    key = LLMCache.make_key("model", "prompt", {"temperature": 0.5})
+    assert cache.get(key) is None
+    cache.set(key, "response")
+    assert cache.get(key) == "response"
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 8}
+
+
+def test_cache_key_depends_on_the_request():
+    key = LLMCache.make_key("model", "prompt")
+    assert LLMCache.make_key("model", "prompt", {}) == key
+    assert LLMCache.make_key("other", "prompt") != key
+    assert LLMCache.make_key("model", "other") != key
+    assert LLMCache.make_key("model", "prompt", {"max_tokens": 5}) != key
+
+
+def test_cache_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.time", lambda: now[0])
+    cache = LLMCache(tmp_path / "cache.sqlite", ttl=10)
+    cache.set("key", "response")
+    now[0] += 5
+    assert cache.get("key") == "response"
+    now[0] += 10
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.time", lambda: now[0])
+    cache = LLMCache(tmp_path / "cache.sqlite", max_entries=2)
+    for key in ["a", "b"]:
+        cache.set(key, key)
+        now[0] += 1
+    # "a" is used again, "b" is the least recently used
+    assert cache.get("a") == "a"
+    now[0] += 1
+    cache.set("c", "c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.get("c") == "c"
+
+
+def test_cache_max_bytes(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.time", lambda: now[0])
+    cache = LLMCache(tmp_path / "cache.sqlite", max_bytes=10)
+    for key in ["a", "b", "c"]:
+        cache.set(key, "x" * 4)
+        now[0] += 1
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+
+
+def test_llm_uses_the_cache(make_llm, cache):
+    llm = make_llm(cache=cache)
+    assert llm.generate_text("prompt") == "Response to prompt"
+    assert llm.generate_text("prompt") == "Response to prompt"
+    assert llm.prompts == ["prompt"]
+
+
+def test_llm_bypasses_the_cache(make_llm, cache):
+    llm = make_llm(cache=cache)
+    llm.generate_text("prompt")
+    llm.generate_text("prompt", use_cache=False)
+    assert llm.prompts == ["prompt", "prompt"]
+
+
+def test_llm_without_cache(make_llm):
+    llm = make_llm()
+    llm.generate_text("prompt")
+    llm.generate_text("prompt")
+    assert llm.prompts == ["prompt", "prompt"]
+
+
+@pytest.fixture
+def default_cache_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("BONBON_LLM_CACHE", str(tmp_path / "llm.sqlite"))
+    monkeypatch.setenv("BONBON_LLM_CACHE_TTL", "60")
+    get_default_cache.cache_clear()
+    yield
+    get_default_cache.cache_clear()
+
+
+def test_get_llm_uses_the_default_cache(default_cache_env):
+    llm = get_llm("LLMMistral", caller="test")
+    assert llm.cache is get_default_cache()
+    assert llm.cache.ttl == 60
+    assert get_llm("LLMMistral", cache=None).cache is None
+
+
+def test_get_llm_without_default_cache(monkeypatch):
+    monkeypatch.delenv("BONBON_LLM_CACHE", raising=False)
+    get_default_cache.cache_clear()
+    assert get_llm("LLMMistral").cache is None
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bb.lib.large_language_model import SingleFlight
+
+
+def test_do_coalesces_concurrent_calls():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn(value):
+        calls.append(value)
+        started.set()
+        release.wait()
+        return value
+
+    results = []
+
+    def run():
+        results.append(single_flight.do("key", fn, "value"))
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=run) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    # Let the followers find the call in flight
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+    assert calls == ["value"]
+    assert sorted(results) == [("value", False)] + [("value", True)] * 3
+    assert single_flight._calls == {}
+
+
+def test_do_shares_errors():
+    single_flight = SingleFlight()
+    with pytest.raises(KeyError):
+        single_flight.do("key", lambda: {}["missing"])
+    # The failed call is not kept in flight
+    assert single_flight.do("key", lambda: "value") == ("value", False)
+
+
+def test_ado_coalesces_concurrent_calls():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fn(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(
+            *[single_flight.ado("key", fn, "value") for _ in range(4)],
+            single_flight.ado("other", fn, "other"),
+        )
+
+    results = asyncio.run(main())
+    assert calls == ["value", "other"]
+    assert results == [("value", False)] + [("value", True)] * 3 + [
+        ("other", False)
+    ]
+
+
+def test_ado_shares_errors():
+    single_flight = SingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise KeyError("error")
+
+    async def main():
+        return await asyncio.gather(
+            single_flight.ado("key", fn),
+            single_flight.ado("key", fn),
+            return_exceptions=True,
+        )
+
+    leader, follower = asyncio.run(main())
+    assert isinstance(leader, KeyError) and follower is leader
+
+
+def test_ado_follower_takes_over_cancelled_leader():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(None)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.ensure_future(single_flight.ado("key", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(single_flight.ado("key", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    (result, coalesced), leader_cancelled = asyncio.run(main())
+    assert leader_cancelled
+    assert (result, coalesced) == (2, False)
+    assert len(calls) == 2
+
+
+def test_ado_cancelled_follower_keeps_the_call():
+    single_flight = SingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(single_flight.ado("key", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(single_flight.ado("key", fn))
+        await asyncio.sleep(0.005)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == ("value", False)
+
+
+def test_llm_coalesces_identical_requests(make_llm):
+    class SlowLLM(make_llm):
+        def _generate_text(self, prompt, timeout=None):
+            time.sleep(0.05)
+            return super()._generate_text(prompt, timeout)
+
+    llm = SlowLLM(single_flight=SingleFlight())
+    threads = [
+        threading.Thread(target=llm.generate_text, args=("prompt",))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert llm.prompts == ["prompt"]
+    assert sum(record.coalesced for record in llm.metrics.records) == 2
+    llm.generate_text("prompt", coalesce=False)
+    assert llm.prompts == ["prompt", "prompt"]
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from bb.lib.large_language_model import (
+    CallRecord,
+    LLMCache,
+    LLMMetrics,
+    RetryPolicy,
+)
+from bb.lib.large_language_model.metrics import Histogram
+
+
+def make_record(**kwargs) -> CallRecord:
+    kwargs.setdefault("caller", "Asker")
+    kwargs.setdefault("model", "model")
+    return CallRecord(**kwargs).finish()
+
+
+def test_histogram_quantile():
+    histogram = Histogram(buckets=(0.1, 1, 10))
+    assert histogram.quantile(0.5) is None
+    for value in [0.05, 0.5, 0.5, 5, 50]:
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 1
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_call_record_finish():
+    record = CallRecord(caller="Asker", model="model").finish()
+    assert record.wall_time >= 0
+    assert record.time_to_first_token == record.wall_time
+    failed = CallRecord(caller="Asker", model="model").finish(
+        error=KeyError("error")
+    )
+    assert failed.error == "KeyError"
+    assert failed.time_to_first_token is None
+
+
+def test_summary():
+    metrics = LLMMetrics()
+    metrics.record(make_record(prompt_tokens=10, completion_tokens=5))
+    metrics.record(make_record(prompt_tokens=20, retries=2))
+    metrics.record(make_record(cached=True))
+    metrics.record(make_record(caller="Writer", error="KeyError"))
+    summary = metrics.summary()
+    assert summary["Asker/model"]["calls"] == 3
+    assert summary["Asker/model"]["cached"] == 1
+    assert summary["Asker/model"]["retries"] == 2
+    assert summary["Asker/model"]["prompt_tokens"] == 30
+    assert summary["Asker/model"]["completion_tokens"] == 5
+    assert summary["Writer/model"]["errors"] == 1
+
+
+def test_prometheus():
+    metrics = LLMMetrics()
+    metrics.record(make_record(prompt_tokens=10))
+    metrics.record(make_record(cached=True))
+    text = metrics.to_prometheus()
+    labels = 'caller="Asker",model="model"'
+    assert f'llm_calls_total{{{labels},cached="false"}} 1' in text
+    assert f'llm_calls_total{{{labels},cached="true"}} 1' in text
+    assert f"llm_prompt_tokens_total{{{labels}}} 10" in text
+    assert f'llm_call_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"llm_call_duration_seconds_count{{{labels}}} 2" in text
+    assert "# TYPE llm_calls_total counter" in text
+
+
+def test_jsonl(tmp_path):
+    metrics = LLMMetrics(jsonl_path=tmp_path / "live.jsonl")
+    metrics.record(make_record(prompt_tokens=10))
+    metrics.record(make_record(caller="Writer"))
+    metrics.export_jsonl(tmp_path / "export.jsonl")
+    for path in [tmp_path / "live.jsonl", tmp_path / "export.jsonl"]:
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        assert [record["caller"] for record in records] == ["Asker", "Writer"]
+        assert records[0]["prompt_tokens"] == 10
+
+
+def test_max_records():
+    metrics = LLMMetrics(max_records=2)
+    for _ in range(3):
+        metrics.record(make_record())
+    assert len(metrics.records) == 2
+    assert metrics.summary()["Asker/model"]["calls"] == 3
+    metrics.reset()
+    assert metrics.summary() == {}
+
+
+def test_llm_calls_are_recorded(make_llm, tmp_path):
+    llm = make_llm(caller="Resumer", cache=LLMCache(tmp_path / "c.sqlite"))
+    llm.generate_text("prompt")
+    llm.generate_text("prompt")
+    first, second = llm.metrics.records
+    assert (first.caller, first.model) == ("Resumer", "fake-model")
+    assert not first.cached and second.cached
+    assert first.wall_time is not None
+
+
+def test_failed_calls_are_recorded(make_llm):
+    class FailingLLM(make_llm):
+        def _generate_text(self, prompt, timeout=None):
+            raise KeyError("error")
+
+    llm = FailingLLM(retry_policy=RetryPolicy(max_attempts=1))
+    with pytest.raises(KeyError):
+        llm.generate_text("prompt")
+    assert llm.metrics.records[-1].error == "KeyError"
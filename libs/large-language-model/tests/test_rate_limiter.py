@@ -0,0 +1,68 @@
+import pytest
+
+from bb.lib.large_language_model import RateLimiter
+from bb.lib.large_language_model.rate_limiter import TokenBucket
+
+
+def test_token_bucket_burst_then_wait():
+    bucket = TokenBucket(rate=2, capacity=2)
+    now = bucket.updated_at
+    assert bucket.reserve(1, now) == 0
+    assert bucket.reserve(1, now) == 0
+    # The bucket is empty, the next unit is refilled in half a second
+    assert bucket.reserve(1, now) == pytest.approx(0.5)
+    # Refilled by two units in one second
+    assert bucket.reserve(1, now + 1) == 0
+
+
+def test_token_bucket_clamps_to_its_capacity():
+    bucket = TokenBucket(rate=1, capacity=2)
+    now = bucket.updated_at
+    assert bucket.reserve(10, now + 100) == 0
+    assert bucket.level == 0
+
+
+def test_rate_limiter_requests_per_second():
+    limiter = RateLimiter(requests_per_second=2, tokens_per_minute=None)
+    waits = [limiter.reserve("prompt") for _ in range(4)]
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(0.5, abs=0.05)
+    assert waits[3] == pytest.approx(1.0, abs=0.05)
+
+
+def test_rate_limiter_tokens_per_minute():
+    limiter = RateLimiter(
+        requests_per_second=100, tokens_per_minute=600, completion_tokens=0
+    )
+    assert limiter.estimate_tokens("x" * 400) == 100
+    for _ in range(6):
+        assert limiter.reserve("x" * 400) == 0
+    # 100 tokens at 10 tokens per second
+    assert limiter.reserve("x" * 400) == pytest.approx(10, abs=0.1)
+
+
+def test_generate_many_keeps_the_prompt_order(make_llm):
+    llm = make_llm()
+    indexes = []
+    responses = llm.generate_many(
+        [f"prompt {i}" for i in range(5)],
+        callback=lambda index, response: indexes.append(index),
+    )
+    assert responses == [f"Response to prompt {i}" for i in range(5)]
+    assert sorted(indexes) == list(range(5))
+
+
+def test_generate_many_is_rate_limited(make_llm, monkeypatch):
+    limiter = RateLimiter(requests_per_second=1, tokens_per_minute=None)
+    reserved = []
+    reserve = limiter.reserve
+
+    def record_reserve(prompt: str) -> float:
+        reserved.append(reserve(prompt))
+        return 0
+
+    monkeypatch.setattr(limiter, "reserve", record_reserve)
+    llm = make_llm(rate_limiter=limiter)
+    llm.generate_many([f"prompt {i}" for i in range(3)])
+    assert len(reserved) == 3
+    assert sorted(reserved)[-1] == pytest.approx(2, abs=0.1)
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+import pytest
+
+from bb.lib.large_language_model import ClientRegistry, EventLoopThread
+
+
+def test_registry_shares_the_client():
+    registry = ClientRegistry()
+    client = registry.get_client("mistral", "model", "key")
+    assert registry.get_client("mistral", "model", "key") is client
+    assert registry.get_client("mistral", "other", "key") is not client
+
+
+def test_registry_invalid_provider():
+    with pytest.raises(ValueError):
+        ClientRegistry().get_client("invalid", "model", "key")
+
+
+def test_registry_async_clients_per_loop():
+    registry = ClientRegistry()
+
+    async def get_clients():
+        client = registry.get_async_client("mistral", "model", "key")
+        assert registry.get_async_client("mistral", "model", "key") is client
+        http_client = registry._async_http_clients[asyncio.get_running_loop()]
+        await registry.aclose_async_clients()
+        return client, http_client
+
+    first_client, first_http_client = asyncio.run(get_clients())
+    second_client, _ = asyncio.run(get_clients())
+    assert first_client is not second_client
+    assert first_http_client.is_closed
+    assert len(registry._async_http_clients) == 0
+
+
+def test_event_loop_thread_reuses_its_loop():
+    event_loop = EventLoopThread(name="test-loop")
+
+    async def get_loop():
+        return asyncio.get_running_loop()
+
+    loop = event_loop.run(get_loop())
+    assert event_loop.run(get_loop()) is loop
+    assert loop is event_loop.get_loop()
+
+
+def test_event_loop_thread_raises_the_error():
+    event_loop = EventLoopThread(name="test-loop")
+
+    async def fail():
+        raise KeyError("error")
+
+    with pytest.raises(KeyError):
+        event_loop.run(fail())
+
+
+def test_event_loop_thread_rejects_calls_from_its_thread():
+    event_loop = EventLoopThread(name="test-loop")
+
+    async def call_itself():
+        async def nothing():
+            return None
+
+        event_loop.run(nothing())
+
+    with pytest.raises(RuntimeError):
+        event_loop.run(call_itself())
+
+
+def test_generate_many_runs_on_the_shared_loop(make_llm):
+    llm = make_llm()
+    threads = set()
+
+    async def agenerate_text(prompt: str, **kwargs) -> str:
+        threads.add(threading.current_thread().name)
+        return prompt
+
+    llm.agenerate_text = agenerate_text
+    llm.generate_many(["a", "b"])
+    llm.generate_many(["c"])
+    assert threads == {"llm-event-loop"}
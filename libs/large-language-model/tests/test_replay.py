@@ -0,0 +1,157 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from bb.lib.large_language_model import (
+    DeadlineExceededError,
+    LatencyModel,
+    LLMMetrics,
+    LLMReplay,
+    RateLimitError,
+    RetryPolicy,
+    get_llm,
+)
+
+
+def write_recording(path, records: list[dict]):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = tmp_path / "recording.jsonl"
+    write_recording(
+        path,
+        [
+            {"prompt": "a", "response": "first", "latency": 0.0},
+            {"prompt": "a", "response": "second", "latency": 0.0},
+            {
+                "prompt": "b",
+                "response": "other",
+                "latency": 0.0,
+                "prompt_tokens": 5,
+                "completion_tokens": 7,
+            },
+        ],
+    )
+    return path
+
+
+def make_replay(path, **kwargs) -> LLMReplay:
+    kwargs.setdefault("metrics", LLMMetrics())
+    return LLMReplay(path, **kwargs)
+
+
+def test_record_then_replay(make_llm, tmp_path):
+    path = tmp_path / "recording.jsonl"
+    recorder = make_replay(path, mode="record", llm=make_llm())
+    assert recorder.generate_text("prompt") == "Response to prompt"
+
+    replay = make_replay(path)
+    assert replay.generate_text("prompt") == "Response to prompt"
+    assert replay.get_model() == "replay"
+
+
+def test_replay_cycles_through_the_responses(recording):
+    replay = make_replay(recording)
+    responses = [replay.generate_text("a", coalesce=False) for _ in range(3)]
+    assert responses == ["first", "second", "first"]
+
+
+def test_replay_keeps_the_usage(recording):
+    replay = make_replay(recording)
+    replay.generate_text("b")
+    record = replay.metrics.records[-1]
+    assert (record.prompt_tokens, record.completion_tokens) == (5, 7)
+
+
+def test_replay_unknown_prompt(recording):
+    with pytest.raises(KeyError):
+        make_replay(recording).generate_text("unknown")
+
+
+def test_replay_missing_recording(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        make_replay(tmp_path / "missing.jsonl")
+
+
+def test_replay_invalid_mode(recording):
+    with pytest.raises(ValueError):
+        make_replay(recording, mode="invalid")
+    with pytest.raises(ValueError):
+        make_replay(recording, mode="record")
+
+
+def test_replay_simulated_rate_limit_errors(recording):
+    replay = make_replay(
+        recording,
+        error_rate=1.0,
+        retry_policy=RetryPolicy(max_attempts=2, initial_backoff=0),
+    )
+    with pytest.raises(RateLimitError):
+        replay.generate_text("a")
+    assert replay.metrics.records[-1].retries == 1
+
+
+def test_replay_latency(recording):
+    replay = make_replay(recording, latency=LatencyModel("constant", (0.1,)))
+    start_time = time.perf_counter()
+    replay.generate_text("a")
+    assert time.perf_counter() - start_time >= 0.1
+
+
+def test_replay_latency_overlaps_in_async_calls(recording):
+    replay = make_replay(recording, latency=LatencyModel("constant", (0.1,)))
+
+    async def main():
+        await asyncio.gather(
+            *(replay.agenerate_text("a", coalesce=False) for _ in range(5))
+        )
+
+    start_time = time.perf_counter()
+    asyncio.run(main())
+    assert time.perf_counter() - start_time < 0.3
+
+
+def test_replay_timeout(recording):
+    replay = make_replay(
+        recording,
+        latency=LatencyModel("constant", (1.0,)),
+        retry_policy=RetryPolicy(deadline=0.1),
+    )
+    with pytest.raises(DeadlineExceededError):
+        replay.generate_text("a")
+
+
+@pytest.mark.parametrize(
+    "spec, distribution, params",
+    [
+        ("recorded", "recorded", ()),
+        ("constant:0.5", "constant", (0.5,)),
+        ("lognormal:-0.5,0.4", "lognormal", (-0.5, 0.4)),
+    ],
+)
+def test_latency_model_from_spec(spec, distribution, params):
+    model = LatencyModel.from_spec(spec)
+    assert (model.distribution, model.params) == (distribution, params)
+
+
+def test_latency_model_samples():
+    assert LatencyModel().sample(0.3) == 0.3
+    assert 0.2 <= LatencyModel("uniform", (0.2, 0.4), seed=0).sample() <= 0.4
+    assert LatencyModel("normal", (-10, 0.1), seed=0).sample() == 0
+    with pytest.raises(ValueError):
+        LatencyModel("invalid")
+
+
+def test_get_llm_replay(recording, monkeypatch):
+    monkeypatch.setenv("BONBON_LLM", "LLMReplay")
+    monkeypatch.setenv("BONBON_LLM_RECORDING", str(recording))
+    monkeypatch.setenv("BONBON_LLM_REPLAY_LATENCY", "constant:0")
+    llm = get_llm(caller="test", cache=None)
+    assert isinstance(llm, LLMReplay)
+    assert llm.generate_text("b") == "other"
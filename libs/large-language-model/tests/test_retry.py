@@ -0,0 +1,187 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bb.lib.large_language_model import (
+    DeadlineExceededError,
+    LLMScheduler,
+    RateLimiter,
+    RetryPolicy,
+)
+
+
+class Flaky:
+    """Callable failing `failures` times before returning "ok"."""
+
+    def __init__(self, failures: int, error: type = ConnectionError):
+        self.failures = failures
+        self.error = error
+        self.calls = []
+
+    def __call__(self, *args, **kwargs) -> str:
+        self.calls.append(kwargs)
+        if len(self.calls) <= self.failures:
+            raise self.error("failure")
+        return "ok"
+
+
+def fast_policy(**kwargs) -> RetryPolicy:
+    kwargs.setdefault("initial_backoff", 0.0)
+    return RetryPolicy(**kwargs)
+
+
+def test_call_retries_until_success():
+    fn = Flaky(failures=2)
+    retries = []
+    result = fast_policy(max_attempts=3).call(
+        fn, on_retry=lambda: retries.append(1)
+    )
+    assert result == "ok"
+    assert len(fn.calls) == 3
+    assert len(retries) == 2
+
+
+def test_call_raises_the_last_error():
+    fn = Flaky(failures=5)
+    with pytest.raises(ConnectionError):
+        fast_policy(max_attempts=3).call(fn)
+    assert len(fn.calls) == 3
+
+
+def test_call_does_not_retry_other_errors():
+    fn = Flaky(failures=1, error=KeyError)
+    with pytest.raises(KeyError):
+        fast_policy(retry_on=(ConnectionError,)).call(fn)
+    assert len(fn.calls) == 1
+
+
+def test_call_passes_the_remaining_budget():
+    fn = Flaky(failures=0)
+    fast_policy(deadline=5.0).call(fn, pass_timeout=True)
+    assert 4.9 < fn.calls[0]["timeout"] <= 5.0
+    fast_policy().call(fn, pass_timeout=True)
+    assert fn.calls[1]["timeout"] is None
+
+
+def test_call_gives_up_when_the_backoff_exceeds_the_deadline():
+    fn = Flaky(failures=1)
+    policy = RetryPolicy(deadline=0.5, initial_backoff=10, max_backoff=10)
+    policy.get_backoff = lambda attempt: 10
+    with pytest.raises(DeadlineExceededError):
+        policy.call(fn)
+    assert len(fn.calls) == 1
+
+
+def test_get_backoff_is_bounded():
+    policy = RetryPolicy(initial_backoff=1.0, max_backoff=3.0)
+    for attempt, bound in [(1, 1.0), (2, 2.0), (3, 3.0), (10, 3.0)]:
+        assert all(
+            0 <= policy.get_backoff(attempt) <= bound for _ in range(20)
+        )
+
+
+def test_hedge_delay_follows_the_latencies():
+    policy = RetryPolicy(min_hedge_delay=0.1, hedge_quantile=0.5)
+    assert policy.get_hedge_delay() == 0.1
+    for latency in [0.2, 0.4, 0.6]:
+        policy.latency_tracker.add(latency)
+    assert policy.get_hedge_delay() == 0.4
+
+
+def test_acall_cancels_the_attempt_at_the_deadline():
+    cancelled = []
+
+    async def slow(timeout=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(timeout)
+            raise
+
+    start_time = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(fast_policy(deadline=0.2).acall(slow, pass_timeout=True))
+    assert time.monotonic() - start_time < 1
+    assert len(cancelled) == 1
+
+
+def test_acall_hedges_and_cancels_the_loser():
+    attempts = []
+    cancelled = []
+
+    async def first_slow():
+        attempts.append(1)
+        try:
+            await asyncio.sleep(10 if len(attempts) == 1 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(len(attempts))
+            raise
+        return len(attempts)
+
+    policy = fast_policy(hedge=True, min_hedge_delay=0.05)
+    start_time = time.monotonic()
+    assert asyncio.run(policy.acall(first_slow)) == 2
+    assert time.monotonic() - start_time < 1
+    assert cancelled == [2]
+
+
+def test_acall_without_hedge():
+    attempts = []
+
+    async def slow():
+        attempts.append(1)
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    policy = fast_policy(hedge=True, min_hedge_delay=0.01)
+    assert asyncio.run(policy.acall(slow, allow_hedge=False)) == "ok"
+    assert len(attempts) == 1
+
+
+@pytest.fixture
+def flaky_llm(make_llm):
+    """Create an LLM whose first provider attempt fails."""
+
+    class FlakyLLM(make_llm):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.failed = threading.Event()
+
+        def _generate_text(self, prompt, timeout=None):
+            if not self.failed.is_set():
+                self.failed.set()
+                raise ConnectionError("failure")
+            return super()._generate_text(prompt, timeout)
+
+    return FlakyLLM
+
+
+def test_every_attempt_is_rate_limited(flaky_llm):
+    limiter = RateLimiter(requests_per_second=100, tokens_per_minute=None)
+    prompts = []
+    reserve = limiter.reserve
+    limiter.reserve = lambda prompt: prompts.append(prompt) or reserve(prompt)
+    llm = flaky_llm(rate_limiter=limiter, retry_policy=fast_policy())
+    assert llm.generate_text("prompt") == "Response to prompt"
+    assert prompts == ["prompt", "prompt"]
+    assert llm.metrics.records[-1].retries == 1
+
+
+def test_backoff_does_not_hold_a_slot(flaky_llm):
+    scheduler = LLMScheduler(max_concurrency=1)
+    policy = RetryPolicy(initial_backoff=0.5)
+    policy.get_backoff = lambda attempt: 0.5
+    llm = flaky_llm(scheduler=scheduler, retry_policy=policy)
+    thread = threading.Thread(target=llm.generate_text, args=("prompt",))
+    thread.start()
+    llm.failed.wait()
+    time.sleep(0.05)
+    # The only slot is free while the call waits to retry
+    start_time = time.monotonic()
+    with scheduler.slot("interactive"):
+        waited = time.monotonic() - start_time
+    thread.join()
+    assert waited < 0.3
+    assert llm.prompts == ["prompt"]
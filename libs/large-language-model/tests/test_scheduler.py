@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bb.lib.large_language_model import BACKGROUND, INTERACTIVE, LLMScheduler
+
+
+def wait_queued(scheduler: LLMScheduler, priority: str, count: int):
+    """Wait until `count` calls of a class are queued."""
+    while scheduler.stats()[priority]["queued"] < count:
+        time.sleep(0.001)
+
+
+def run_queued(
+    scheduler: LLMScheduler, calls: list[tuple[str, str]]
+) -> list[str]:
+    """Queue calls behind a held slot, return the callers in admission order.
+
+    The calls are queued one after the other while the single slot is held,
+    then admitted as the slot is released.
+    """
+    order = []
+    scheduler.acquire(BACKGROUND)
+    threads = []
+    for index, (priority, caller) in enumerate(calls):
+
+        def run(priority=priority, caller=caller):
+            with scheduler.slot(priority, caller):
+                order.append(caller)
+
+        threads.append(threading.Thread(target=run))
+        threads[-1].start()
+        queued = sum(
+            1 for other, _ in calls[: index + 1] if other == priority
+        )
+        wait_queued(scheduler, priority, queued)
+    scheduler.release(BACKGROUND)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_slots_are_bounded():
+    scheduler = LLMScheduler(max_concurrency=2)
+    in_flight = []
+    max_in_flight = []
+    lock = threading.Lock()
+
+    def run():
+        with scheduler.slot(BACKGROUND):
+            with lock:
+                in_flight.append(None)
+                max_in_flight.append(len(in_flight))
+            time.sleep(0.01)
+            with lock:
+                in_flight.pop()
+
+    threads = [threading.Thread(target=run) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(max_in_flight) == 2
+    stats = scheduler.stats()[BACKGROUND]
+    assert stats["admitted"] == 6
+    assert stats["running"] == stats["queued"] == 0
+
+
+def test_interactive_calls_preempt_queued_background_calls():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = run_queued(
+        scheduler,
+        [
+            (BACKGROUND, "Writer"),
+            (BACKGROUND, "Writer"),
+            (INTERACTIVE, "AnswerChecker"),
+        ],
+    )
+    assert order == ["AnswerChecker", "Writer", "Writer"]
+
+
+def test_fair_queueing_within_a_class():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = run_queued(
+        scheduler,
+        [(BACKGROUND, "Writer")] * 4 + [(BACKGROUND, "Asker")] * 2,
+    )
+    # The Asker is not starved by the Writer queued before it
+    assert order[:4].count("Asker") == 2
+
+
+def test_fair_queueing_weights():
+    scheduler = LLMScheduler(max_concurrency=1, weights={"Writer": 2})
+    order = run_queued(
+        scheduler,
+        [(BACKGROUND, "Writer")] * 6 + [(BACKGROUND, "Asker")] * 3,
+    )
+    assert order[:6].count("Writer") == 4
+
+
+def test_reserved_slots():
+    scheduler = LLMScheduler(max_concurrency=3, reserved={INTERACTIVE: 1})
+    scheduler.acquire(BACKGROUND)
+    scheduler.acquire(BACKGROUND)
+    thread = threading.Thread(target=scheduler.acquire, args=(BACKGROUND,))
+    thread.start()
+    wait_queued(scheduler, BACKGROUND, 1)
+    # The interactive call takes the reserved slot without waiting
+    assert scheduler.acquire(INTERACTIVE) < 0.1
+    scheduler.release(INTERACTIVE)
+    assert scheduler.stats()[BACKGROUND]["queued"] == 1
+    scheduler.release(BACKGROUND)
+    thread.join()
+    assert scheduler.stats()[BACKGROUND]["running"] == 2
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"max_concurrency": 2, "reserved": {INTERACTIVE: 2}},
+        {"max_concurrency": 2, "reserved": {"urgent": 1}},
+    ],
+)
+def test_invalid_reserved_slots(kwargs):
+    with pytest.raises(ValueError):
+        LLMScheduler(**kwargs)
+
+
+def test_invalid_priority():
+    with pytest.raises(ValueError):
+        LLMScheduler().acquire("urgent")
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    scheduler = LLMScheduler(max_concurrency=1)
+
+    async def main():
+        async with scheduler.aslot(BACKGROUND):
+            task = asyncio.ensure_future(scheduler.aacquire(BACKGROUND))
+            await asyncio.sleep(0.01)
+            assert scheduler.stats()[BACKGROUND]["queued"] == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        return scheduler.stats()[BACKGROUND]
+
+    stats = asyncio.run(main())
+    assert stats["queued"] == stats["running"] == 0
+
+
+def test_prometheus():
+    scheduler = LLMScheduler(max_concurrency=1)
+    with scheduler.slot(INTERACTIVE):
+        text = scheduler.to_prometheus()
+    assert 'llm_scheduler_running{priority="interactive"} 1' in text
+    assert 'llm_scheduler_queue_depth{priority="background"} 0' in text
+    assert 'llm_scheduler_wait_seconds_count{priority="interactive"} 1' in text
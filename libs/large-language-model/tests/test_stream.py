@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from bb.lib.large_language_model import AsyncTextStream, LLMCache, TextStream
+
+
+def test_text_stream():
+    completed = []
+    stream = TextStream(iter(["Hello", " ", "world"]), completed.append)
+    assert list(stream) == ["Hello", " ", "world"]
+    assert stream.text == "Hello world"
+    assert stream.time_to_first_token is not None
+    assert completed == [stream]
+
+
+def test_text_stream_error():
+    def deltas():
+        yield "Hello"
+        raise RuntimeError("disconnected")
+
+    errors = []
+    stream = TextStream(
+        deltas(), on_error=lambda stream, error: errors.append(error)
+    )
+    with pytest.raises(RuntimeError):
+        list(stream)
+    assert stream.text == "Hello"
+    assert [str(error) for error in errors] == ["disconnected"]
+
+
+def test_async_text_stream():
+    async def deltas():
+        for delta in ["Hello", " ", "world"]:
+            yield delta
+
+    async def main(stream):
+        return [delta async for delta in stream]
+
+    stream = AsyncTextStream(deltas())
+    assert asyncio.run(main(stream)) == ["Hello", " ", "world"]
+    assert stream.text == "Hello world"
+
+
+def test_llm_stream_yields_the_whole_response(make_llm):
+    llm = make_llm()
+    stream = llm.generate_text_stream("prompt")
+    assert list(stream) == ["Response to prompt"]
+    assert llm.metrics.records[-1].stream
+
+
+def test_mistral_stream(make_mistral):
+    llm = make_mistral()
+    stream = llm.generate_text_stream("prompt")
+    assert "".join(stream) == "Response to prompt"
+    assert (stream.prompt_tokens, stream.completion_tokens) == (3, 4)
+    record = llm.metrics.records[-1]
+    assert (record.prompt_tokens, record.completion_tokens) == (3, 4)
+
+
+def test_mistral_async_stream(make_mistral):
+    llm = make_mistral()
+
+    async def main():
+        stream = llm.agenerate_text_stream("prompt")
+        deltas = [delta async for delta in stream]
+        return deltas, stream
+
+    deltas, stream = asyncio.run(main())
+    assert len(deltas) > 1
+    assert stream.text == "Response to prompt"
+
+
+def test_stream_is_cached(make_mistral, tmp_path):
+    llm = make_mistral(cache=LLMCache(tmp_path / "cache.sqlite"))
+    assert "".join(llm.generate_text_stream("prompt")) == "Response to prompt"
+    # Served from the cache as a single delta
+    assert list(llm.generate_text_stream("prompt")) == ["Response to prompt"]
+    assert len(llm.client.chat.requests) == 1
@@ -1,6 +1,17 @@
-from bb.lib.story_graph.answer_checker import AnswerChecker
+from bb.lib.story_graph.answer_checker import AnswerChecker, AnswerVerdict
 from bb.lib.story_graph.asker import Asker
+from bb.lib.story_graph.compact import CompactStoryGraph
 from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.session import StorySession, step
 from bb.lib.story_graph.writer import Writer
 
-__all__ = ["AnswerChecker", "Asker", "StoryGraph", "Writer"]
+__all__ = [
+    "AnswerChecker",
+    "AnswerVerdict",
+    "Asker",
+    "CompactStoryGraph",
+    "StoryGraph",
+    "StorySession",
+    "Writer",
+    "step",
+]
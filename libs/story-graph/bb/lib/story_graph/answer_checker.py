@@ -1,23 +1,115 @@
 """Answer checker module for evaluating user responses.
 
 This module provides functionality to check and evaluate user answers against
-ground truth answers using LLM.
+ground truth answers. Cheap local tiers decide the obvious cases, and the LLM
+is only called when they are not confident.
 """
 
-from bb.lib.llm.llm import LLMMistral
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Literal
+
+from bb.lib.large_language_model import (
+    INTERACTIVE,
+    INTERACTIVE_RETRY_POLICY,
+    get_llm,
+)
+from bb.lib.story_graph.matching import (
+    NEGATIONS,
+    EmbeddingSimilarity,
+    get_extra_tokens,
+    get_unmatched_tokens,
+    normalize_answer,
+    token_set_ratio,
+)
+from bb.lib.story_graph.verdict_cache import (
+    VerdictCache,
+    get_default_verdict_cache,
+)
+
+# Number of verdicts decided by each tier in the process, to track how many
+# LLM calls are avoided
+TIER_COUNTS = Counter()
+_TIER_COUNTS_LOCK = threading.Lock()
+
+
+@dataclass
+class AnswerVerdict:
+    """Class representing the verdict on a listener answer.
+
+    Attributes:
+        correct (bool): Whether the listener answer is correct.
+        tier (Literal["exact", "fuzzy", "embedding", "cache", "llm"]): The
+            tier that decided the verdict.
+        score (float | None): The similarity score of the deciding tier,
+            None for the exact, cache and LLM tiers.
+    """
+
+    correct: bool
+    tier: Literal["exact", "fuzzy", "embedding", "cache", "llm"]
+    score: float | None = None
 
 
 class AnswerChecker:
     """Class for checking and evaluating user answers.
 
     This class implements methods to compare user answers with ground truth
-    answers using LLM.
+    answers, from the cheapest to the most expensive tier:
+    - "exact": the normalized answers are equal (accents, case,
+      punctuation, articles and number words are normalized)
+    - "fuzzy": the token-set similarity is high enough to accept the answer,
+      and every word and number has a counterpart in the other answer
+    - "embedding": the optional local embedding similarity is high enough to
+      accept the answer, or low enough to reject it
+    - "cache": the LLM already judged this answer to this question
+    - "llm": the LLM decides the remaining ambiguous cases
 
     """
 
-    def __init__(self) -> None:
-        """Initialize the AnswerChecker with LLM. Here we use Mistral model by default."""
-        self.llm = LLMMistral()
+    def __init__(
+        self,
+        fuzzy_threshold: float = 0.9,
+        embedding_model: str | None = None,
+        embedding_accept_threshold: float = 0.85,
+        embedding_reject_threshold: float = 0.2,
+        verdict_cache: VerdictCache | None = None,
+    ) -> None:
+        """Initialize the checker with the LLM configured by `BONBON_LLM`.
+
+        A child is waiting for the verdict, so the LLM calls use the
+        interactive retry policy: tight deadline and hedged requests.
+
+        Parameters
+        ----------
+        fuzzy_threshold (float): Token-set similarity from which an answer is
+            accepted without calling the LLM.
+        embedding_model (str | None): The sentence-transformers model of the
+            embedding tier, read from `BONBON_ANSWER_EMBEDDING_MODEL` if None.
+            The tier is disabled when no model is configured.
+        embedding_accept_threshold (float): Cosine similarity from which an
+            answer is accepted.
+        embedding_reject_threshold (float): Cosine similarity under which an
+            answer is rejected.
+        verdict_cache (VerdictCache | None): The cache of the LLM verdicts,
+            the one at `BONBON_VERDICT_CACHE` if None. Verdicts are not
+            cached when neither is set.
+        """
+        self.fuzzy_threshold = fuzzy_threshold
+        self.verdict_cache = verdict_cache or get_default_verdict_cache()
+        self.embedding_accept_threshold = embedding_accept_threshold
+        self.embedding_reject_threshold = embedding_reject_threshold
+        if embedding_model is None:
+            embedding_model = os.getenv("BONBON_ANSWER_EMBEDDING_MODEL")
+        self.embedding = (
+            EmbeddingSimilarity(embedding_model) if embedding_model else None
+        )
+        self.llm = get_llm(
+            retry_policy=INTERACTIVE_RETRY_POLICY,
+            caller="AnswerChecker",
+            priority=INTERACTIVE,
+        )
 
     def is_correct(
         self,
@@ -28,6 +120,126 @@ class AnswerChecker:
     ) -> bool:
         """Check if the listener answer is correct.
 
+        See `check` for the tiers used to decide.
+
+        Parameters
+        ----------
+        content: str, The information context.
+        question: str, The question to be answered.
+        gt_answer: str, The expected answer.
+        listener_answer: str, The listener's answer.
+
+        Returns
+        -------
+            bool: True if the listener answer is correct, False otherwise.
+        """
+        verdict = self.check(content, question, gt_answer, listener_answer)
+        return verdict.correct
+
+    def check(
+        self,
+        content: str,
+        question: str,
+        gt_answer: str,
+        listener_answer: str,
+    ) -> AnswerVerdict:
+        """Check the listener answer and report the tier that decided.
+
+        Parameters
+        ----------
+        content: str, The information context.
+        question: str, The question to be answered.
+        gt_answer: str, The expected answer.
+        listener_answer: str, The listener's answer.
+
+        Returns
+        -------
+            AnswerVerdict: The verdict and the tier that decided it.
+        """
+        verdict = self._check_locally(gt_answer, listener_answer)
+        if verdict is None:
+            verdict = self._check_with_cached_llm(
+                content, question, gt_answer, listener_answer
+            )
+        with _TIER_COUNTS_LOCK:
+            TIER_COUNTS[verdict.tier] += 1
+        return verdict
+
+    def _check_locally(
+        self, gt_answer: str, listener_answer: str
+    ) -> AnswerVerdict | None:
+        """Decide with the local tiers, None if they are not confident."""
+        gt_tokens = normalize_answer(gt_answer)
+        listener_tokens = normalize_answer(listener_answer)
+        if not listener_tokens:
+            return AnswerVerdict(False, "exact")
+        if listener_tokens == gt_tokens:
+            return AnswerVerdict(True, "exact")
+        # A negation may reverse the meaning of the expected words
+        if (set(listener_tokens) - set(gt_tokens)) & NEGATIONS:
+            return None
+        # A different number or a word without counterpart, e.g. "sept
+        # ans" for "dix-sept ans", is not a typo, the fuzzy score is too
+        # high for them to decide
+        if not (
+            get_unmatched_tokens(listener_tokens, gt_tokens)
+            or get_unmatched_tokens(gt_tokens, listener_tokens)
+        ):
+            score = token_set_ratio(listener_tokens, gt_tokens)
+            if score >= self.fuzzy_threshold:
+                return AnswerVerdict(True, "fuzzy", score)
+        if self.embedding is not None:
+            score = self.embedding.similarity(
+                " ".join(listener_tokens), " ".join(gt_tokens)
+            )
+            # An answer listing several options embeds close to each of
+            # them, only the LLM may accept it
+            if score >= self.embedding_accept_threshold and not (
+                get_extra_tokens(listener_tokens, gt_tokens)
+            ):
+                return AnswerVerdict(True, "embedding", score)
+            if score <= self.embedding_reject_threshold:
+                return AnswerVerdict(False, "embedding", score)
+        return None
+
+    def _check_with_cached_llm(
+        self,
+        content: str,
+        question: str,
+        gt_answer: str,
+        listener_answer: str,
+    ) -> AnswerVerdict:
+        """Decide with the verdict cache, or with the LLM on a cache miss.
+
+        Only the strict True/False verdicts of the LLM are cached, not the
+        default verdict given on an invalid response.
+        """
+        if self.verdict_cache is not None:
+            correct = self.verdict_cache.get(
+                content, question, gt_answer, listener_answer
+            )
+            if correct is not None:
+                return AnswerVerdict(correct, "cache")
+        correct = self._check_with_llm(
+            content, question, gt_answer, listener_answer
+        )
+        if correct is None:
+            return AnswerVerdict(True, "llm")
+        if self.verdict_cache is not None:
+            self.verdict_cache.set(
+                content, question, gt_answer, listener_answer, correct
+            )
+        return AnswerVerdict(correct, "llm")
+
+    def _check_with_llm(
+        self,
+        content: str,
+        question: str,
+        gt_answer: str,
+        listener_answer: str,
+    ) -> bool | None:
+        """Check if the listener answer is correct with the LLM.
+
         This method uses a LLM to check if the listener answer is correct. So it is
         not a perfect checker, but it is a good enough checker for our purposes.
 
@@ -40,7 +252,8 @@ class AnswerChecker:
 
         Returns
         -------
-            bool: True if the listener answer is correct, False otherwise.
+            bool | None: True if the listener answer is correct, False
+                otherwise, None if the LLM response is neither.
         """
         prompt = (
             f"The information is: {content}"
@@ -51,10 +264,8 @@ class AnswerChecker:
             f"The listener answer is correct if it is a similar answer to the expected answer."
             "Tell me if the listener answer is correct or not by answering with True or False uniquely."
         )
-        response = self.llm.generate_text(prompt).lower()
-        correct = False if response == "false" else True
-
+        response = self.llm.generate_text(prompt).strip().lower()
         if response not in ["true", "false"]:
             print(f"Invalid response from LLM: {response}, returning True by default.")
-
-        return correct
+            return None
+        return response == "true"
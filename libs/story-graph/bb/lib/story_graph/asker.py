@@ -4,11 +4,17 @@ This module provides functionality to handle questions and answers in the
 story context, including different difficulty levels and cognitive areas.
 """
 
-import time
+import asyncio
+import json
 from dataclasses import dataclass
-from typing import Literal
+from typing import Callable, Literal
 
-from bb.lib.llm.llm import LLMMistral
+from bb.lib.large_language_model import (
+    BATCH_RETRY_POLICY,
+    RateLimiter,
+    get_llm,
+    run_sync,
+)
 from rich.progress import Progress
 
 
@@ -36,10 +42,68 @@ class QuestionAnswer:
     )
 
 
+# Structured output of the batched mode: all the questions of a story
+QUESTIONS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "story_questions",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "questions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "part": {"type": "integer"},
+                            "difficulty": {"type": "string"},
+                            "question": {"type": "string"},
+                            "answer": {"type": "string"},
+                        },
+                        "required": [
+                            "part",
+                            "difficulty",
+                            "question",
+                            "answer",
+                        ],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["questions"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
 class Asker:
-    def __init__(self):
-        """Initialize the Asker with LLM. Here we use Mistral model by default."""
-        self.llm = LLMMistral()
+    def __init__(self, rate_limiter: RateLimiter | None = None):
+        """Initialize the Asker with the LLM configured by `BONBON_LLM`.
+
+        Parameters
+        ----------
+        rate_limiter (RateLimiter | None): The rate limiter of the LLM calls,
+            share it between Askers to share the budget. A limiter with the
+            default Mistral limits is created if None.
+
+        Question generation runs offline, so the LLM calls use the patient
+        batch retry policy.
+        """
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.llm = get_llm(
+            rate_limiter=rate_limiter,
+            retry_policy=BATCH_RETRY_POLICY,
+            caller="Asker",
+        )
+        self.batch_llm = get_llm(
+            rate_limiter=rate_limiter,
+            retry_policy=BATCH_RETRY_POLICY,
+            caller="Asker",
+            response_format=QUESTIONS_RESPONSE_FORMAT,
+        )
 
     def generate_questions(
         self,
@@ -48,11 +112,20 @@ class Asker:
         questions_difficulty: list[str] = ["easy", "medium", "hard"],
         age_of_the_audience: int = 6,
         language: str = "French",
+        batched: bool = False,
+        max_rounds: int = 3,
+        max_workers: int = 4,
+        max_attempts: int = 3,
+        previous_questions: dict[str, list[QuestionAnswer]] | None = None,
+        callback: Callable[[int, list[QuestionAnswer]], None] | None = None,
     ) -> list[list[QuestionAnswer]]:
         """Generate questions for each breakpoint in the story.
 
         This method splits the story into breakpoints and generates questions
         for each breakpoint. It uses the class llm model to generate the questions.
+        In incremental mode, the questions of the parts that did not change
+        since the previous graph are reused, and only the edited or new parts
+        are sent to the LLM.
 
         Parameters
         ----------
@@ -61,6 +134,24 @@ class Asker:
         questions_difficulty (list[str]): The difficulty levels of the questions to generate.
         age_of_the_audience (int): The age of the audience.
         language (str): The language of the story.
+        batched (bool): Whether to generate all the questions in a single
+            JSON-schema-constrained completion instead of one completion per
+            breakpoint and difficulty.
+        max_rounds (int): In batched mode, the maximum number of completions.
+            Each new round only asks for the missing or invalid questions.
+        max_workers (int): Otherwise, the maximum number of (breakpoint,
+            difficulty) pairs generated concurrently.
+        max_attempts (int): Otherwise, the maximum number of completions of
+            each pair, a pair whose output is invalid is asked again on its
+            own. The provider errors are retried by the LLM retry policy.
+        previous_questions (dict[str, list[QuestionAnswer]] | None): The
+            questions of a previous version of the story by part content, see
+            `StoryGraph.get_questions_by_part`. None to generate all the
+            questions.
+        callback (Callable[[int, list[QuestionAnswer]], None] | None): Called
+            with the part index and its questions as soon as all the
+            questions of a part are ready, e.g. to report progress. An error
+            raised by the callback stops the generation.
 
         Returns
         -------
@@ -68,37 +159,391 @@ class Asker:
             Each inner list contains QuestionAnswer objects for a specific breakpoint.
 
         Raises:
-            ValueError: If the output does not contain double pipes ||.
+            ValueError: If outputs still do not contain double pipes || after
+                `max_attempts` attempts, or in batched mode if questions are
+                still missing after `max_rounds` completions, or if
+                `max_workers` or `max_attempts` is lower than 1.
+        """
+        if max_workers < 1:
+            raise ValueError(f"Invalid max_workers: {max_workers}")
+        if max_attempts < 1:
+            raise ValueError(f"Invalid max_attempts: {max_attempts}")
+        parts = story.split(breakpoint_symbol)[:-1]
+        all_questions = [
+            self._get_previous_questions(
+                part, questions_difficulty, previous_questions
+            )
+            for part in parts
+        ]
+        changed = [
+            i for i, questions in enumerate(all_questions) if questions is None
+        ]
+        if previous_questions is not None:
+            print(
+                f"Reusing the questions of {len(parts) - len(changed)}/"
+                f"{len(parts)} unchanged parts"
+            )
+        if callback is not None:
+            for i, questions in enumerate(all_questions):
+                if questions is not None:
+                    callback(i, questions)
+        if not changed:
+            return all_questions
+
+        changed_parts = [parts[i] for i in changed]
+        part_callback = None
+        if callback is not None:
+
+            def part_callback(j: int, questions: list[QuestionAnswer]):
+                callback(changed[j], questions)
+
+        if batched:
+            new_questions = self._generate_questions_batched(
+                changed_parts,
+                questions_difficulty,
+                age_of_the_audience,
+                language,
+                max_rounds,
+                part_callback,
+            )
+        else:
+            new_questions = run_sync(
+                self._agenerate_questions_concurrently(
+                    changed_parts,
+                    questions_difficulty,
+                    age_of_the_audience,
+                    language,
+                    max_workers,
+                    max_attempts,
+                    part_callback,
+                )
+            )
+        for i, questions in zip(changed, new_questions):
+            all_questions[i] = questions
+        return all_questions
+
+    @staticmethod
+    def _get_previous_questions(
+        part: str,
+        questions_difficulty: list[str],
+        previous_questions: dict[str, list[QuestionAnswer]] | None,
+    ) -> list[QuestionAnswer] | None:
+        """Get the reusable questions of a part, by order of difficulty.
+
+        Returns
+        -------
+        list[QuestionAnswer] | None: The previous questions, None if the part
+            changed or misses a difficulty level.
         """
-        splits = story.split(breakpoint_symbol)
-        all_questions = []
+        if previous_questions is None:
+            return None
+        by_difficulty = {
+            question.difficulty: question
+            for question in previous_questions.get(part.strip(), [])
+        }
+        if any(
+            difficulty not in by_difficulty
+            for difficulty in questions_difficulty
+        ):
+            return None
+        return [
+            by_difficulty[difficulty] for difficulty in questions_difficulty
+        ]
+
+    async def _agenerate_questions_concurrently(
+        self,
+        parts: list[str],
+        questions_difficulty: list[str],
+        age_of_the_audience: int,
+        language: str,
+        max_workers: int,
+        max_attempts: int,
+        callback: Callable[[int, list[QuestionAnswer]], None] | None = None,
+    ) -> list[list[QuestionAnswer]]:
+        """Generate the question of each part and difficulty concurrently.
+
+        A pair whose output is invalid is asked again on its own, the other
+        pairs are not affected. An error raised by the callback stops the pairs
+        that are not started yet and is raised again.
+
+        Parameters
+        ----------
+        parts (list[str]): The story parts followed by a breakpoint.
+        questions_difficulty (list[str]): The difficulty levels.
+        age_of_the_audience (int): The age of the audience.
+        language (str): The language of the story.
+        max_workers (int): The maximum number of pairs generated at once.
+        max_attempts (int): The maximum number of completions of each pair.
+        callback (Callable[[int, list[QuestionAnswer]], None] | None): Called
+            with the part index and its questions when a part is complete.
+
+        Returns
+        -------
+        list[list[QuestionAnswer]]: The questions of each part, in the order
+            of `questions_difficulty`.
+
+        Raises:
+            ValueError: If pairs still fail, e.g. with an invalid output after
+                `max_attempts` completions.
+        """
+        semaphore = asyncio.Semaphore(max_workers)
+        part_questions = [{} for _ in parts]
+        callback_errors = []
+
+        def on_question(i: int, difficulty: str, question: QuestionAnswer):
+            part_questions[i][difficulty] = question
+            if callback is None:
+                return
+            if len(part_questions[i]) < len(questions_difficulty):
+                return
+            try:
+                callback(
+                    i,
+                    [
+                        part_questions[i][level]
+                        for level in questions_difficulty
+                    ],
+                )
+            except Exception as error:
+                callback_errors.append(error)
+                raise
+
+        async def generate(i: int, difficulty: str) -> QuestionAnswer:
+            prompt = self._make_question_prompt(
+                parts[i], difficulty, age_of_the_audience, language
+            )
+            async with semaphore:
+                if callback_errors:
+                    raise callback_errors[0]
+                for attempt in range(max_attempts):
+                    # The provider errors are retried by the retry policy of
+                    # the LLM, only an invalid output is asked again here. A
+                    # new attempt must not be answered by the cache.
+                    output = await self.llm.agenerate_text(
+                        prompt, use_cache=attempt == 0
+                    )
+                    try:
+                        question = self._parse_question_output(
+                            output, difficulty
+                        )
+                    except ValueError as error:
+                        if attempt == max_attempts - 1:
+                            raise
+                        print(f"Asking again part {i}, {difficulty}: {error}")
+                    else:
+                        progress.update(task, advance=1)
+                        on_question(i, difficulty, question)
+                        return question
+
+        pairs = [
+            (i, difficulty)
+            for i in range(len(parts))
+            for difficulty in questions_difficulty
+        ]
         with Progress() as progress:
-            task = progress.add_task("Generating questions...", total=len(splits) - 1)
-            for i in range(len(splits) - 1):
-                questions = []
-                for difficulty in questions_difficulty:
-                    prompt = (
-                        f"Generate a question based on the story: {splits[i]}."
-                        f"The question should be at the difficulty level: {difficulty}."
-                        f"The question should be in the language: {language}."
-                        f"The question should be adapted for a {age_of_the_audience} years old."
-                        "Ask a question not a riddle. The goal is to develop the child's "
-                        "intelligence in different cognitive skills."
-                        "The question should be related to the story and have the answer in the story."
-                        "The format of the output should be question and the answer separated by double pipes ||, like this: what is the color of the cat? || orange"
+            task = progress.add_task(
+                "Generating questions...", total=len(pairs)
+            )
+            results = await asyncio.gather(
+                *(generate(i, difficulty) for i, difficulty in pairs),
+                return_exceptions=True,
+            )
+
+        if callback_errors:
+            raise callback_errors[0]
+        failed = [
+            pair
+            for pair, result in zip(pairs, results)
+            if isinstance(result, Exception)
+        ]
+        if failed:
+            error = next(r for r in results if isinstance(r, Exception))
+            raise ValueError(
+                f"Failed to generate the questions of: {failed}"
+            ) from error
+        n_difficulties = len(questions_difficulty)
+        return [
+            results[i * n_difficulties : (i + 1) * n_difficulties]
+            for i in range(len(parts))
+        ]
+
+    @staticmethod
+    def _make_question_prompt(
+        part: str, difficulty: str, age_of_the_audience: int, language: str
+    ) -> str:
+        """Make the prompt asking for one question on a story part."""
+        return (
+            f"Generate a question based on the story: {part}."
+            f"The question should be at the difficulty level: {difficulty}."
+            f"The question should be in the language: {language}."
+            "The question should be adapted for a "
+            f"{age_of_the_audience} years old."
+            "Ask a question not a riddle. The goal is to develop the child's "
+            "intelligence in different cognitive skills."
+            "The question should be related to the story and have the answer "
+            "in the story."
+            "The format of the output should be question and the answer "
+            "separated by double pipes ||, like this: what is the color of "
+            "the cat? || orange"
+        )
+
+    @staticmethod
+    def _parse_question_output(output: str, difficulty: str) -> QuestionAnswer:
+        """Parse a "question || answer" completion.
+
+        Raises:
+            ValueError: If the output does not contain double pipes ||.
+        """
+        if "||" not in output:
+            raise ValueError(
+                f"Output does not contain double pipes ||: {output}"
+            )
+        question = output.split("||")[0]
+        answer = output.split("||")[1]
+        return QuestionAnswer(question, answer, difficulty)
+
+    def _generate_questions_batched(
+        self,
+        parts: list[str],
+        questions_difficulty: list[str],
+        age_of_the_audience: int,
+        language: str,
+        max_rounds: int,
+        callback: Callable[[int, list[QuestionAnswer]], None] | None = None,
+    ) -> list[list[QuestionAnswer]]:
+        """Generate the questions of all the story parts in one completion.
+
+        The completion is validated entry by entry, and only the missing or
+        invalid entries are requested again in the next round.
+
+        Parameters
+        ----------
+        parts (list[str]): The story parts followed by a breakpoint.
+        questions_difficulty (list[str]): The difficulty levels.
+        age_of_the_audience (int): The age of the audience.
+        language (str): The language of the story.
+        max_rounds (int): The maximum number of completions.
+        callback (Callable[[int, list[QuestionAnswer]], None] | None): Called
+            with the part index and its questions when a part is complete.
+
+        Returns
+        -------
+        list[list[QuestionAnswer]]: The questions of each part, in the order
+            of `questions_difficulty`.
+
+        Raises:
+            ValueError: If questions are still missing after `max_rounds`
+                completions.
+        """
+        missing = [
+            (i, difficulty)
+            for i in range(len(parts))
+            for difficulty in questions_difficulty
+        ]
+        questions = {}
+        for round_index in range(max_rounds):
+            prompt = self._make_batched_prompt(
+                parts, missing, age_of_the_audience, language
+            )
+            # A retried prompt must not be answered by the cached response
+            output = self.batch_llm.generate_text(
+                prompt, use_cache=round_index == 0
+            )
+            questions.update(self._parse_batched_output(output, missing))
+            completed = sorted(
+                {
+                    i
+                    for i, _ in missing
+                    if all(
+                        (i, difficulty) in questions
+                        for difficulty in questions_difficulty
                     )
-                    output = self.llm.generate_text(prompt)
-                    if "||" not in output:
-                        print(output)
-                        raise ValueError("Output does contain double pipes ||")
-                    question = output.split("||")[0]
-                    answer = output.split("||")[1]
-
-                    # wait 1 second to avoid rate limit
-                    # TODO remove this because it is scrappy
-                    time.sleep(1)
-
-                    questions.append(QuestionAnswer(question, answer, difficulty))
-                all_questions.append(questions)
-                progress.update(task, advance=1)
-        return all_questions
+                }
+            )
+            missing = [pair for pair in missing if pair not in questions]
+            if callback is not None:
+                for i in completed:
+                    callback(
+                        i,
+                        [
+                            questions[(i, difficulty)]
+                            for difficulty in questions_difficulty
+                        ],
+                    )
+            if not missing:
+                break
+        if missing:
+            raise ValueError(
+                f"Missing questions after {max_rounds} rounds: {missing}"
+            )
+        return [
+            [questions[(i, difficulty)] for difficulty in questions_difficulty]
+            for i in range(len(parts))
+        ]
+
+    @staticmethod
+    def _make_batched_prompt(
+        parts: list[str],
+        pairs: list[tuple[int, str]],
+        age_of_the_audience: int,
+        language: str,
+    ) -> str:
+        """Make the prompt asking for the questions of the given pairs."""
+        part_indices = sorted({i for i, _ in pairs})
+        story_parts = "\n".join(f"Part {i}: {parts[i]}" for i in part_indices)
+        requested = "\n".join(
+            f"- part {i}, difficulty {difficulty}" for i, difficulty in pairs
+        )
+        return (
+            f"Here are parts of a story:\n{story_parts}\n"
+            "Generate one question for each of the following parts and "
+            f"difficulty levels:\n{requested}\n"
+            f"The questions should be in the language: {language}."
+            "The questions should be adapted for a "
+            f"{age_of_the_audience} years old."
+            "Ask questions not riddles. The goal is to develop the child's "
+            "intelligence in different cognitive skills."
+            "Each question should be related to its part of the story and "
+            "have the answer in this part."
+            "The output should be a JSON object with a list of questions, "
+            "each with its part number, difficulty, question and answer."
+        )
+
+    @staticmethod
+    def _parse_batched_output(
+        output: str, pairs: list[tuple[int, str]]
+    ) -> dict[tuple[int, str], QuestionAnswer]:
+        """Validate a batched completion into questions.
+
+        Entries that are malformed, empty, not requested or duplicated are
+        dropped, so that they are requested again.
+
+        Returns
+        -------
+        dict[tuple[int, str], QuestionAnswer]: The valid questions, by part
+            index and difficulty.
+        """
+        try:
+            entries = json.loads(output)["questions"]
+        except (ValueError, TypeError, KeyError):
+            return {}
+        if not isinstance(entries, list):
+            return {}
+        requested = set(pairs)
+        questions = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            pair = (entry.get("part"), entry.get("difficulty"))
+            question = entry.get("question")
+            answer = entry.get("answer")
+            if pair not in requested or pair in questions:
+                continue
+            if not isinstance(question, str) or not isinstance(answer, str):
+                continue
+            if not question.strip() or not answer.strip():
+                continue
+            questions[pair] = QuestionAnswer(
+                question.strip(), answer.strip(), pair[1]
+            )
+        return questions
@@ -0,0 +1,278 @@
+"""Binary story graph format module.
+
+This module provides a compact on-disk format for story graphs, read by
+memory map. The file starts with a fixed-size header and an index of the
+nodes sorted by id, followed by one record per node holding the node and
+its routing entry. Opening a graph only reads the header; a node is found by
+a binary search in the index and decoded when it is first accessed, so large
+story libraries are opened at once and only the visited nodes are loaded.
+
+Layout (little-endian):
+
+    header   magic "BBSG", version, flags, node count, meta offset and
+             length, index offset
+    index    per node, sorted by id: id offset and length, record offset
+             and length
+    ids      the UTF-8 node ids
+    meta     JSON object with the language of the story
+    records  per node, compact JSON object {"node": ..., "routing": ...}
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import Iterator, Mapping, MutableMapping
+from pathlib import Path
+
+from bb.lib.story_graph.utils import QuestionNode, StoryNode
+
+MAGIC = b"BBSG"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQIQ")
+INDEX_ENTRY = struct.Struct("<QHQI")
+
+
+def is_binary_graph(filename: str | Path) -> bool:
+    """Whether a file is a story graph in the binary format."""
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_binary_graph(
+    filename: str | Path,
+    nodes: dict[str, dict],
+    language: str | None,
+    routing: dict[str, dict],
+):
+    """Write a story graph in the binary format.
+
+    Parameters
+    ----------
+    filename (str | Path): The file to write.
+    nodes (dict[str, dict]): The node dictionaries by id, see
+        `StoryNode.to_dict`.
+    language (str | None): The language of the story.
+    routing (dict[str, dict]): The routing entry of each node id, see
+        `StoryGraph.compile_routing`.
+
+    The graph is written to a temporary file replacing the file at the end,
+    so that a reader mapping the previous file keeps reading it whole.
+    """
+    node_ids = sorted(nodes, key=lambda node_id: node_id.encode("utf-8"))
+    encoded_ids = [node_id.encode("utf-8") for node_id in node_ids]
+    records = [
+        json.dumps(
+            {"node": nodes[node_id], "routing": routing.get(node_id)},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        for node_id in node_ids
+    ]
+    meta = json.dumps({"language": language}).encode("utf-8")
+
+    index_offset = HEADER.size
+    ids_offset = index_offset + INDEX_ENTRY.size * len(node_ids)
+    meta_offset = ids_offset + sum(
+        len(encoded_id) for encoded_id in encoded_ids
+    )
+    record_offset = meta_offset + len(meta)
+
+    index = bytearray()
+    id_offset = ids_offset
+    for encoded_id, record in zip(encoded_ids, records):
+        index += INDEX_ENTRY.pack(
+            id_offset, len(encoded_id), record_offset, len(record)
+        )
+        id_offset += len(encoded_id)
+        record_offset += len(record)
+
+    folder = Path(filename).resolve().parent
+    fd, tmp_path = tempfile.mkstemp(
+        dir=folder, prefix=".graph-", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    0,
+                    len(node_ids),
+                    meta_offset,
+                    len(meta),
+                    index_offset,
+                )
+            )
+            f.write(index)
+            f.writelines(encoded_ids)
+            f.write(meta)
+            f.writelines(records)
+        # mkstemp creates the file readable by its owner only
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class BinaryGraphReader:
+    """Memory-mapped reader of a binary story graph.
+
+    The reader can be pickled and deep-copied, the copy maps the file again.
+    """
+
+    def __init__(self, filename: str | Path):
+        """Map a binary story graph and read its header.
+
+        Parameters
+        ----------
+        filename (str | Path): The binary story graph file.
+
+        Raises
+        ------
+        ValueError: If the file is not a binary story graph of a known
+            version.
+        """
+        self.filename = Path(filename)
+        with open(self.filename, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            _,
+            self.node_count,
+            meta_offset,
+            meta_length,
+            self._index_offset,
+        ) = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Invalid binary story graph: {self.filename}")
+        if version != VERSION:
+            raise ValueError(f"Invalid binary story graph version: {version}")
+        meta = json.loads(
+            self._buffer[meta_offset : meta_offset + meta_length]
+        )
+        self.language = meta["language"]
+
+    def __getstate__(self) -> dict:
+        return {"filename": self.filename}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["filename"])
+
+    def _get_entry(self, position: int) -> tuple[int, int, int, int]:
+        return INDEX_ENTRY.unpack_from(
+            self._buffer, self._index_offset + position * INDEX_ENTRY.size
+        )
+
+    def _get_id(self, position: int) -> bytes:
+        id_offset, id_length, _, _ = self._get_entry(position)
+        return self._buffer[id_offset : id_offset + id_length]
+
+    def find(self, node_id: str) -> int | None:
+        """Get the position of a node by binary search, None if unknown."""
+        key = node_id.encode("utf-8")
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_id(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.node_count and self._get_id(low) == key:
+            return low
+        return None
+
+    def ids(self) -> Iterator[str]:
+        """Iterate on the node ids, in index order."""
+        for position in range(self.node_count):
+            yield self._get_id(position).decode("utf-8")
+
+    def read_record(self, node_id: str) -> dict:
+        """Decode the record of a node.
+
+        Raises
+        ------
+        KeyError: If the node is unknown.
+        """
+        position = self.find(node_id)
+        if position is None:
+            raise KeyError(node_id)
+        _, _, record_offset, record_length = self._get_entry(position)
+        return json.loads(
+            self._buffer[record_offset : record_offset + record_length]
+        )
+
+
+class LazyNodes(MutableMapping):
+    """Nodes of a binary story graph, decoded on first access.
+
+    Nodes set or deleted after loading are kept in memory on top of the file.
+    """
+
+    def __init__(self, reader: BinaryGraphReader):
+        self.reader = reader
+        self._nodes: dict[str, StoryNode | QuestionNode] = {}
+        self._deleted: set[str] = set()
+
+    def __getitem__(self, node_id: str) -> StoryNode | QuestionNode:
+        if node_id in self._nodes:
+            return self._nodes[node_id]
+        if node_id in self._deleted:
+            raise KeyError(node_id)
+        node_dict = self.reader.read_record(node_id)["node"]
+        if node_dict["type"] == "QuestionNode":
+            node = QuestionNode.from_dict(node_dict)
+        else:
+            node = StoryNode.from_dict(node_dict)
+        self._nodes[node_id] = node
+        return node
+
+    def __setitem__(self, node_id: str, node: StoryNode | QuestionNode):
+        self._deleted.discard(node_id)
+        self._nodes[node_id] = node
+
+    def __delitem__(self, node_id: str):
+        if node_id not in self:
+            raise KeyError(node_id)
+        self._nodes.pop(node_id, None)
+        self._deleted.add(node_id)
+
+    def __contains__(self, node_id: object) -> bool:
+        if node_id in self._nodes:
+            return True
+        if not isinstance(node_id, str) or node_id in self._deleted:
+            return False
+        return self.reader.find(node_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for node_id in self.reader.ids():
+            if node_id not in self._deleted:
+                yield node_id
+        for node_id in self._nodes:
+            if self.reader.find(node_id) is None:
+                yield node_id
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class LazyRouting(Mapping):
+    """Routing table of a binary story graph, decoded on each access."""
+
+    def __init__(self, reader: BinaryGraphReader):
+        self.reader = reader
+
+    def __getitem__(self, node_id: str) -> dict:
+        entry = self.reader.read_record(node_id)["routing"]
+        if entry is None:
+            raise KeyError(node_id)
+        return entry
+
+    def __iter__(self) -> Iterator[str]:
+        return self.reader.ids()
+
+    def __len__(self) -> int:
+        return self.reader.node_count
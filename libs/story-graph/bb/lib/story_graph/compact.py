@@ -0,0 +1,302 @@
+"""Compact story graph module.
+
+This module provides a read-only, indexed representation of a story graph
+for playing stories. Node ids are interned to integers, the node fields are
+stored column by column, the children and parents of the nodes are stored
+as CSR adjacency arrays, and the questions of each story node are indexed
+once in routing order, so that finding the next question is a short scan of
+a precomputed list instead of a rebuild of difficulty lists.
+"""
+
+import sys
+from array import array
+
+from bb.lib.story_graph.utils import QuestionNode, StoryNode
+
+# Routing order of the questions, the hardest first
+DIFFICULTY_ORDER = ("hard", "medium", "easy")
+
+STORY = 0
+QUESTION = 1
+
+# Index returned when there is no node
+NO_NODE = -1
+
+
+class CompactStoryGraph:
+    """Read-only story graph with integer node ids and array storage.
+
+    It has the reading and routing API of `StoryGraph` (`language`,
+    `get_node`, `get_next_question_node_id`, `route`, `get_failed_bit`,
+    `get_next_story_node_id`), so that the story player can use either.
+    The nodes returned by `get_node` are built on demand from the arrays.
+    """
+
+    __slots__ = (
+        "language",
+        "ids",
+        "index",
+        "kinds",
+        "contents",
+        "answers",
+        "difficulties",
+        "cognitive_areas",
+        "summaries",
+        "child_offsets",
+        "child_indices",
+        "parent_offsets",
+        "parent_indices",
+        "question_offsets",
+        "question_indices",
+        "_graph_nodes",
+    )
+
+    def __init__(self, story_dict: dict):
+        """Build the compact graph from a story dict.
+
+        Parameters
+        ----------
+        story_dict (dict): The nodes and the language of the story graph, see
+            `StoryGraph.get_story_dict`.
+
+        Raises
+        ------
+        ValueError: If a node type, a difficulty or an edge is invalid.
+        """
+        self.language = story_dict["language"]
+        self._graph_nodes = None
+        nodes = list(story_dict["nodes"].values())
+        self.ids = [sys.intern(node["id"]) for node in nodes]
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.kinds = array("b")
+        self.difficulties = array("b")
+        self.contents = []
+        self.answers = []
+        self.cognitive_areas = []
+        self.summaries = [node.get("summary") for node in nodes]
+        for node in nodes:
+            if node["type"] == "StoryNode":
+                self.kinds.append(STORY)
+                self.difficulties.append(-1)
+                self.answers.append(None)
+                self.cognitive_areas.append(None)
+            elif node["type"] == "QuestionNode":
+                if node["difficulty"] not in DIFFICULTY_ORDER:
+                    raise ValueError(
+                        f"Invalid difficulty: {node['difficulty']}"
+                    )
+                self.kinds.append(QUESTION)
+                self.difficulties.append(
+                    DIFFICULTY_ORDER.index(node["difficulty"])
+                )
+                self.answers.append(node["answer"])
+                self.cognitive_areas.append(node["cognitive_area"])
+            else:
+                raise ValueError(f"Invalid node type: {node['type']}")
+            self.contents.append(node["content"])
+
+        self.child_offsets, self.child_indices = self._to_csr(
+            [node["children"] for node in nodes]
+        )
+        self.parent_offsets, self.parent_indices = self._to_csr(
+            [node["parents"] for node in nodes]
+        )
+        # Questions of each story node in routing order, stable within a
+        # difficulty so that the first generated question is asked first
+        self.question_offsets, self.question_indices = self._to_csr(
+            [
+                sorted(
+                    (
+                        child_id
+                        for child_id in node["children"]
+                        if self.kinds[self.index[child_id]] == QUESTION
+                    ),
+                    key=lambda child_id: self.difficulties[
+                        self.index[child_id]
+                    ],
+                )
+                if node["type"] == "StoryNode"
+                else []
+                for node in nodes
+            ]
+        )
+
+    @classmethod
+    def from_graph(cls, story_graph) -> "CompactStoryGraph":
+        """Build the compact graph of a `StoryGraph`."""
+        return cls(story_graph.get_story_dict())
+
+    def _to_csr(self, neighbors: list[list[str]]) -> tuple[array, array]:
+        """Convert neighbor id lists into CSR offsets and indices."""
+        offsets = array("i", [0])
+        indices = array("i")
+        for node_ids in neighbors:
+            for node_id in node_ids:
+                if node_id not in self.index:
+                    raise ValueError(
+                        f"Invalid edge to unknown node: {node_id}"
+                    )
+                indices.append(self.index[node_id])
+            offsets.append(len(indices))
+        return offsets, indices
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get_index(self, node_id: str) -> int:
+        """Get the integer id of a node."""
+        return self.index[node_id]
+
+    def get_children(self, i: int) -> array:
+        """Get the integer ids of the children of a node."""
+        return self.child_indices[
+            self.child_offsets[i] : self.child_offsets[i + 1]
+        ]
+
+    def get_parents(self, i: int) -> array:
+        """Get the integer ids of the parents of a node."""
+        return self.parent_indices[
+            self.parent_offsets[i] : self.parent_offsets[i + 1]
+        ]
+
+    def get_questions(self, i: int) -> array:
+        """Get the questions of a story node in routing order.
+
+        For a question node, the questions of its story node are returned.
+        """
+        if self.kinds[i] == QUESTION:
+            i = self.parent_indices[self.parent_offsets[i]]
+        return self.question_indices[
+            self.question_offsets[i] : self.question_offsets[i + 1]
+        ]
+
+    def next_question(self, i: int, passed: set[int] | None = None) -> int:
+        """Get the next question to ask from a node.
+
+        Parameters
+        ----------
+        i (int): The integer id of a story node, or of a question node that
+            was answered incorrectly.
+        passed (set[int] | None): The integer ids of the questions to pass.
+
+        Returns
+        -------
+        int: The integer id of the hardest question not passed, `NO_NODE` if
+            all the questions are passed.
+        """
+        if self.kinds[i] == QUESTION:
+            i = self.parent_indices[self.parent_offsets[i]]
+        for j in range(self.question_offsets[i], self.question_offsets[i + 1]):
+            question = self.question_indices[j]
+            if not passed or question not in passed:
+                return question
+        return NO_NODE
+
+    def route(self, node_id: str, failed_mask: int = 0) -> str | None:
+        """Get the next question of a node, see `StoryGraph.route`.
+
+        Parameters
+        ----------
+        node_id (str): The id of a story node, or of a question node that was
+            answered incorrectly.
+        failed_mask (int): The bits of the failed questions of the chain,
+            see `get_failed_bit`.
+
+        Returns
+        -------
+        str | None: The id of the next question node or None if all the
+            questions failed.
+        """
+        questions = self.get_questions(self.index[node_id])
+        bit = (~failed_mask & (failed_mask + 1)).bit_length() - 1
+        if bit < len(questions):
+            return self.ids[questions[bit]]
+        return None
+
+    def get_failed_bit(self, question_id: str) -> int:
+        """Get the bit of a question in the mask of the failed questions."""
+        i = self.index[question_id]
+        return 1 << self.get_questions(i).index(i)
+
+    def get_next_story_node_id(self, node_id: str) -> str | None:
+        """Get the story node following a node, None at the end."""
+        i = self.index[node_id]
+        if self.kinds[i] == STORY:
+            questions = self.get_questions(i)
+            if len(questions) == 0:
+                return None
+            i = questions[0]
+        return self.ids[self.child_indices[self.child_offsets[i]]]
+
+    def is_question(self, node_id: str) -> bool:
+        """Whether a node is a question node."""
+        return self.kinds[self.index[node_id]] == QUESTION
+
+    def get_node(self, node_id: str) -> StoryNode | QuestionNode:
+        """Get a node, built from the arrays.
+
+        Parameters
+        ----------
+        node_id (str): The id of the node.
+
+        Returns
+        -------
+        StoryNode | QuestionNode: The node.
+        """
+        i = self.index[node_id]
+        children = [self.ids[j] for j in self.get_children(i)]
+        parents = [self.ids[j] for j in self.get_parents(i)]
+        if self.kinds[i] == STORY:
+            return StoryNode(
+                node_id,
+                self.contents[i],
+                children,
+                parents,
+                summary=self.summaries[i],
+            )
+        return QuestionNode(
+            id=node_id,
+            content=self.contents[i],
+            answer=self.answers[i],
+            difficulty=DIFFICULTY_ORDER[self.difficulties[i]],
+            cognitive_area=self.cognitive_areas[i],
+            children=children,
+            parents=parents,
+        )
+
+    def get_next_question_node_id(
+        self, node_id: str, question_to_pass: list[str] | None = None
+    ) -> str | None:
+        """Get the next question node id.
+
+        See `StoryGraph.get_next_question_node_id`.
+
+        Parameters
+        ----------
+        node_id (str): The id of a story node, or of a question node that was
+            answered incorrectly.
+        question_to_pass (list[str]): The list of question ids to pass.
+
+        Returns
+        -------
+        str | None: The id of the next question node or None if there are
+            no more question nodes.
+        """
+        passed = None
+        if question_to_pass:
+            passed = {
+                self.index[question_id] for question_id in question_to_pass
+            }
+        question = self.next_question(self.index[node_id], passed)
+        if question == NO_NODE:
+            return None
+        return self.ids[question]
+
+    @property
+    def graph_nodes(self) -> dict[str, StoryNode | QuestionNode]:
+        """All the nodes by id, built on the first access."""
+        if self._graph_nodes is None:
+            self._graph_nodes = {
+                node_id: self.get_node(node_id) for node_id in self.ids
+            }
+        return self._graph_nodes
@@ -5,13 +5,29 @@ as well as to start and continue story interactions.
 """
 
 import json
+from collections.abc import Mapping, MutableMapping
 from typing import Literal
 
 import matplotlib.pyplot as plt
 import networkx as nx
 from bb.lib.story_graph.answer_checker import AnswerChecker
 from bb.lib.story_graph.asker import QuestionAnswer
+from bb.lib.story_graph.binary import (
+    BinaryGraphReader,
+    LazyNodes,
+    LazyRouting,
+    is_binary_graph,
+    write_binary_graph,
+)
+from bb.lib.story_graph.compact import DIFFICULTY_ORDER, CompactStoryGraph
 from bb.lib.story_graph.resumer import Resumer
+from bb.lib.story_graph.session import (
+    CONTINUE,
+    CORRECT_ANSWER,
+    WRONG_ANSWER,
+    StorySession,
+    step,
+)
 from bb.lib.story_graph.utils import QuestionNode, StoryNode
 from networkx.drawing.nx_pydot import graphviz_layout
 
@@ -23,39 +39,97 @@ class StoryGraph:
         Args:
             breakpoint_symbol (str): The symbol used to split the story into breakpoints.
         """
-        self.graph_nodes: dict[str, StoryNode | QuestionNode] = {}
+        self.graph_nodes: MutableMapping[str, StoryNode | QuestionNode] = {}
         self.breakpoint_symbol = breakpoint_symbol
         self.language = None
+        # Routing table compiled by `save_graph`, read by `load_graph`
+        self.routing: Mapping[str, dict] | None = None
 
-    def save_graph(self, filename: str):
-        """Save the story graph to a file.
+    def get_story_dict(self) -> dict:
+        """Get the story graph as a JSON serializable dictionary.
 
-        Parameters
-        ----------
-        filename (str): The filename to save the story graph to.
+        Returns
+        -------
+        dict: The nodes and the language of the story graph.
         """
         # Convert nodes to dictionaries using their to_dict methods
         nodes_dict = {
             node_id: node.to_dict() for node_id, node in self.graph_nodes.items()
         }
-        story_dict = {
+        return {
             "nodes": nodes_dict,
             "language": self.language,
         }
 
-        with open(filename, "w") as f:
-            json.dump(story_dict, f, indent=2)
+    def save_graph(
+        self,
+        filename: str,
+        file_format: Literal["json", "binary"] | None = None,
+    ):
+        """Save the story graph to a file.
+
+        The graph is validated and its routing table is compiled and saved
+        with the nodes, see `compile_routing`.
+
+        Parameters
+        ----------
+        filename (str): The filename to save the story graph to.
+        file_format (Literal["json", "binary"] | None): The format of the
+            file, see the `binary` module. None for binary when the filename
+            ends with `.bin`, JSON otherwise.
+
+        Raises
+        ------
+        ValueError: If the graph is invalid.
+        """
+        self.routing = self.compile_routing()
+        if file_format is None:
+            file_format = (
+                "binary" if str(filename).endswith(".bin") else "json"
+            )
+        if file_format == "binary":
+            nodes_dict = {
+                node_id: node.to_dict()
+                for node_id, node in self.graph_nodes.items()
+            }
+            write_binary_graph(
+                filename, nodes_dict, self.language, self.routing
+            )
+        elif file_format == "json":
+            story_dict = self.get_story_dict()
+            story_dict["routing"] = self.routing
+            with open(filename, "w") as f:
+                json.dump(story_dict, f, indent=2)
+        else:
+            raise ValueError(f"Invalid file format: {file_format}")
 
     def load_graph(self, filename: str):
         """Load the story graph from a file.
 
+        A JSON graph is loaded at once. A binary graph is memory mapped, and
+        its nodes and routing entries are decoded when first accessed.
+
         Parameters
         ----------
         filename (str): The filename to load the story graph from.
         """
+        if is_binary_graph(filename):
+            reader = BinaryGraphReader(filename)
+            self.graph_nodes = LazyNodes(reader)
+            self.routing = LazyRouting(reader)
+            self.language = reader.language
+            return
         with open(filename, "r") as f:
             story_dict = json.load(f)
+        self.load_story_dict(story_dict)
 
+    def load_story_dict(self, story_dict: dict):
+        """Load the story graph from a dictionary, see `get_story_dict`.
+
+        Parameters
+        ----------
+        story_dict (dict): The nodes and the language of the story graph.
+        """
         # Recreate nodes from dictionaries
         self.graph_nodes = {}
         for node_id, node_dict in story_dict["nodes"].items():
@@ -65,22 +139,45 @@ class StoryGraph:
                 node = QuestionNode.from_dict(node_dict)
             self.graph_nodes[node_id] = node
         self.language = story_dict["language"]
+        # Graphs saved before the routing tables are routed from the nodes
+        self.routing = story_dict.get("routing")
+
+    def to_compact(self) -> CompactStoryGraph:
+        """Get the compact, read-only representation of the graph for playing.
+
+        Returns
+        -------
+        CompactStoryGraph: The graph with integer ids and indexed routing.
+        """
+        return CompactStoryGraph.from_graph(self)
 
     def create_graph(
         self,
         story: str,
-        question_answer_list: list[QuestionAnswer],
+        question_answer_list: list[list[QuestionAnswer] | None],
         language: Literal["French", "English"],
+        previous_graph: "StoryGraph | None" = None,
     ):
         """Create the story graph from a story and a list of question and answers.
 
         Parameters
         ----------
         story (str): The story to create the graph from.
-        question_answer_list (list[QuestionAnswer]): The list of question and answers to create the graph from.
+        question_answer_list (list[list[QuestionAnswer] | None]): The list of
+            question and answers to create the graph from. With a previous
+            graph, a None entry reuses the questions of the same unchanged
+            part in the previous graph.
         language (Literal["French", "English"]): The language of the story.
+        previous_graph (StoryGraph | None): The graph of a previous version of
+            the story, for an incremental update.
+
+        Raises
+        ------
+        ValueError: If a None entry has no unchanged part in the previous
+            graph.
         """
         self.language = language
+        self.routing = None
         # Check that the number of questions and answers are the same
         if len(question_answer_list) != story.count(self.breakpoint_symbol):
             raise ValueError("The number of questions and answers must be the same")
@@ -88,9 +185,29 @@ class StoryGraph:
         if self.breakpoint_symbol not in story:
             raise ValueError("The story must contain the breakpoint symbol")
 
+        story_parts = story.split(self.breakpoint_symbol)
+        if None in question_answer_list:
+            previous_questions = (
+                previous_graph.get_questions_by_part()
+                if previous_graph is not None
+                else {}
+            )
+            question_answer_list = list(question_answer_list)
+            for story_idx, question_answers in enumerate(question_answer_list):
+                if question_answers is not None:
+                    continue
+                if story_parts[story_idx].strip() not in previous_questions:
+                    raise ValueError(
+                        "Invalid story part to reuse, not in the previous "
+                        f"graph: {story_idx}"
+                    )
+                question_answer_list[story_idx] = previous_questions[
+                    story_parts[story_idx].strip()
+                ]
+
         # First add all the story nodes
         story_nodes = []
-        for story_idx, story_part in enumerate(story.split(self.breakpoint_symbol)):
+        for story_idx, story_part in enumerate(story_parts):
             story_node = StoryNode(f"story_{story_idx}", story_part, None, None)
             self.graph_nodes[story_node.id] = story_node
             story_nodes.append(story_node)
@@ -118,6 +235,177 @@ class StoryGraph:
                     question_node.add_child(next_story_node.id)
                     next_story_node.add_parent(question_node.id)
 
+    def compile_routing(self) -> dict[str, dict]:
+        """Validate the graph and compile the routing table of each node.
+
+        The entry of a story node gives its questions in routing order (the
+        hardest first, then the generation order) and the next story node.
+        The entry of a question node gives the same question chain, the bit
+        of the question in the chain, and the next story node. At runtime the
+        next question is the first one of the chain whose bit is not set in
+        the mask of the failed questions, see `route`.
+
+        Returns
+        -------
+        dict[str, dict]: The routing entry of each node id.
+
+        Raises
+        ------
+        ValueError: If an edge, a node or the story order is invalid.
+        """
+        for node in self.graph_nodes.values():
+            for child_id in node.children:
+                if child_id not in self.graph_nodes:
+                    raise ValueError(f"Invalid child of {node.id}: {child_id}")
+                if node.id not in self.graph_nodes[child_id].parents:
+                    raise ValueError(
+                        f"Invalid edge without parent: {node.id} -> {child_id}"
+                    )
+            for parent_id in node.parents:
+                if parent_id not in self.graph_nodes:
+                    raise ValueError(
+                        f"Invalid parent of {node.id}: {parent_id}"
+                    )
+            if isinstance(node, QuestionNode):
+                if node.difficulty not in DIFFICULTY_ORDER:
+                    raise ValueError(
+                        f"Invalid difficulty of {node.id}: {node.difficulty}"
+                    )
+                if len(node.parents) != 1 or len(node.children) != 1:
+                    raise ValueError(
+                        "Invalid question node, one parent and one child "
+                        f"expected: {node.id}"
+                    )
+                for neighbor_id in node.parents + node.children:
+                    if isinstance(self.graph_nodes[neighbor_id], QuestionNode):
+                        raise ValueError(
+                            "Invalid edge between question nodes: "
+                            f"{node.id}, {neighbor_id}"
+                        )
+
+        routing = {}
+        for node in self.graph_nodes.values():
+            if isinstance(node, QuestionNode):
+                continue
+            questions = [
+                child_id
+                for child_id in node.children
+                if isinstance(self.graph_nodes[child_id], QuestionNode)
+            ]
+            if len(questions) != len(node.children):
+                raise ValueError(
+                    f"Invalid story node with story children: {node.id}"
+                )
+            questions.sort(
+                key=lambda question_id: DIFFICULTY_ORDER.index(
+                    self.graph_nodes[question_id].difficulty
+                )
+            )
+            next_ids = {
+                self.graph_nodes[question_id].children[0]
+                for question_id in questions
+            }
+            if len(next_ids) > 1:
+                raise ValueError(
+                    "Invalid story node, its questions lead to several "
+                    f"nodes: {node.id}"
+                )
+            next_id = next_ids.pop() if next_ids else None
+            routing[node.id] = {"questions": questions, "next": next_id}
+            for bit, question_id in enumerate(questions):
+                routing[question_id] = {
+                    "questions": questions,
+                    "bit": bit,
+                    "next": next_id,
+                }
+
+        # The story nodes must form a single chain from the first one
+        if "story_0" not in routing:
+            raise ValueError("Invalid graph without first story node: story_0")
+        visited = set()
+        node_id = "story_0"
+        while node_id is not None:
+            if node_id in visited:
+                raise ValueError(f"Invalid graph with a cycle at: {node_id}")
+            visited.add(node_id)
+            node_id = routing[node_id]["next"]
+        unreachable = [
+            node_id
+            for node_id, node in self.graph_nodes.items()
+            if not isinstance(node, QuestionNode) and node_id not in visited
+        ]
+        if unreachable:
+            raise ValueError(
+                f"Invalid graph with unreachable story nodes: {unreachable}"
+            )
+        return routing
+
+    def route(self, node_id: str, failed_mask: int = 0) -> str | None:
+        """Get the next question of a node from the routing table.
+
+        Parameters
+        ----------
+        node_id (str): The id of a story node, or of a question node that was
+            answered incorrectly.
+        failed_mask (int): The bits of the failed questions of the chain,
+            see `get_failed_bit`.
+
+        Returns
+        -------
+        str | None: The id of the next question node or None if all the
+            questions failed, the story continues at the "next" node of the
+            routing entry.
+        """
+        if self.routing is None:
+            self.routing = self.compile_routing()
+        questions = self.routing[node_id]["questions"]
+        # Lowest bit not set in the mask
+        bit = (~failed_mask & (failed_mask + 1)).bit_length() - 1
+        if bit < len(questions):
+            return questions[bit]
+        return None
+
+    def routing_questions(self, node_id: str) -> list[str]:
+        """Get the question chain of a node in routing order."""
+        if self.routing is None:
+            self.routing = self.compile_routing()
+        return self.routing[node_id]["questions"]
+
+    def get_failed_bit(self, question_id: str) -> int:
+        """Get the bit of a question in the mask of the failed questions."""
+        if self.routing is None:
+            self.routing = self.compile_routing()
+        return 1 << self.routing[question_id]["bit"]
+
+    def get_next_story_node_id(self, node_id: str) -> str | None:
+        """Get the story node following a node, None at the end."""
+        if self.routing is None:
+            self.routing = self.compile_routing()
+        return self.routing[node_id]["next"]
+
+    def get_questions_by_part(self) -> dict[str, list[QuestionAnswer]]:
+        """Get the questions of each story part, for an incremental update.
+
+        Returns
+        -------
+        dict[str, list[QuestionAnswer]]: The questions of the story nodes, by
+            stripped content of the story node.
+        """
+        questions_by_part = {}
+        for node in self.graph_nodes.values():
+            if isinstance(node, QuestionNode):
+                continue
+            questions_by_part[node.content.strip()] = [
+                QuestionAnswer(
+                    question=self.graph_nodes[child_id].content,
+                    answer=self.graph_nodes[child_id].answer,
+                    difficulty=self.graph_nodes[child_id].difficulty,
+                    cognitive_area=self.graph_nodes[child_id].cognitive_area,
+                )
+                for child_id in node.children
+            ]
+        return questions_by_part
+
     def plot_graph(self, filename: str):
         """Plot the story graph.
 
@@ -154,6 +442,9 @@ class StoryGraph:
     ):
         """Start the story from a given node. Play the story only with text and user input.
 
+        The story is played by a loop stepping a `StorySession`, so that long
+        stories and repeated wrong answers do not grow the stack.
+
         Parameters
         ----------
         node_id (str): The id of the node to start the story from.
@@ -164,130 +455,61 @@ class StoryGraph:
         ------
         ValueError: If the node id is invalid.
         """
-        idx = int(node_id.split("_")[1])
-        if "story" in node_id:
-            current_node = self.graph_nodes[node_id]
-        elif "question" in node_id:
-            current_node = self.graph_nodes[node_id]
-        else:
+        if node_id not in self.graph_nodes:
             raise ValueError(f"Invalid node id: {node_id}")
 
-        if idx > 0 and resume:
+        if resume and node_id != "story_0":
             resumer = Resumer()
-            resume_story_node = resumer.resume_story(current_node)
-            print(f"Resume : {resume_story_node.id}")
-        else:
+            resume_text = resumer.resume_story(self.graph_nodes[node_id], self)
+            print(f"Resume : {resume_text}")
+
+        failed_mask = 0
+        if self.is_question(node_id):
+            questions = self.routing_questions(node_id)
+            for question_id in question_to_pass or []:
+                if question_id in questions:
+                    failed_mask |= self.get_failed_bit(question_id)
+        session = StorySession(node_id=node_id, failed_mask=failed_mask)
+        answer_checker = AnswerChecker()
+
+        while not session.finished:
+            current_node = self.graph_nodes[session.node_id]
             if not isinstance(current_node, QuestionNode):
                 print(current_node.content)
-                if len(current_node.children) == 0:
-                    print("No more story to tell")
-                    return
-                else:
-                    hard_children = [
-                        self.graph_nodes[child_id]
-                        for child_id in current_node.children
-                        if self.graph_nodes[child_id].difficulty == "hard"
-                    ]
-                    medium_children = [
-                        self.graph_nodes[child_id]
-                        for child_id in current_node.children
-                        if self.graph_nodes[child_id].difficulty == "medium"
-                    ]
-                    easy_children = [
-                        self.graph_nodes[child_id]
-                        for child_id in current_node.children
-                        if self.graph_nodes[child_id].difficulty == "easy"
-                    ]
-                    if len(hard_children) > 0:
-                        next_node_id = hard_children[0].id
-                        self.start_story(next_node_id, resume=False)
-                    elif len(medium_children) > 0:
-                        next_node_id = medium_children[0].id
-                        self.start_story(next_node_id, resume=False)
-                    elif len(easy_children) > 0:
-                        next_node_id = easy_children[0].id
-                        self.start_story(next_node_id, resume=False)
-                    else:
-                        print("No more story to tell")
-                        return
-
+                session = step(self, session, CONTINUE)
+                continue
+
+            listener_answer = self.ask_question(current_node)
+            correct = answer_checker.is_correct(
+                content=self.graph_nodes[current_node.parents[0]].content,
+                question=current_node.content,
+                gt_answer=current_node.answer,
+                listener_answer=listener_answer,
+            )
+            if correct:
+                print("Bonne reponse!")
+                session = step(self, session, CORRECT_ANSWER)
+                continue
+
+            print(
+                "Mauvaise reponse !"
+                "La question etait trop difficile, elle etait de niveau: "
+                f"{current_node.difficulty} "
+                f"La reponse etait: {current_node.answer}"
+            )
+            session = step(self, session, WRONG_ANSWER)
+            if not session.finished and self.is_question(session.node_id):
+                print(
+                    "Other question, level "
+                    f"{self.graph_nodes[session.node_id].difficulty}"
+                )
             else:
-                listener_answer = self.ask_question(current_node)
-
-                answer_checker = AnswerChecker()
-                content = self.graph_nodes[current_node.parents[0]].content
-                question = current_node.content
-                correct = answer_checker.is_correct(
-                    content=content,
-                    question=question,
-                    gt_answer=current_node.answer,
-                    listener_answer=listener_answer,
+                print(
+                    "Malheureusement toutes les questions ont ete repondues "
+                    "incorrectement"
+                    "mais ce n'est pas grave. On continue l'histoire !"
                 )
-                if correct:
-                    print("Bonne reponse!")
-                    next_node_id = current_node.children[0]
-                    self.start_story(next_node_id, resume=False)
-                else:
-                    print(
-                        "Mauvaise reponse !"
-                        f"La question etait trop difficile, elle etait de niveau: {current_node.difficulty} "
-                        f"La reponse etait: {current_node.answer}"
-                    )
-                    if question_to_pass is None:
-                        question_to_pass = [current_node.id]
-                    else:
-                        question_to_pass.append(current_node.id)
-                    parent_node = self.graph_nodes[current_node.parents[0]]
-                    hard_children = [
-                        self.graph_nodes[child_id]
-                        for child_id in parent_node.children
-                        if self.graph_nodes[child_id].difficulty == "hard"
-                        and child_id not in question_to_pass
-                    ]
-                    medium_children = [
-                        self.graph_nodes[child_id]
-                        for child_id in parent_node.children
-                        if self.graph_nodes[child_id].difficulty == "medium"
-                        and child_id not in question_to_pass
-                    ]
-                    easy_children = [
-                        self.graph_nodes[child_id]
-                        for child_id in parent_node.children
-                        if self.graph_nodes[child_id].difficulty == "easy"
-                        and child_id not in question_to_pass
-                    ]
-
-                    if len(hard_children) > 0:
-                        next_node_id = hard_children[0].id
-                        print("Other question, level hard")
-                        self.start_story(
-                            next_node_id,
-                            resume=False,
-                            question_to_pass=question_to_pass,
-                        )
-                    elif len(medium_children) > 0:
-                        print("Other question, level medium")
-                        next_node_id = medium_children[0].id
-                        self.start_story(
-                            next_node_id,
-                            resume=False,
-                            question_to_pass=question_to_pass,
-                        )
-                    elif len(easy_children) > 0:
-                        print("Other question, level easy")
-                        next_node_id = easy_children[0].id
-                        self.start_story(
-                            next_node_id,
-                            resume=False,
-                            question_to_pass=question_to_pass,
-                        )
-                    else:
-                        print(
-                            "Malheureusement toutes les questions ont ete repondues incorrectement"
-                            "mais ce n'est pas grave. On continue l'histoire !"
-                        )
-                        next_node_id = current_node.children[0]
-                        self.start_story(next_node_id, resume=False)
+        print("No more story to tell")
 
     def ask_question(self, question_node: QuestionNode):
         """Ask a question to the user.
@@ -303,6 +525,10 @@ class StoryGraph:
     def get_node(self, node_id: str) -> StoryNode | QuestionNode:
         return self.graph_nodes[node_id]
 
+    def is_question(self, node_id: str) -> bool:
+        """Whether a node is a question node."""
+        return isinstance(self.graph_nodes[node_id], QuestionNode)
+
     def get_next_question_node_id(
         self, node_id: str, question_to_pass: list[str] | None = None
     ) -> str | None:
@@ -318,23 +544,11 @@ class StoryGraph:
         -------
         str | None: The id of the next question node or None if there are no more question nodes.
         """
-        story_node_id = node_id
-        if isinstance(self.graph_nodes[node_id], QuestionNode):
-            story_node_id = self.graph_nodes[node_id].parents[0]
-
-        question_node_ids = self.graph_nodes[story_node_id].children
-        question_dict = {"easy": [], "medium": [], "hard": []}
-        if question_to_pass is not None:
-            question_node_ids = [
-                question_node_id
-                for question_node_id in question_node_ids
-                if question_node_id not in question_to_pass
-            ]
-        for question_node_id in question_node_ids:
-            question_dict[self.graph_nodes[question_node_id].difficulty].append(
-                question_node_id
-            )
-        for difficulty in ["hard", "medium", "easy"]:
-            if len(question_dict[difficulty]) > 0:
-                return question_dict[difficulty][0]
-        return None
+        questions = self.routing_questions(node_id)
+        failed_mask = 0
+        if question_to_pass:
+            question_to_pass = set(question_to_pass)
+            for bit, question_id in enumerate(questions):
+                if question_id in question_to_pass:
+                    failed_mask |= 1 << bit
+        return self.route(node_id, failed_mask)
@@ -0,0 +1,352 @@
+"""Local answer matching module.
+
+This module provides the cheap matching steps used by the answer checker
+before calling an LLM: text normalization (accents, case, punctuation,
+articles and number words in French and English), token-set fuzzy matching
+and an optional embedding similarity computed by a small local model.
+"""
+
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+# Number words of French and English, compound numbers are summed up
+NUMBER_WORDS = {
+    # French
+    "zero": 0,
+    "un": 1,
+    "une": 1,
+    "deux": 2,
+    "trois": 3,
+    "quatre": 4,
+    "cinq": 5,
+    "six": 6,
+    "sept": 7,
+    "huit": 8,
+    "neuf": 9,
+    "dix": 10,
+    "onze": 11,
+    "douze": 12,
+    "treize": 13,
+    "quatorze": 14,
+    "quinze": 15,
+    "seize": 16,
+    "vingt": 20,
+    "vingts": 20,
+    "trente": 30,
+    "quarante": 40,
+    "cinquante": 50,
+    "soixante": 60,
+    "cent": 100,
+    "cents": 100,
+    "mille": 1000,
+    # English
+    "one": 1,
+    "two": 2,
+    "three": 3,
+    "four": 4,
+    "five": 5,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "eleven": 11,
+    "twelve": 12,
+    "thirteen": 13,
+    "fourteen": 14,
+    "fifteen": 15,
+    "sixteen": 16,
+    "seventeen": 17,
+    "eighteen": 18,
+    "nineteen": 19,
+    "twenty": 20,
+    "thirty": 30,
+    "forty": 40,
+    "fifty": 50,
+    "sixty": 60,
+    "seventy": 70,
+    "eighty": 80,
+    "ninety": 90,
+    "hundred": 100,
+    "thousand": 1000,
+}
+
+# Words that are also articles when they stand alone, e.g. "un chat"
+AMBIGUOUS_NUMBER_WORDS = {"un", "une", "one"}
+
+# Joining words of compound numbers, e.g. "vingt et un", "one hundred and two"
+NUMBER_JOINERS = {"et", "and"}
+
+ARTICLES = {"le", "la", "les", "l", "un", "une", "des", "du", "de", "d"} | {
+    "the",
+    "a",
+    "an",
+}
+
+NEGATIONS = {"ne", "n", "pas", "non", "jamais", "not", "no", "never"}
+
+# Words wrapping an answer without adding content, e.g. "c'est Mickey"
+FILLER_WORDS = {
+    # French
+    "c",
+    "ca",
+    "ce",
+    "est",
+    "etait",
+    "il",
+    "elle",
+    "ils",
+    "elles",
+    "je",
+    "j",
+    "pense",
+    "crois",
+    "que",
+    "qu",
+    "euh",
+    "bah",
+    "ben",
+    # English
+    "it",
+    "s",
+    "is",
+    "was",
+    "i",
+    "think",
+    "that",
+    "um",
+    "uh",
+    "well",
+}
+
+
+def strip_accents(text: str) -> str:
+    """Remove the accents of a text, e.g. "éléphant" -> "elephant".
+
+    Parameters
+    ----------
+    text (str): The text.
+
+    Returns
+    -------
+    str: The text without accents.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    )
+
+
+def normalize_numbers(tokens: list[str]) -> list[str]:
+    """Replace the number words by digits, e.g. "vingt et un" -> "21".
+
+    Parameters
+    ----------
+    tokens (list[str]): The normalized tokens.
+
+    Returns
+    -------
+    list[str]: The tokens, with each run of number words replaced by its
+        value.
+    """
+    normalized = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] not in NUMBER_WORDS:
+            normalized.append(tokens[i])
+            i += 1
+            continue
+        run = []
+        while i < len(tokens):
+            if tokens[i] in NUMBER_WORDS:
+                run.append(tokens[i])
+            elif not (
+                tokens[i] in NUMBER_JOINERS
+                and run
+                and i + 1 < len(tokens)
+                and tokens[i + 1] in NUMBER_WORDS
+            ):
+                break
+            i += 1
+        if len(run) == 1 and run[0] in AMBIGUOUS_NUMBER_WORDS:
+            normalized.extend(run)
+        else:
+            normalized.append(str(_parse_number(run)))
+    return normalized
+
+
+def _parse_number(words: list[str]) -> int:
+    """Get the value of a run of number words, e.g. "quatre vingt dix"."""
+    total = 0
+    current = 0
+    for word in words:
+        value = NUMBER_WORDS[word]
+        if value == 1000:
+            total += max(current, 1) * value
+            current = 0
+        elif value == 100:
+            current = max(current, 1) * value
+        elif value == 20 and 1 < current < 20:
+            # French "quatre-vingt"
+            current *= value
+        else:
+            current += value
+    return total + current
+
+
+def normalize_answer(text: str) -> list[str]:
+    """Normalize an answer into tokens.
+
+    Accents, case and punctuation are removed, number words are replaced by
+    digits, and articles are dropped unless nothing else remains.
+
+    Parameters
+    ----------
+    text (str): The answer.
+
+    Returns
+    -------
+    list[str]: The normalized tokens.
+    """
+    text = strip_accents(text).lower()
+    tokens = re.findall(r"[a-z0-9]+", text)
+    tokens = normalize_numbers(tokens)
+    content_tokens = [token for token in tokens if token not in ARTICLES]
+    return content_tokens or tokens
+
+
+def get_extra_tokens(
+    answer_tokens: list[str], gt_tokens: list[str]
+) -> set[str]:
+    """Get the content tokens of an answer that the expected one lacks.
+
+    Parameters
+    ----------
+    answer_tokens (list[str]): The normalized tokens of the answer.
+    gt_tokens (list[str]): The normalized tokens of the expected answer.
+
+    Returns
+    -------
+    set[str]: The extra tokens, filler words excluded.
+    """
+    return set(answer_tokens) - set(gt_tokens) - FILLER_WORDS
+
+
+def get_unmatched_tokens(
+    tokens: list[str], other_tokens: list[str], min_similarity: float = 0.8
+) -> set[str]:
+    """Get the content tokens of an answer without counterpart in another.
+
+    A word is matched by the same word or by a close spelling, e.g.
+    "mickey" and "micky", a number only by the same number, e.g. "17" is
+    not matched by "7".
+
+    Parameters
+    ----------
+    tokens (list[str]): The normalized tokens of the answer.
+    other_tokens (list[str]): The normalized tokens of the other answer.
+    min_similarity (float): The spelling similarity from which two words
+        match.
+
+    Returns
+    -------
+    set[str]: The unmatched tokens, filler words excluded.
+    """
+    other_words = [
+        token
+        for token in set(other_tokens) - FILLER_WORDS
+        if not token.isdigit()
+    ]
+    return {
+        token
+        for token in get_extra_tokens(tokens, other_tokens)
+        if token.isdigit()
+        or not any(
+            SequenceMatcher(None, token, word).ratio() >= min_similarity
+            for word in other_words
+        )
+    }
+
+
+def token_set_ratio(answer_tokens: list[str], gt_tokens: list[str]) -> float:
+    """Fuzzy similarity of two token sets, between 0 and 1.
+
+    The answer may be wrapped in filler words ("c'est Mickey et Donald"),
+    but missing words of the expected answer lower the score, so that
+    partial answers are not accepted, and so do extra content words, so
+    that listing several options ("rouge ou orange ou bleu") is not
+    accepted either.
+
+    Parameters
+    ----------
+    answer_tokens (list[str]): The normalized tokens of the answer.
+    gt_tokens (list[str]): The normalized tokens of the expected answer.
+
+    Returns
+    -------
+    float: The similarity, 1 when the answer is the expected answer up to
+        filler words.
+    """
+    answer_set = set(answer_tokens)
+    gt_set = set(gt_tokens)
+    common = " ".join(sorted(answer_set & gt_set))
+    gt_text = " ".join(
+        [common, " ".join(sorted(gt_set - answer_set))]
+    ).strip()
+    answer_text = " ".join(
+        [common, " ".join(sorted(get_extra_tokens(answer_tokens, gt_tokens)))]
+    ).strip()
+    return SequenceMatcher(None, answer_text, gt_text).ratio()
+
+
+class EmbeddingSimilarity:
+    """Semantic similarity of short texts with a small local model on CPU.
+
+    Requires the optional `sentence-transformers` dependency, install the
+    library with the "embeddings" extra.
+    """
+
+    def __init__(
+        self,
+        model_name: str = (
+            "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        ),
+    ):
+        """Initialize the similarity model, loaded once per process.
+
+        Parameters
+        ----------
+        model_name (str): The sentence-transformers model.
+        """
+        self.model_name = model_name
+        self.model = _load_embedding_model(model_name)
+
+    def similarity(self, text_a: str, text_b: str) -> float:
+        """Get the cosine similarity of two texts.
+
+        Parameters
+        ----------
+        text_a (str): The first text.
+        text_b (str): The second text.
+
+        Returns
+        -------
+        float: The cosine similarity, between -1 and 1.
+        """
+        embeddings = self.model.encode(
+            [text_a, text_b], normalize_embeddings=True
+        )
+        return float(embeddings[0] @ embeddings[1])
+
+
+@lru_cache(maxsize=None)
+def _load_embedding_model(model_name: str):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as error:
+        raise ImportError(
+            "The embedding similarity requires sentence-transformers, "
+            'install bb-lib-story-graph with the "embeddings" extra'
+        ) from error
+    return SentenceTransformer(model_name, device="cpu")
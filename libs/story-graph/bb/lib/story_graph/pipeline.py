@@ -0,0 +1,393 @@
+"""Story compile pipeline module.
+
+This module chains the steps producing a playable story: writer -> asker ->
+graph build (with the resume summaries) -> audio pre-render -> plot. The
+output of each stage is stored in a content-addressed artifact cache, keyed
+on the stage inputs, so that running the pipeline again after a small edit
+only recomputes the stages whose inputs changed. Stages that do not depend
+on each other run in parallel: the story audio is rendered while the
+questions are generated, and the question audio while the graph is plotted.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable
+
+from bb.lib.story_graph.asker import Asker, QuestionAnswer
+from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.resumer import Resumer
+from bb.lib.story_graph.writer import Writer
+
+# Bump to invalidate the cached artifacts of all the stages
+PIPELINE_VERSION = 1
+
+
+def get_audio_path(
+    data_path: str | Path, tts_model_name: str, language: str, text: str
+) -> Path:
+    """Get the content-addressed path of the pre-rendered audio of a text.
+
+    Parameters
+    ----------
+    data_path (str | Path): The workspace data folder.
+    tts_model_name (str): The TTS backend.
+    language (str): The language of the text.
+    text (str): The text.
+
+    Returns
+    -------
+    Path: The audio file, which exists if the text was pre-rendered.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    folder = Path(data_path) / "audio_cache" / tts_model_name / language
+    return folder / f"{digest}.wav"
+
+
+class ArtifactCache:
+    """Content-addressed store of the stage outputs.
+
+    An artifact is stored at `<root>/<stage>/<key>`, where the key is the
+    hash of the stage inputs.
+    """
+
+    def __init__(self, root: str | Path):
+        """Initialize the artifact cache.
+
+        Parameters
+        ----------
+        root (str | Path): The folder of the artifacts.
+        """
+        self.root = Path(root)
+
+    @staticmethod
+    def make_key(stage: str, inputs: dict) -> str:
+        """Build the key of a stage output from its inputs.
+
+        Parameters
+        ----------
+        stage (str): The stage name.
+        inputs (dict): The JSON serializable inputs of the stage.
+
+        Returns
+        -------
+        str: The key.
+        """
+        payload = json.dumps(
+            [PIPELINE_VERSION, stage, inputs],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_path(self, stage: str, key: str, suffix: str = ".json") -> Path:
+        """Get the path of an artifact, which may not exist yet."""
+        return self.root / stage / f"{key}{suffix}"
+
+    def run(
+        self,
+        stage: str,
+        inputs: dict,
+        compute: Callable[[Path], None],
+        suffix: str = ".json",
+    ) -> Path:
+        """Get the artifact of a stage, computing it on a cache miss.
+
+        Parameters
+        ----------
+        stage (str): The stage name.
+        inputs (dict): The JSON serializable inputs of the stage.
+        compute (Callable[[Path], None]): Writes the artifact to the given
+            path.
+        suffix (str): The file suffix of the artifact.
+
+        Returns
+        -------
+        Path: The artifact file.
+        """
+        path = self.get_path(stage, self.make_key(stage, inputs), suffix)
+        if path.exists():
+            print(f"[{stage}] cached")
+            return path
+        print(f"[{stage}] running")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file, an interrupted stage leaves no artifact
+        tmp_path = path.with_name(f"{path.stem}.tmp{path.suffix}")
+        compute(tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+
+class StoryPipeline:
+    """Pipeline compiling a story spec into a playable story.
+
+    The outputs are written to the workspace like the apps do: the story
+    text to `story_texts/`, the graph (JSON and binary) and its plot to
+    `story_graphs/` and the audio of every node to `audio_cache/`, where the
+    story player finds it.
+    """
+
+    def __init__(
+        self,
+        data_path: str | Path,
+        tts_model_name: str | None = "TTSElevenLabs",
+        questions_difficulty: list[str] = ["easy", "hard"],
+        breakpoint_symbol: str = "||",
+    ):
+        """Initialize the pipeline.
+
+        Parameters
+        ----------
+        data_path (str | Path): The workspace data folder.
+        tts_model_name (str | None): The TTS backend of the audio
+            pre-render, None to skip the audio stage. Requires the "audio"
+            extra.
+        questions_difficulty (list[str]): The difficulty levels of the
+            questions.
+        breakpoint_symbol (str): The symbol splitting the story.
+        """
+        self.data_path = Path(data_path)
+        self.tts_model_name = tts_model_name
+        self.questions_difficulty = questions_difficulty
+        self.breakpoint_symbol = breakpoint_symbol
+        self.artifacts = ArtifactCache(self.data_path / "artifacts")
+        # TTS models are not shared between threads, each worker has its own
+        self._tts = threading.local()
+
+    def compile(
+        self,
+        name: str,
+        spec: dict | None = None,
+        story: str | None = None,
+    ) -> Path:
+        """Compile a story, reusing the artifacts of the unchanged stages.
+
+        Parameters
+        ----------
+        name (str): The name of the story files.
+        spec (dict | None): The Writer parameters (number_phrases,
+            characters, age_of_the_audience, language, story_context,
+            number_of_breakpoints), also used for the questions.
+        story (str | None): An existing story text, the writer stage is
+            skipped when given.
+
+        Returns
+        -------
+        Path: The story graph file.
+        """
+        spec = dict(spec or {})
+        language = spec.get("language", "French")
+        age_of_the_audience = spec.get("age_of_the_audience", 6)
+        if story is None:
+            story = self._write(spec)
+        self._save(self.data_path / "story_texts" / f"{name}.txt", story)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            story_parts = story.split(self.breakpoint_symbol)
+            story_audio = executor.submit(
+                self._render_audio, story_parts, language
+            )
+            questions = self._ask(name, story, language, age_of_the_audience)
+            graph_path = self._build_graph(name, story, questions, language)
+            plot = executor.submit(self._plot, graph_path)
+            question_texts = [
+                question_answer["question"]
+                for part_questions in questions
+                for question_answer in part_questions
+            ]
+            question_audio = executor.submit(
+                self._render_audio, question_texts, language
+            )
+            plot_path = plot.result()
+            story_audio.result()
+            question_audio.result()
+
+        folder = self.data_path / "story_graphs"
+        folder.mkdir(parents=True, exist_ok=True)
+        # Replaced atomically, the story player may be reading them
+        self._publish(plot_path, folder / f"{name}.svg")
+        self._publish(graph_path, folder / f"{name}.json")
+        # Opened lazily by the story player
+        graph = StoryGraph(breakpoint_symbol=self.breakpoint_symbol)
+        graph.load_graph(graph_path)
+        graph.save_graph(folder / f"{name}.bin", file_format="binary")
+        return folder / f"{name}.json"
+
+    def _write(self, spec: dict) -> str:
+        """Writer stage: generate the story text."""
+        writer_params = {
+            key: value
+            for key, value in spec.items()
+            if key != "number_of_breakpoints"
+        }
+
+        def compute(path: Path):
+            writer = Writer(
+                number_of_breakpoints=spec.get("number_of_breakpoints", 3),
+                breakpoint_symbol=self.breakpoint_symbol,
+            )
+            writer.save_story(writer.generate_story(**writer_params), path)
+
+        path = self.artifacts.run(
+            "writer",
+            {"spec": spec, "breakpoint_symbol": self.breakpoint_symbol},
+            compute,
+            suffix=".txt",
+        )
+        with open(path, "r") as f:
+            return f.read()
+
+    def _ask(
+        self, name: str, story: str, language: str, age_of_the_audience: int
+    ) -> list[list[dict]]:
+        """Asker stage: generate the questions of each story part.
+
+        The questions of the parts unchanged since the last compilation of
+        the story are reused.
+        """
+
+        def compute(path: Path):
+            previous_questions = None
+            previous_graph = self._load_previous_graph(name)
+            if (
+                previous_graph is not None
+                and previous_graph.language == language
+            ):
+                previous_questions = previous_graph.get_questions_by_part()
+            questions = Asker().generate_questions(
+                story=story,
+                breakpoint_symbol=self.breakpoint_symbol,
+                questions_difficulty=self.questions_difficulty,
+                age_of_the_audience=age_of_the_audience,
+                language=language,
+                batched=True,
+                previous_questions=previous_questions,
+            )
+            data = [
+                [asdict(question) for question in part] for part in questions
+            ]
+            self._save(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+        path = self.artifacts.run(
+            "asker",
+            {
+                "story": story,
+                "breakpoint_symbol": self.breakpoint_symbol,
+                "questions_difficulty": self.questions_difficulty,
+                "age_of_the_audience": age_of_the_audience,
+                "language": language,
+            },
+            compute,
+        )
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _build_graph(
+        self, name: str, story: str, questions: list[list[dict]], language: str
+    ) -> Path:
+        """Graph stage: build the story graph and its resume summaries.
+
+        The summaries of the story prefix unchanged since the last
+        compilation of the story are reused.
+        """
+
+        def compute(path: Path):
+            graph = StoryGraph(breakpoint_symbol=self.breakpoint_symbol)
+            graph.create_graph(
+                story=story,
+                question_answer_list=[
+                    [QuestionAnswer(**question) for question in part]
+                    for part in questions
+                ],
+                language=language,
+            )
+            Resumer().summarize_graph(graph, self._load_previous_graph(name))
+            graph.save_graph(path)
+
+        return self.artifacts.run(
+            "graph",
+            {
+                "story": story,
+                "questions": questions,
+                "language": language,
+                "breakpoint_symbol": self.breakpoint_symbol,
+            },
+            compute,
+        )
+
+    def _load_previous_graph(self, name: str) -> StoryGraph | None:
+        """Load the last compiled graph of a story, None if there is none."""
+        path = self.data_path / "story_graphs" / f"{name}.json"
+        if not path.exists():
+            return None
+        graph = StoryGraph(breakpoint_symbol=self.breakpoint_symbol)
+        graph.load_graph(path)
+        return graph
+
+    def _plot(self, graph_path: Path) -> Path:
+        """Plot stage: draw the story graph."""
+        with open(graph_path, "r") as f:
+            story_dict = json.load(f)
+
+        def compute(path: Path):
+            graph = StoryGraph(breakpoint_symbol=self.breakpoint_symbol)
+            graph.load_story_dict(story_dict)
+            graph.plot_graph(path)
+
+        return self.artifacts.run(
+            "plot", {"graph": story_dict}, compute, suffix=".svg"
+        )
+
+    def _render_audio(self, texts: list[str], language: str):
+        """Audio stage: render the texts that are not rendered yet.
+
+        Each text is an artifact of its own, keyed on its content, so that
+        editing a story part only renders this part again.
+        """
+        if self.tts_model_name is None:
+            return
+        for text in texts:
+            path = get_audio_path(
+                self.data_path, self.tts_model_name, language, text
+            )
+            if path.exists():
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.stem}.tmp{path.suffix}")
+            self._get_tts(language).generate_audio(text, str(tmp_path))
+            os.replace(tmp_path, path)
+
+    def _get_tts(self, language: str):
+        """Get the TTS model of a language, created once per thread."""
+        models = self._tts.__dict__.setdefault("models", {})
+        if language not in models:
+            try:
+                from bb.lib.text_to_speech import get_tts_model
+            except ImportError as error:
+                raise ImportError(
+                    "The audio stage requires bb-lib-text-to-speech, install "
+                    'bb-lib-story-graph with the "audio" extra'
+                ) from error
+            tts_model = get_tts_model(self.tts_model_name)
+            models[language] = tts_model(language=language)
+        return models[language]
+
+    @staticmethod
+    def _publish(source: Path, destination: Path):
+        """Copy an artifact to the workspace, replacing the file atomically."""
+        tmp_path = destination.with_name(
+            f"{destination.stem}.tmp{destination.suffix}"
+        )
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, destination)
+
+    @staticmethod
+    def _save(path: Path, text: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
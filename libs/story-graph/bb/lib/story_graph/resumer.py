@@ -1,44 +1,137 @@
 """
 This module contains the Resumer class, which is used to resume a story.
+
+The summaries are computed once at graph build time, as rolling summaries:
+the summary of the story node k is the summary of the node k-1 extended with
+the content of the node k. Resuming the story at any node is then a lookup.
 """
 
-from bb.lib.llm.llm import LLMMistral
+from typing import Callable
+
+from bb.lib.large_language_model import get_llm
 from bb.lib.story_graph.utils import QuestionNode, StoryNode
 
 
 class Resumer:
     def __init__(self):
-        """Initialize the Resumer with a LLM."""
-        self.llm = LLMMistral()
+        """Initialize the Resumer with the LLM configured by `BONBON_LLM`."""
+        self.llm = get_llm(caller="Resumer")
 
     def get_previous_content(
-        self, node: StoryNode | QuestionNode, contents: list[str] | None = None
+        self, node: StoryNode | QuestionNode, story_graph
     ) -> str:
         """Get the previous content of a node.
 
         Parameters
         ----------
         node (StoryNode | QuestionNode): The node to get the previous content of.
-        contents (list[str]): The contents of the previous nodes.
+        story_graph (StoryGraph): The story graph of the node.
+
+        Returns
+        -------
+        str: The content of the story nodes from the first one to the node
+            included.
         """
-        if contents is None:
-            contents = []
+        contents = []
+        while True:
+            if not isinstance(node, QuestionNode):
+                contents.append(node.content)
+            if node.id == "story_0" or not node.parents:
+                return "".join(contents[::-1])
+            node = story_graph.get_node(node.parents[0])
 
-        if node.id == "story_0":
-            contents.append(node.content)
-            return "".join(contents[::-1])
-        if isinstance(node, QuestionNode):
-            return self.get_previous_content(node.parents[0], contents)
-        if isinstance(node, StoryNode):
-            contents.append(node.content)
-            return self.get_previous_content(node.parents[0], contents)
+    def summarize(self, previous_summary: str | None, content: str) -> str:
+        """Extend the summary of a story with its next part.
+
+        Parameters
+        ----------
+        previous_summary (str | None): The summary of the story so far, None
+            at the first part.
+        content (str): The next part of the story.
+
+        Returns
+        -------
+        str: The summary of the story including the part.
+        """
+        if previous_summary is None:
+            return self.llm.generate_text(
+                "Resume the following story: " + content
+            )
+        return self.llm.generate_text(
+            "Here is the summary of a story: "
+            + previous_summary
+            + " Here is the next part of the story: "
+            + content
+            + " Resume the whole story, including this part, in the language "
+            "of the story."
+        )
 
-    def resume_story(self, node: StoryNode | QuestionNode):
+    def summarize_graph(
+        self,
+        story_graph,
+        previous_graph=None,
+        callback: Callable[[int, str], None] | None = None,
+    ):
+        """Compute the rolling summary of each story node of a graph.
+
+        Parameters
+        ----------
+        story_graph (StoryGraph): The story graph, its story nodes get their
+            `summary`.
+        previous_graph (StoryGraph | None): A previous version of the graph,
+            its summaries are reused as long as the story parts are unchanged
+            from the first one.
+        callback (Callable[[int, str], None] | None): Called with the index
+            of each story node and its summary, e.g. to report progress.
+        """
+        previous_node_id = "story_0" if previous_graph is not None else None
+        summary = None
+        node_id = "story_0"
+        index = 0
+        while node_id is not None:
+            node = story_graph.get_node(node_id)
+            previous_node = None
+            if previous_node_id is not None:
+                previous_node = previous_graph.get_node(previous_node_id)
+            if (
+                previous_node is not None
+                and previous_node.content == node.content
+                and previous_node.summary is not None
+            ):
+                summary = previous_node.summary
+                previous_node_id = previous_graph.get_next_story_node_id(
+                    previous_node_id
+                )
+            else:
+                # The summaries after an edited part depend on it
+                previous_node_id = None
+                summary = self.summarize(summary, node.content)
+            node.summary = summary
+            if callback is not None:
+                callback(index, summary)
+            node_id = story_graph.get_next_story_node_id(node_id)
+            index += 1
+
+    def resume_story(
+        self, node: StoryNode | QuestionNode, story_graph=None
+    ) -> str:
         """Resume the story from a node.
 
         Parameters
         ----------
         node (StoryNode | QuestionNode): The node to resume the story from.
+        story_graph (StoryGraph | None): The story graph of the node, needed
+            for the question nodes and the graphs without summaries.
+
+        Returns
+        -------
+        str: The summary of the story up to the node included.
         """
-        previous_content = self.get_previous_content(node)
+        story_node = node
+        if isinstance(node, QuestionNode):
+            story_node = story_graph.get_node(node.parents[0])
+        if story_node.summary is not None:
+            return story_node.summary
+        # Graphs saved before the summaries
+        previous_content = self.get_previous_content(node, story_graph)
         return self.llm.generate_text("Resume the following story: " + previous_content)
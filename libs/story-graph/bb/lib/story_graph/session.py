@@ -0,0 +1,105 @@
+"""Story session module.
+
+This module provides the traversal of a story graph as an explicit state
+machine. A `StorySession` is a small serializable cursor (the current node
+and the failed questions of the current story part), and `step` moves it
+according to an event, without recursion. The command line player and the
+story player app both drive the story with it.
+"""
+
+from dataclasses import dataclass, replace
+
+# Events of the state machine
+CONTINUE = "continue"  # The story node was told
+CORRECT_ANSWER = "correct"  # The question was answered correctly
+WRONG_ANSWER = "wrong"  # The question was answered incorrectly
+EVENTS = (CONTINUE, CORRECT_ANSWER, WRONG_ANSWER)
+
+
+@dataclass(frozen=True)
+class StorySession:
+    """Cursor of a listener in a story graph.
+
+    Attributes
+    ----------
+    node_id (str): The node to tell or ask next.
+    failed_mask (int): The bits of the questions of the current story part
+        that were answered incorrectly, see `StoryGraph.get_failed_bit`.
+    finished (bool): Whether the story is over.
+    """
+
+    node_id: str = "story_0"
+    failed_mask: int = 0
+    finished: bool = False
+
+    def to_dict(self) -> dict:
+        """Convert the session to a dictionary for JSON serialization."""
+        return {
+            "node_id": self.node_id,
+            "failed_mask": self.failed_mask,
+            "finished": self.finished,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StorySession":
+        """Create a session from a dictionary."""
+        return cls(
+            node_id=data["node_id"],
+            failed_mask=data["failed_mask"],
+            finished=data["finished"],
+        )
+
+
+def step(story_graph, session: StorySession, event: str) -> StorySession:
+    """Move a session to its next node.
+
+    After a told story node, the session moves to its hardest question, or
+    ends when the story node is the last one. After a correct answer, it
+    moves to the next story node. After a wrong answer, it moves to the next
+    question of the fallback chain, or to the next story node when all the
+    questions of the story part failed.
+
+    Parameters
+    ----------
+    story_graph (StoryGraph | CompactStoryGraph): The story graph.
+    session (StorySession): The current session, left unchanged.
+    event (str): `CONTINUE` on a story node, `CORRECT_ANSWER` or
+        `WRONG_ANSWER` on a question node.
+
+    Returns
+    -------
+    StorySession: The session after the event.
+
+    Raises
+    ------
+    ValueError: If the session is finished or the event does not apply to
+        the current node.
+    """
+    if session.finished:
+        raise ValueError(f"Invalid event, the session is finished: {event}")
+    on_question = story_graph.is_question(session.node_id)
+    if event == CONTINUE and not on_question:
+        question_id = story_graph.route(session.node_id)
+        if question_id is None:
+            return replace(session, failed_mask=0, finished=True)
+        return StorySession(node_id=question_id)
+    if event == CORRECT_ANSWER and on_question:
+        return _next_story_node(story_graph, session)
+    if event == WRONG_ANSWER and on_question:
+        failed_mask = session.failed_mask | story_graph.get_failed_bit(
+            session.node_id
+        )
+        question_id = story_graph.route(session.node_id, failed_mask)
+        if question_id is None:
+            return _next_story_node(story_graph, session)
+        return StorySession(node_id=question_id, failed_mask=failed_mask)
+    raise ValueError(f"Invalid event at {session.node_id}: {event}")
+
+
+def _next_story_node(story_graph, session: StorySession) -> StorySession:
+    """Move a session from a question to the next story node."""
+    next_id = story_graph.get_next_story_node_id(session.node_id)
+    if next_id is None:
+        return replace(session, failed_mask=0, finished=True)
+    return StorySession(node_id=next_id)
+
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, List, Literal
 
 
@@ -12,12 +12,16 @@ class StoryNode:
     content (str): The content of the node.
     children (List[Any]): The children of the node.
     parents (List[Any]): The parents of the node.
+    summary (str | None): The summary of the story up to this node included,
+        computed at graph build time to resume the story. None for question
+        nodes.
     """
 
     id: str
     content: str
     children: List[Any]
     parents: List[Any]
+    summary: str | None = field(default=None, kw_only=True)
 
     def __post_init__(self):
         if self.children is None:
@@ -39,6 +43,7 @@ class StoryNode:
             "type": self.__class__.__name__,
             "children": [child_id for child_id in self.children],
             "parents": [parent_id for parent_id in self.parents],
+            "summary": self.summary,
         }
 
     @classmethod
@@ -49,6 +54,7 @@ class StoryNode:
             content=data["content"],
             children=data["children"],
             parents=data["parents"],
+            summary=data.get("summary"),
         )
 
 
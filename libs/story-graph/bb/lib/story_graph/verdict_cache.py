@@ -0,0 +1,132 @@
+"""Verdict cache module for the answer checker.
+
+Children replaying a story give the same few answers to the same questions.
+This module caches the verdicts of the LLM on disk, keyed on the story part,
+the question text and the normalized answers, so that a known answer is
+judged without calling the LLM again. Node ids are not used in the keys,
+they repeat in every story and survive the edits of the questions.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from bb.lib.large_language_model import LLMCache
+from bb.lib.story_graph.matching import normalize_answer
+
+
+class VerdictCache:
+    """Persistent cache of the LLM verdicts on listener answers.
+
+    Verdicts are stored in a SQLite database, with the LRU eviction of the
+    LLM response cache, so that all the player worker processes share them.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int | None = 10000):
+        """Initialize the verdict cache.
+
+        Parameters
+        ----------
+        path (str | Path): Path of the SQLite database file.
+        max_entries (int | None): Maximum number of verdicts kept, the least
+            recently used are evicted first. None for no limit.
+        """
+        self.store = LLMCache(path, max_entries=max_entries)
+
+    @staticmethod
+    def make_key(
+        content: str, question: str, gt_answer: str, listener_answer: str
+    ) -> str:
+        """Build the key of a verdict.
+
+        Parameters
+        ----------
+        content (str): The story part the question is about.
+        question (str): The question text.
+        gt_answer (str): The expected answer.
+        listener_answer (str): The listener's answer.
+
+        Returns
+        -------
+        str: The key, answers that only differ by their normalization share
+            it.
+        """
+        payload = json.dumps(
+            [
+                content,
+                question,
+                " ".join(normalize_answer(gt_answer)),
+                " ".join(normalize_answer(listener_answer)),
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(
+        self,
+        content: str,
+        question: str,
+        gt_answer: str,
+        listener_answer: str,
+    ) -> bool | None:
+        """Get a cached verdict.
+
+        Parameters
+        ----------
+        content (str): The story part the question is about.
+        question (str): The question text.
+        gt_answer (str): The expected answer.
+        listener_answer (str): The listener's answer.
+
+        Returns
+        -------
+        bool | None: The cached verdict, None if unknown.
+        """
+        verdict = self.store.get(
+            self.make_key(content, question, gt_answer, listener_answer)
+        )
+        if verdict is None:
+            return None
+        return verdict == "true"
+
+    def set(
+        self,
+        content: str,
+        question: str,
+        gt_answer: str,
+        listener_answer: str,
+        correct: bool,
+    ):
+        """Store a verdict.
+
+        Parameters
+        ----------
+        content (str): The story part the question is about.
+        question (str): The question text.
+        gt_answer (str): The expected answer.
+        listener_answer (str): The listener's answer.
+        correct (bool): The verdict.
+        """
+        self.store.set(
+            self.make_key(content, question, gt_answer, listener_answer),
+            "true" if correct else "false",
+        )
+
+
+@lru_cache(maxsize=None)
+def get_default_verdict_cache() -> VerdictCache | None:
+    """Get the verdict cache at `BONBON_VERDICT_CACHE`, shared in the process.
+
+    Returns
+    -------
+    VerdictCache | None: The verdict cache, None if `BONBON_VERDICT_CACHE`
+        is not set.
+    """
+    path = os.getenv("BONBON_VERDICT_CACHE")
+    if not path:
+        return None
+    return VerdictCache(
+        path, max_entries=int(os.getenv("BONBON_VERDICT_CACHE_SIZE", "10000"))
+    )
@@ -6,8 +6,13 @@ This module provides functionality to generate stories using an LLM.
 import os
 import random
 from pathlib import Path
+from typing import Iterator
 
-from bb.lib.llm.llm import LLMMistral
+from bb.lib.large_language_model import (
+    BATCH_RETRY_POLICY,
+    RateLimiter,
+    get_llm,
+)
 
 
 class Writer:
@@ -15,6 +20,7 @@ class Writer:
         self,
         number_of_breakpoints: int = 3,
         breakpoint_symbol: str = "||",
+        rate_limiter: RateLimiter | None = None,
     ):
         """Initialize the Writer with a number of breakpoints and a breakpoint symbol.
 
@@ -22,10 +28,22 @@ class Writer:
         ----------
         number_of_breakpoints (int): The number of breakpoints to generate.
         breakpoint_symbol (str): The symbol to use to split the story into breakpoints.
-
-        Mistral llm is used by default.
+        rate_limiter (RateLimiter | None): The rate limiter of the LLM calls,
+            share it between Writers generating stories concurrently. No rate
+            limit if None.
+
+        The LLM configured by `BONBON_LLM` is used, Mistral by default, with
+        the batch retry policy since a long story is never hedged. Identical
+        requests are neither coalesced nor cached, each one expects a story of
+        its own.
         """
-        self.llm = LLMMistral()
+        self.llm = get_llm(
+            rate_limiter=rate_limiter,
+            retry_policy=BATCH_RETRY_POLICY,
+            caller="Writer",
+            coalesce=False,
+            cache=None,
+        )
         self.number_of_breakpoints = number_of_breakpoints
         self.breakpoint_symbol = breakpoint_symbol
 
@@ -44,6 +62,59 @@ class Writer:
         number_phrases (int): The number of phrases to generate.
         characters (list[str]): The characters to generate the story about.
         """
+        prompt = self._make_prompt(
+            number_phrases, characters, age_of_the_audience, language, story_context
+        )
+        story = self.llm.generate_text(prompt)
+        story = self.handle_breakpoints(
+            story=story,
+        )
+        # Remove all newlines
+        story = story.replace("\n", " ")
+        return story
+
+    def generate_story_stream(
+        self,
+        number_phrases: int = 15,
+        characters: list[str] = ["Mickey", "Donald"],
+        age_of_the_audience: int = 6,
+        language: str = "French",
+        story_context: str = "",
+    ) -> Iterator[str]:
+        """Generate a story like `generate_story`, yielding it as it arrives.
+
+        The breakpoints to keep are drawn among all the generated ones, so
+        they are handled once the story is complete: the partial stories
+        contain every breakpoint generated so far, the last yielded story is
+        the final one.
+
+        Parameters
+        ----------
+        number_phrases (int): The number of phrases to generate.
+        characters (list[str]): The characters to generate the story about.
+
+        Yields
+        ------
+        str: The story generated so far, then the final story.
+        """
+        prompt = self._make_prompt(
+            number_phrases, characters, age_of_the_audience, language, story_context
+        )
+        stream = self.llm.generate_text_stream(prompt)
+        for _ in stream:
+            yield stream.text.replace("\n", " ")
+        story = self.handle_breakpoints(story=stream.text)
+        yield story.replace("\n", " ")
+
+    def _make_prompt(
+        self,
+        number_phrases: int,
+        characters: list[str],
+        age_of_the_audience: int,
+        language: str,
+        story_context: str,
+    ) -> str:
+        """Make the prompt generating a story, see `generate_story`."""
         prompt = (
             f"Generate a story with {number_phrases} phrases. "
             f"The story should be suitable for an audience of {age_of_the_audience} years old. "
@@ -60,13 +131,7 @@ class Writer:
         )
         if story_context:
             prompt += f" This is the context of the story: {story_context}"
-        story = self.llm.generate_text(prompt)
-        story = self.handle_breakpoints(
-            story=story,
-        )
-        # Remove all newlines
-        story = story.replace("\n", " ")
-        return story
+        return prompt
 
     def handle_breakpoints(self, story: str) -> str:
         """Handle the breakpoints in the story. If the number of breakpoints is less
@@ -0,0 +1,61 @@
+"""Compile a story end to end.
+
+Run the writer, the asker, the graph build, the audio pre-render and the plot
+of a story, reusing the cached output of every stage whose inputs did not
+change:
+
+    uv run python scripts/compile_story.py mickey_fusee \
+        --characters Mickey Donald --context "Un voyage en fusée"
+
+    # Compile an existing story text, e.g. after editing one of its parts
+    uv run python scripts/compile_story.py mickey_fusee --story story.txt
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+from bb.lib.story_graph.pipeline import StoryPipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a story end to end.")
+    parser.add_argument("name", help="Name of the story files")
+    parser.add_argument(
+        "--story", type=Path, default=None, help="Existing story text file"
+    )
+    parser.add_argument("--characters", nargs="+", default=["Mickey"])
+    parser.add_argument("--age", type=int, default=6)
+    parser.add_argument("--language", default="French")
+    parser.add_argument("--context", default="")
+    parser.add_argument("--breakpoints", type=int, default=3)
+    parser.add_argument("--phrases", type=int, default=15)
+    parser.add_argument(
+        "--tts",
+        default="TTSElevenLabs",
+        help='TTS backend of the audio pre-render, "none" to skip it',
+    )
+    args = parser.parse_args()
+
+    story = None
+    if args.story is not None:
+        with open(args.story, "r") as f:
+            story = f.read()
+    spec = {
+        "number_phrases": args.phrases,
+        "characters": args.characters,
+        "age_of_the_audience": args.age,
+        "language": args.language,
+        "story_context": args.context,
+        "number_of_breakpoints": args.breakpoints,
+    }
+    pipeline = StoryPipeline(
+        os.getenv("BONBON_WORKSPACE_DATA"),
+        tts_model_name=None if args.tts == "none" else args.tts,
+    )
+    graph_path = pipeline.compile(args.name, spec=spec, story=story)
+    print(f"Story graph saved to {graph_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Bulk story generation.
+
+Generate a catalog of stories from a spec file, one story per row, with a
+bounded pool of concurrent Writers. Each row gives the characters, the age
+of the audience, the language, the context and the number of breakpoints of
+a story. Spec files are CSV (characters separated by commas within the
+quoted field) or JSONL:
+
+    name,characters,age,language,context,breakpoints
+    mickey_fusee,"Mickey,Donald",6,French,Un voyage en fusée,3
+
+Stories are written to `$BONBON_WORKSPACE_DATA/story_texts`. Finished rows
+are appended to a checkpoint file next to the stories, so that an
+interrupted run resumes where it stopped:
+
+    uv run python scripts/generate_stories.py catalog.csv --workers 4
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from rich.progress import Progress
+
+from bb.lib.large_language_model import RateLimiter
+from bb.lib.story_graph.writer import Writer
+
+CHECKPOINT_FILE_NAME = ".generate_stories_checkpoint.jsonl"
+
+
+def read_spec(spec_path: Path) -> list[dict]:
+    """Read the story specs of a CSV or JSONL file.
+
+    Parameters
+    ----------
+    spec_path (Path): The spec file.
+
+    Returns
+    -------
+    list[dict]: The normalized specs, with a unique `name` and the `key`
+        identifying their content.
+    """
+    if spec_path.suffix == ".csv":
+        with open(spec_path, "r", newline="") as f:
+            rows = list(csv.DictReader(f))
+    elif spec_path.suffix == ".jsonl":
+        with open(spec_path, "r") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        raise ValueError(f"Invalid spec file: {spec_path}")
+
+    specs = []
+    for index, row in enumerate(rows):
+        characters = row["characters"]
+        if isinstance(characters, str):
+            characters = [name.strip() for name in characters.split(",")]
+        spec = {
+            "characters": characters,
+            "age_of_the_audience": int(row.get("age") or 6),
+            "language": row.get("language") or "French",
+            "story_context": row.get("context") or "",
+            "number_of_breakpoints": int(row.get("breakpoints") or 3),
+            "number_phrases": int(row.get("phrases") or 15),
+        }
+        payload = json.dumps(spec, sort_keys=True, ensure_ascii=False)
+        spec["key"] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        spec["name"] = row.get("name") or f"story_{index:05d}"
+        specs.append(spec)
+
+    names = [spec["name"] for spec in specs]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicated story names: {sorted(duplicates)}")
+    return specs
+
+
+def read_checkpoint(checkpoint_path: Path) -> set[tuple[str, str]]:
+    """Read the (name, key) of the stories already generated."""
+    done = set()
+    if checkpoint_path.exists():
+        with open(checkpoint_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    done.add((entry["name"], entry["key"]))
+    return done
+
+
+def generate_story(
+    spec: dict, output_folder: Path, rate_limiter: RateLimiter
+) -> Path:
+    """Generate the story of a spec and write it atomically.
+
+    Parameters
+    ----------
+    spec (dict): The story spec.
+    output_folder (Path): The story_texts folder.
+    rate_limiter (RateLimiter): The rate limiter shared by the workers.
+
+    Returns
+    -------
+    Path: The story file.
+    """
+    writer = Writer(
+        number_of_breakpoints=spec["number_of_breakpoints"],
+        breakpoint_symbol="||",
+        rate_limiter=rate_limiter,
+    )
+    story = writer.generate_story(
+        number_phrases=spec["number_phrases"],
+        characters=spec["characters"],
+        age_of_the_audience=spec["age_of_the_audience"],
+        language=spec["language"],
+        story_context=spec["story_context"],
+    )
+    story_path = output_folder / f"{spec['name']}.txt"
+    # An interrupted run must not leave a truncated story behind
+    tmp_path = story_path.with_suffix(".txt.tmp")
+    writer.save_story(story, tmp_path)
+    os.replace(tmp_path, story_path)
+    return story_path
+
+
+def generate_stories(
+    spec_path: Path,
+    output_folder: Path,
+    workers: int = 4,
+    requests_per_second: float = 1.0,
+):
+    """Generate the stories of a spec file that are not generated yet.
+
+    Parameters
+    ----------
+    spec_path (Path): The spec file.
+    output_folder (Path): The story_texts folder.
+    workers (int): The number of stories generated concurrently.
+    requests_per_second (float): The LLM request rate shared by the workers.
+    """
+    output_folder.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = output_folder / CHECKPOINT_FILE_NAME
+    specs = read_spec(spec_path)
+    done = read_checkpoint(checkpoint_path)
+    todo = [
+        spec
+        for spec in specs
+        if (spec["name"], spec["key"]) not in done
+        or not (output_folder / f"{spec['name']}.txt").exists()
+    ]
+    print(f"{len(specs) - len(todo)}/{len(specs)} stories already generated")
+
+    rate_limiter = RateLimiter(requests_per_second=requests_per_second)
+    checkpoint_lock = threading.Lock()
+    failed = []
+    with Progress() as progress:
+        task = progress.add_task("Generating stories...", total=len(todo))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    generate_story, spec, output_folder, rate_limiter
+                ): spec
+                for spec in todo
+            }
+            for future in as_completed(futures):
+                spec = futures[future]
+                try:
+                    future.result()
+                except Exception as error:
+                    print(f"Failed to generate {spec['name']}: {error!r}")
+                    failed.append(spec["name"])
+                else:
+                    with checkpoint_lock, open(checkpoint_path, "a") as f:
+                        entry = {"name": spec["name"], "key": spec["key"]}
+                        f.write(json.dumps(entry) + "\n")
+                progress.update(task, advance=1)
+
+    if failed:
+        print(
+            f"{len(failed)} stories failed, run again to retry them: {failed}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate stories in bulk.")
+    parser.add_argument("spec", type=Path, help="CSV or JSONL spec file")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Output folder, $BONBON_WORKSPACE_DATA/story_texts by default",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Stories generated concurrently"
+    )
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=1.0,
+        help="LLM request rate shared by the workers",
+    )
+    args = parser.parse_args()
+    output_folder = args.output
+    if output_folder is None:
+        workspace = Path(os.getenv("BONBON_WORKSPACE_DATA"))
+        output_folder = workspace / "story_texts"
+    generate_stories(
+        args.spec, output_folder, args.workers, args.requests_per_second
+    )
+
+
+if __name__ == "__main__":
+    main()
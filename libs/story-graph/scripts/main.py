@@ -4,6 +4,7 @@ from pathlib import Path
 from bb.lib.story_graph import AnswerChecker
 from bb.lib.story_graph.asker import Asker
 from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.resumer import Resumer
 from bb.lib.story_graph.writer import Writer
 
 
@@ -69,6 +70,7 @@ def check_graph():
     graph.create_graph(
         story=story, question_answer_list=all_questions, language="French"
     )
+    Resumer().summarize_graph(graph)
     graph.plot_graph(workspace_data / "story_graph_mickey_donald_tour_de_la_terre.svg")
     graph.save_graph(workspace_data / "story_graph_mickey_donald_tour_de_la_terre.json")
 
@@ -0,0 +1,126 @@
+from typing import Callable
+
+import pytest
+
+from bb.lib.large_language_model import (
+    LLM,
+    LLMMetrics,
+    LLMScheduler,
+    RetryPolicy,
+    SingleFlight,
+)
+from bb.lib.story_graph import answer_checker, asker, writer
+from bb.lib.story_graph.answer_checker import AnswerChecker
+from bb.lib.story_graph.asker import Asker, QuestionAnswer
+from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.writer import Writer
+
+STORY = "Part A||Part B||Part C||Part D"
+
+# Generation order differs from the routing order, hardest first
+QUESTION_ANSWER_LIST = [
+    [
+        QuestionAnswer("Question A easy", "a", "easy"),
+        QuestionAnswer("Question A hard", "b", "hard"),
+        QuestionAnswer("Question A medium", "c", "medium"),
+    ],
+    [
+        QuestionAnswer("Question B medium", "d", "medium"),
+        QuestionAnswer("Question B easy", "e", "easy"),
+        QuestionAnswer("Question B easy again", "f", "easy"),
+    ],
+    [QuestionAnswer("Question C hard", "g", "hard")],
+]
+
+
+@pytest.fixture
+def question_answer_list() -> list[list[QuestionAnswer]]:
+    """The questions of the three first parts of `STORY`."""
+    return QUESTION_ANSWER_LIST
+
+
+@pytest.fixture
+def story_graph() -> StoryGraph:
+    """A story of four parts with unsorted questions of each difficulty."""
+    graph = StoryGraph()
+    graph.create_graph(STORY, QUESTION_ANSWER_LIST, "French")
+    return graph
+
+
+class ScriptedLLM(LLM):
+    """LLM answering with a function of the prompt, recording the prompts."""
+
+    def __init__(self, respond: Callable[[str], str], **kwargs):
+        kwargs.pop("response_format", None)
+        # No provider budget to share, do not wait for the default limits
+        kwargs.pop("rate_limiter", None)
+        # Retry the provider errors once, without backoff
+        kwargs["retry_policy"] = RetryPolicy(max_attempts=2, initial_backoff=0)
+        super().__init__(
+            metrics=LLMMetrics(),
+            scheduler=LLMScheduler(),
+            single_flight=SingleFlight(),
+            **kwargs,
+        )
+        self.respond = respond
+        self.prompts = []
+
+    def get_model(self) -> str:
+        return "scripted-model"
+
+    def _generate_text(self, prompt: str, timeout: float | None = None) -> str:
+        self.prompts.append(prompt)
+        return self.respond(prompt)
+
+
+@pytest.fixture
+def scripted_llm() -> type[ScriptedLLM]:
+    """The `ScriptedLLM` class, to patch the LLM of other components."""
+    return ScriptedLLM
+
+
+@pytest.fixture
+def make_asker(monkeypatch) -> Callable[[Callable[[str], str]], Asker]:
+    """Create an `Asker` whose LLMs answer with the given function."""
+
+    def make(respond: Callable[[str], str]) -> Asker:
+        monkeypatch.setattr(
+            asker,
+            "get_llm",
+            lambda **kwargs: ScriptedLLM(respond, cache=None, **kwargs),
+        )
+        return Asker()
+
+    return make
+
+
+@pytest.fixture
+def make_answer_checker(monkeypatch) -> Callable[..., AnswerChecker]:
+    """Create an `AnswerChecker` whose LLM answers with the given function."""
+
+    def make(respond: Callable[[str], str], **kwargs) -> AnswerChecker:
+        monkeypatch.setattr(
+            answer_checker,
+            "get_llm",
+            lambda **llm_kwargs: ScriptedLLM(
+                respond, cache=None, **llm_kwargs
+            ),
+        )
+        return AnswerChecker(**kwargs)
+
+    return make
+
+
+@pytest.fixture
+def make_writer(monkeypatch) -> Callable[..., Writer]:
+    """Create a `Writer` whose LLM answers with the given function."""
+
+    def make(respond: Callable[[str], str], **kwargs) -> Writer:
+        monkeypatch.setattr(
+            writer,
+            "get_llm",
+            lambda **llm_kwargs: ScriptedLLM(respond, **llm_kwargs),
+        )
+        return Writer(**kwargs)
+
+    return make
@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    "gt_answer, listener_answer",
+    [
+        ("Mickey", "mickey !"),
+        ("L'éléphant", "elephant"),
+        ("trois pommes", "3 pommes"),
+    ],
+)
+def test_exact_tier(make_answer_checker, gt_answer, listener_answer):
+    checker = make_answer_checker(lambda prompt: "False")
+    verdict = checker.check("", "", gt_answer, listener_answer)
+    assert (verdict.correct, verdict.tier) == (True, "exact")
+    assert checker.llm.prompts == []
+
+
+@pytest.mark.parametrize(
+    "gt_answer, listener_answer",
+    [
+        ("Mickey et Donald", "c'est Micky et Donald"),
+        ("les pommes rouges", "pommes rouge"),
+    ],
+)
+def test_fuzzy_tier_accepts_typos(
+    make_answer_checker, gt_answer, listener_answer
+):
+    checker = make_answer_checker(lambda prompt: "False")
+    verdict = checker.check("", "", gt_answer, listener_answer)
+    assert (verdict.correct, verdict.tier) == (True, "fuzzy")
+    assert checker.llm.prompts == []
+
+
+@pytest.mark.parametrize(
+    "gt_answer, listener_answer",
+    [
+        ("sept ans", "dix-sept ans"),
+        ("dix-sept ans", "sept ans"),
+        ("deux pommes rouges", "trois pommes rouges"),
+        ("He found two golden keys", "He found three golden keys"),
+        ("Aurora", "la princesse Aurore"),
+        ("la princesse Aurore", "Aurora"),
+        ("rouge", "ce n'est pas rouge"),
+    ],
+)
+def test_different_numbers_and_words_go_to_the_llm(
+    make_answer_checker, gt_answer, listener_answer
+):
+    checker = make_answer_checker(lambda prompt: "False")
+    verdict = checker.check("", "", gt_answer, listener_answer)
+    assert (verdict.correct, verdict.tier) == (False, "llm")
+    assert len(checker.llm.prompts) == 1
+
+
+def test_empty_answer_is_rejected(make_answer_checker):
+    checker = make_answer_checker(lambda prompt: "True")
+    assert checker.check("", "", "Mickey", "?!").tier == "exact"
+    assert not checker.is_correct("", "", "Mickey", "?!")
+
+
+def test_invalid_llm_response_accepts_the_answer(make_answer_checker):
+    checker = make_answer_checker(lambda prompt: "Maybe")
+    verdict = checker.check("", "", "Mickey", "la souris")
+    assert (verdict.correct, verdict.tier) == (True, "llm")
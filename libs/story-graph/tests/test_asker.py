@@ -0,0 +1,248 @@
+import json
+import re
+
+import pytest
+
+from bb.lib.story_graph.asker import Asker, QuestionAnswer
+
+STORY = "Part A||Part B||Part C||"
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def get_requested(prompt: str) -> list[tuple[int, str]]:
+    """The (part, difficulty) pairs requested by a batched prompt."""
+    return [
+        (int(part), difficulty)
+        for part, difficulty in re.findall(
+            r"- part (\d+), difficulty (\w+)", prompt
+        )
+    ]
+
+
+def make_entry(part: int, difficulty: str) -> dict:
+    return {
+        "part": part,
+        "difficulty": difficulty,
+        "question": f"Question {part} {difficulty}",
+        "answer": f"answer {part} {difficulty}",
+    }
+
+
+def answer_batched(prompt: str) -> str:
+    return json.dumps(
+        {
+            "questions": [
+                make_entry(part, difficulty)
+                for part, difficulty in get_requested(prompt)
+            ]
+        }
+    )
+
+
+def test_batched_generates_all_questions_in_one_call(make_asker):
+    asker = make_asker(answer_batched)
+    questions = asker.generate_questions(STORY, batched=True)
+    assert len(asker.batch_llm.prompts) == 1
+    assert questions == [
+        [
+            QuestionAnswer(
+                f"Question {i} {difficulty}",
+                f"answer {i} {difficulty}",
+                difficulty,
+            )
+            for difficulty in DIFFICULTIES
+        ]
+        for i in range(3)
+    ]
+
+
+def test_batched_asks_only_for_the_missing_questions(make_asker):
+    def respond(prompt: str) -> str:
+        requested = get_requested(prompt)
+        if len(requested) < 9:
+            return answer_batched(prompt)
+        # The first round misses, duplicates or breaks some entries
+        entries = [make_entry(*pair) for pair in requested[:6]]
+        entries[1]["answer"] = " "
+        entries.append(make_entry(0, "easy"))
+        entries.append(make_entry(7, "easy"))
+        entries.append("not an entry")
+        return json.dumps({"questions": entries})
+
+    asker = make_asker(respond)
+    completed = []
+    questions = asker.generate_questions(
+        STORY,
+        batched=True,
+        callback=lambda i, part_questions: completed.append(i),
+    )
+    first, second = asker.batch_llm.prompts
+    assert get_requested(second) == [
+        (0, "medium"),
+        (2, "easy"),
+        (2, "medium"),
+        (2, "hard"),
+    ]
+    assert "Part 1:" not in second
+    assert completed == [1, 0, 2]
+    assert questions[0][1].question == "Question 0 medium"
+
+
+def test_batched_raises_after_max_rounds(make_asker):
+    asker = make_asker(lambda prompt: "not json")
+    with pytest.raises(ValueError, match="Missing questions after 2 rounds"):
+        asker.generate_questions(STORY, batched=True, max_rounds=2)
+    assert len(asker.batch_llm.prompts) == 2
+
+
+def test_parse_batched_output():
+    output = json.dumps(
+        {
+            "questions": [
+                make_entry(0, "easy"),
+                {"part": 0, "difficulty": "hard", "question": "Question"},
+                {**make_entry(1, "easy"), "question": 3},
+            ]
+        }
+    )
+    pairs = [(0, "easy"), (0, "hard"), (1, "easy")]
+    assert Asker._parse_batched_output(output, pairs) == {
+        (0, "easy"): QuestionAnswer(
+            "Question 0 easy", "answer 0 easy", "easy"
+        )
+    }
+    assert Asker._parse_batched_output('{"questions": 3}', pairs) == {}
+    assert Asker._parse_batched_output("[]", pairs) == {}
+
+
+def answer_pair(prompt: str) -> str:
+    part, difficulty = re.search(
+        r"story: Part (\w)\..*difficulty level: (\w+)\.", prompt
+    ).groups()
+    return f"Question {part} {difficulty} || answer {part} {difficulty}"
+
+
+def test_concurrent_generates_each_pair(make_asker):
+    asker = make_asker(answer_pair)
+    completed = []
+    questions = asker.generate_questions(
+        STORY,
+        max_workers=2,
+        callback=lambda i, part_questions: completed.append(i),
+    )
+    assert len(asker.llm.prompts) == 9
+    assert sorted(completed) == [0, 1, 2]
+    assert [
+        [(question.question, question.difficulty) for question in part]
+        for part in questions
+    ] == [
+        [
+            (f"Question {part} {difficulty} ", difficulty)
+            for difficulty in DIFFICULTIES
+        ]
+        for part in "ABC"
+    ]
+
+
+def test_concurrent_asks_again_an_invalid_output(make_asker):
+    outputs = {}
+
+    def respond(prompt: str) -> str:
+        outputs[prompt] = outputs.get(prompt, 0) + 1
+        if "Part B" in prompt and outputs[prompt] == 1:
+            return "no separator"
+        return answer_pair(prompt)
+
+    asker = make_asker(respond)
+    questions = asker.generate_questions(STORY)
+    assert len(asker.llm.prompts) == 12
+    assert questions[1][0].answer == " answer B easy"
+
+
+def test_concurrent_does_not_retry_provider_errors_again(make_asker):
+    def respond(prompt: str) -> str:
+        if "Part B" in prompt:
+            raise ConnectionError("provider down")
+        return answer_pair(prompt)
+
+    asker = make_asker(respond)
+    with pytest.raises(ValueError, match="Failed to generate") as error:
+        asker.generate_questions(STORY, max_attempts=3)
+    assert isinstance(error.value.__cause__, ConnectionError)
+    # Only the 2 attempts of the LLM retry policy for each failed pair
+    failed_prompts = [p for p in asker.llm.prompts if "Part B" in p]
+    assert len(failed_prompts) == 2 * 3
+
+
+@pytest.mark.parametrize("kwargs", [{"max_attempts": 0}, {"max_workers": 0}])
+def test_concurrent_invalid_limits(make_asker, kwargs):
+    asker = make_asker(answer_pair)
+    with pytest.raises(ValueError, match="Invalid max_"):
+        asker.generate_questions(STORY, **kwargs)
+    assert asker.llm.prompts == []
+
+
+def test_incremental_generates_only_the_edited_parts(make_asker):
+    previous = {
+        "Part A": [
+            QuestionAnswer("Previous A hard", "a", "hard"),
+            QuestionAnswer("Previous A easy", "a", "easy"),
+            QuestionAnswer("Previous A medium", "a", "medium"),
+        ],
+        # A difficulty is missing, the part is generated again
+        "Part C": [QuestionAnswer("Previous C easy", "c", "easy")],
+    }
+    asker = make_asker(answer_pair)
+    completed = []
+    questions = asker.generate_questions(
+        " Part A ||Part B||Part C||",
+        previous_questions=previous,
+        callback=lambda i, part_questions: completed.append(i),
+    )
+    assert len(asker.llm.prompts) == 6
+    assert not any("Part A" in prompt for prompt in asker.llm.prompts)
+    # The reused questions follow the order of the difficulties
+    assert [question.question for question in questions[0]] == [
+        "Previous A easy",
+        "Previous A medium",
+        "Previous A hard",
+    ]
+    assert questions[2][0].question == "Question C easy "
+    assert completed[0] == 0 and sorted(completed) == [0, 1, 2]
+
+
+def test_incremental_batched(make_asker):
+    previous = {
+        "Part B": [
+            QuestionAnswer(f"Previous B {difficulty}", "b", difficulty)
+            for difficulty in DIFFICULTIES
+        ]
+    }
+    asker = make_asker(answer_batched)
+    questions = asker.generate_questions(
+        STORY, batched=True, previous_questions=previous
+    )
+    (prompt,) = asker.batch_llm.prompts
+    assert "Part B" not in prompt
+    # The changed parts are numbered within the request
+    assert get_requested(prompt)[-1] == (1, "hard")
+    assert questions[1] == previous["Part B"]
+    assert questions[2][0].question == "Question 1 easy"
+
+
+def test_incremental_without_changes(make_asker):
+    previous = {
+        part: [QuestionAnswer(f"Previous {part}", "x", "easy")]
+        for part in ["Part A", "Part B", "Part C"]
+    }
+    asker = make_asker(answer_pair)
+    questions = asker.generate_questions(
+        STORY, questions_difficulty=["easy"], previous_questions=previous
+    )
+    assert asker.llm.prompts == []
+    assert [part[0].question for part in questions] == [
+        "Previous Part A",
+        "Previous Part B",
+        "Previous Part C",
+    ]
@@ -0,0 +1,61 @@
+import copy
+import pickle
+
+from bb.lib.story_graph.binary import is_binary_graph
+from bb.lib.story_graph.graph import StoryGraph
+
+
+def load(path) -> StoryGraph:
+    graph = StoryGraph()
+    graph.load_graph(path)
+    return graph
+
+
+def test_binary_graph_round_trip(story_graph, tmp_path):
+    path = tmp_path / "story.bin"
+    story_graph.save_graph(path)
+    assert is_binary_graph(path)
+
+    loaded_graph = load(path)
+    assert loaded_graph.language == story_graph.language
+    assert loaded_graph.get_story_dict() == story_graph.get_story_dict()
+    assert dict(loaded_graph.routing) == story_graph.routing
+
+
+def test_binary_graph_saved_again(story_graph, tmp_path):
+    story_graph.save_graph(tmp_path / "story.bin")
+    loaded_graph = load(tmp_path / "story.bin")
+    loaded_graph.save_graph(tmp_path / "copy.bin")
+    loaded_graph.save_graph(tmp_path / "copy.json")
+
+    assert load(tmp_path / "copy.bin").get_story_dict() == (
+        story_graph.get_story_dict()
+    )
+    assert load(tmp_path / "copy.json").get_story_dict() == (
+        story_graph.get_story_dict()
+    )
+
+
+def test_binary_graph_deepcopy(story_graph, tmp_path):
+    story_graph.save_graph(tmp_path / "story.bin")
+    loaded_graph = load(tmp_path / "story.bin")
+
+    copied_graph = copy.deepcopy(loaded_graph)
+    copied_graph.get_node("story_1").content = "Edited"
+    assert copied_graph.get_node("story_1").content == "Edited"
+    assert loaded_graph.get_node("story_1").content == "Part B"
+
+    pickled_graph = pickle.loads(pickle.dumps(loaded_graph))
+    assert pickled_graph.get_story_dict() == story_graph.get_story_dict()
+
+
+def test_binary_graph_rewritten_while_loaded(story_graph, tmp_path):
+    path = tmp_path / "story.bin"
+    story_graph.save_graph(path)
+    loaded_graph = load(path)
+
+    story_graph.get_node("story_1").content = "Rewritten"
+    story_graph.save_graph(path)
+    # The loaded graph keeps reading the previous file
+    assert loaded_graph.get_node("story_1").content == "Part B"
+    assert load(path).get_node("story_1").content == "Rewritten"
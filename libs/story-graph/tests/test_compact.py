@@ -0,0 +1,98 @@
+import pytest
+
+from bb.lib.story_graph.compact import NO_NODE, CompactStoryGraph
+from bb.lib.story_graph.graph import StoryGraph
+
+
+@pytest.fixture
+def compact(story_graph: StoryGraph) -> CompactStoryGraph:
+    return CompactStoryGraph.from_graph(story_graph)
+
+
+def test_nodes_match_story_graph(
+    story_graph: StoryGraph, compact: CompactStoryGraph
+):
+    assert len(compact) == len(story_graph.graph_nodes)
+    assert compact.language == "French"
+    for node_id, node in story_graph.graph_nodes.items():
+        assert compact.get_node(node_id) == node
+        assert compact.is_question(node_id) == node_id.startswith("question")
+
+
+def test_questions_in_routing_order(compact: CompactStoryGraph):
+    questions = compact.get_questions(compact.get_index("story_0"))
+    assert [compact.ids[i] for i in questions] == [
+        "question_0_1",
+        "question_0_2",
+        "question_0_0",
+    ]
+    # Easy questions keep their generation order
+    questions = compact.get_questions(compact.get_index("question_1_0"))
+    assert [compact.ids[i] for i in questions] == [
+        "question_1_0",
+        "question_1_1",
+        "question_1_2",
+    ]
+    assert len(compact.get_questions(compact.get_index("story_3"))) == 0
+
+
+def test_routing_matches_story_graph(
+    story_graph: StoryGraph, compact: CompactStoryGraph
+):
+    for node_id in story_graph.graph_nodes:
+        assert compact.get_next_story_node_id(
+            node_id
+        ) == story_graph.get_next_story_node_id(node_id)
+        for failed_mask in range(8):
+            assert compact.route(node_id, failed_mask) == story_graph.route(
+                node_id, failed_mask
+            )
+        if compact.is_question(node_id):
+            assert compact.get_failed_bit(
+                node_id
+            ) == story_graph.get_failed_bit(node_id)
+
+
+def test_next_question_passes_questions(
+    story_graph: StoryGraph, compact: CompactStoryGraph
+):
+    passed = ["question_0_1", "question_0_2"]
+    assert compact.get_next_question_node_id(
+        "story_0", passed
+    ) == story_graph.get_next_question_node_id("story_0", passed)
+    assert compact.get_next_question_node_id("story_0", passed) == (
+        "question_0_0"
+    )
+    passed.append("question_0_0")
+    assert compact.get_next_question_node_id("story_0", passed) is None
+    assert compact.next_question(compact.get_index("story_3")) == NO_NODE
+
+
+def test_graph_nodes_built_once(compact: CompactStoryGraph):
+    graph_nodes = compact.graph_nodes
+    assert compact.graph_nodes is graph_nodes
+    assert list(graph_nodes) == compact.ids
+
+
+@pytest.mark.parametrize(
+    "update, message",
+    [
+        (
+            lambda nodes: nodes["question_0_0"].update(difficulty="trivial"),
+            "Invalid difficulty",
+        ),
+        (
+            lambda nodes: nodes["story_0"].update(type="ImageNode"),
+            "Invalid node type",
+        ),
+        (
+            lambda nodes: nodes["story_0"]["children"].append("story_9"),
+            "Invalid edge to unknown node",
+        ),
+    ],
+)
+def test_invalid_story_dict(story_graph: StoryGraph, update, message):
+    story_dict = story_graph.get_story_dict()
+    update(story_dict["nodes"])
+    with pytest.raises(ValueError, match=message):
+        CompactStoryGraph(story_dict)
@@ -0,0 +1,110 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+SCRIPT_PATH = Path(__file__).parents[1] / "scripts" / "generate_stories.py"
+
+
+@pytest.fixture
+def generate_stories():
+    """The bulk generation script, loaded as a module."""
+    spec = importlib.util.spec_from_file_location(
+        "generate_stories", SCRIPT_PATH
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_csv(path: Path, rows: list[str]) -> Path:
+    path.write_text(
+        "\n".join(["name,characters,age,language,context,breakpoints", *rows])
+    )
+    return path
+
+
+def test_read_spec(tmp_path, generate_stories):
+    csv_path = write_csv(
+        tmp_path / "catalog.csv",
+        ['mickey,"Mickey,Donald",5,English,Une fusée,2', ',Minnie,,,,'],
+    )
+    first, second = generate_stories.read_spec(csv_path)
+    assert first["name"] == "mickey"
+    assert first["characters"] == ["Mickey", "Donald"]
+    assert first["age_of_the_audience"] == 5
+    assert first["number_of_breakpoints"] == 2
+    assert second["name"] == "story_00001"
+    assert second["language"] == "French"
+    jsonl_path = tmp_path / "catalog.jsonl"
+    jsonl_path.write_text(
+        json.dumps(
+            {
+                "name": "mickey",
+                "characters": ["Mickey", "Donald"],
+                "age": 5,
+                "language": "English",
+                "context": "Une fusée",
+                "breakpoints": 2,
+            }
+        )
+    )
+    # The key identifies the content, whatever the file format
+    (from_jsonl,) = generate_stories.read_spec(jsonl_path)
+    assert from_jsonl == first
+
+
+def test_read_spec_errors(tmp_path, generate_stories):
+    csv_path = write_csv(
+        tmp_path / "catalog.csv", ["mickey,Mickey,,,,", "mickey,Donald,,,,"]
+    )
+    with pytest.raises(ValueError, match="Duplicated story names"):
+        generate_stories.read_spec(csv_path)
+    with pytest.raises(ValueError, match="Invalid spec file"):
+        generate_stories.read_spec(tmp_path / "catalog.txt")
+
+
+def test_generate_stories_resumes(tmp_path, generate_stories, make_writer):
+    def respond(prompt: str) -> str:
+        if "Pluto" in prompt:
+            raise ConnectionError("provider down")
+        return "Il était une fois||Mickey||fin||"
+
+    make_writer(respond)
+    csv_path = write_csv(
+        tmp_path / "catalog.csv",
+        ["mickey,Mickey,,,,", "donald,Donald,,,,", "pluto,Pluto,,,,"],
+    )
+    output_folder = tmp_path / "story_texts"
+    generate_stories.generate_stories(
+        csv_path, output_folder, workers=2, requests_per_second=100
+    )
+    assert sorted(path.name for path in output_folder.glob("*.txt")) == [
+        "donald.txt",
+        "mickey.txt",
+    ]
+    checkpoint = generate_stories.read_checkpoint(
+        output_folder / generate_stories.CHECKPOINT_FILE_NAME
+    )
+    assert {name for name, _ in checkpoint} == {"mickey", "donald"}
+
+    # Only the failed story and the edited one are generated again
+    (output_folder / "mickey.txt").write_text("kept")
+    csv_path = write_csv(
+        tmp_path / "catalog.csv",
+        ["mickey,Mickey,,,,", "donald,Donald,7,,,", "pluto,Pluto,,,,"],
+    )
+    generated = []
+    original = generate_stories.generate_story
+
+    def generate_story(spec, *args):
+        generated.append(spec["name"])
+        return original(spec, *args)
+
+    generate_stories.generate_story = generate_story
+    generate_stories.generate_stories(
+        csv_path, output_folder, requests_per_second=100
+    )
+    assert sorted(generated) == ["donald", "pluto"]
+    assert (output_folder / "mickey.txt").read_text() == "kept"
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.utils import QuestionNode, StoryNode
+
+
+def test_compile_routing(story_graph: StoryGraph):
+    routing = story_graph.compile_routing()
+    chain = ["question_0_1", "question_0_2", "question_0_0"]
+    assert routing["story_0"] == {"questions": chain, "next": "story_1"}
+    assert routing["question_0_0"] == {
+        "questions": chain,
+        "bit": 2,
+        "next": "story_1",
+    }
+    # Questions of the same difficulty keep their generation order
+    assert routing["story_1"]["questions"] == [
+        "question_1_0",
+        "question_1_1",
+        "question_1_2",
+    ]
+    assert routing["story_3"] == {"questions": [], "next": None}
+
+
+def test_route_skips_failed_questions(story_graph: StoryGraph):
+    assert story_graph.route("story_0") == "question_0_1"
+    failed_mask = story_graph.get_failed_bit("question_0_1")
+    assert story_graph.route("question_0_1", failed_mask) == "question_0_2"
+    failed_mask |= story_graph.get_failed_bit("question_0_2")
+    assert story_graph.route("question_0_2", failed_mask) == "question_0_0"
+    failed_mask |= story_graph.get_failed_bit("question_0_0")
+    assert story_graph.route("question_0_0", failed_mask) is None
+    assert story_graph.get_next_story_node_id("question_0_0") == "story_1"
+    assert story_graph.get_next_story_node_id("story_3") is None
+
+
+def test_saved_routing_is_loaded(story_graph: StoryGraph, tmp_path):
+    filename = tmp_path / "graph.json"
+    story_graph.save_graph(filename)
+    with open(filename) as f:
+        assert json.load(f)["routing"] == story_graph.routing
+
+    loaded_graph = StoryGraph()
+    loaded_graph.load_graph(filename)
+    assert loaded_graph.routing == story_graph.routing
+    assert loaded_graph.route("story_2") == "question_2_0"
+
+
+def test_routing_compiled_for_graph_without_table(story_graph: StoryGraph):
+    story_dict = story_graph.get_story_dict()
+    loaded_graph = StoryGraph()
+    loaded_graph.load_story_dict(story_dict)
+    assert loaded_graph.routing is None
+    assert loaded_graph.route("story_1") == "question_1_0"
+    assert loaded_graph.routing == story_graph.compile_routing()
+
+
+def add_dangling_child(graph: StoryGraph):
+    graph.graph_nodes["story_0"].add_child("story_9")
+
+
+def add_story_child(graph: StoryGraph):
+    graph.graph_nodes["story_3"].add_child("story_2")
+    graph.graph_nodes["story_2"].add_parent("story_3")
+
+
+def set_invalid_difficulty(graph: StoryGraph):
+    graph.graph_nodes["question_0_0"].difficulty = "trivial"
+
+
+def add_second_parent(graph: StoryGraph):
+    graph.graph_nodes["question_0_0"].add_parent("story_2")
+    graph.graph_nodes["story_2"].add_child("question_0_0")
+
+
+def add_unreachable_story(graph: StoryGraph):
+    graph.graph_nodes["story_9"] = StoryNode("story_9", "Part Z", [], [])
+
+
+def remove_first_story(graph: StoryGraph):
+    node = graph.graph_nodes.pop("story_0")
+    for question_id in node.children:
+        del graph.graph_nodes[question_id]
+    for node in graph.graph_nodes.values():
+        if isinstance(node, QuestionNode):
+            continue
+        node.parents = [
+            parent_id
+            for parent_id in node.parents
+            if parent_id in graph.graph_nodes
+        ]
+
+
+@pytest.mark.parametrize(
+    "corrupt, message",
+    [
+        (add_dangling_child, "Invalid child of story_0"),
+        (add_story_child, "Invalid story node with story children"),
+        (set_invalid_difficulty, "Invalid difficulty of question_0_0"),
+        (add_second_parent, "Invalid question node"),
+        (add_unreachable_story, "Invalid graph with unreachable story nodes"),
+        (remove_first_story, "Invalid graph without first story node"),
+    ],
+)
+def test_compile_routing_rejects_invalid_graph(
+    story_graph: StoryGraph, corrupt, message
+):
+    corrupt(story_graph)
+    with pytest.raises(ValueError, match=message):
+        story_graph.compile_routing()
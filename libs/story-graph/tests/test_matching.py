@@ -0,0 +1,68 @@
+import pytest
+
+from bb.lib.story_graph.matching import (
+    get_extra_tokens,
+    get_unmatched_tokens,
+    normalize_answer,
+    normalize_numbers,
+    strip_accents,
+    token_set_ratio,
+)
+
+
+def test_strip_accents():
+    assert strip_accents("éléphant à l'Île") == "elephant a l'Ile"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Le Chat!", ["chat"]),
+        ("L'éléphant", ["elephant"]),
+        ("un", ["un"]),
+        ("un chat", ["chat"]),
+        ("dix-sept ans", ["17", "ans"]),
+        ("vingt et un", ["21"]),
+        ("quatre-vingt-dix", ["90"]),
+        ("deux cents", ["200"]),
+        ("one hundred and two", ["102"]),
+        ("three golden keys", ["3", "golden", "keys"]),
+    ],
+)
+def test_normalize_answer(text, expected):
+    assert normalize_answer(text) == expected
+
+
+def test_normalize_numbers_keeps_lone_articles():
+    assert normalize_numbers(["une", "pomme"]) == ["une", "pomme"]
+    assert normalize_numbers(["et", "deux"]) == ["et", "2"]
+
+
+def test_get_extra_tokens_ignores_filler_words():
+    answer = normalize_answer("c'est Mickey et Donald")
+    assert get_extra_tokens(answer, ["mickey"]) == {"et", "donald"}
+
+
+def test_token_set_ratio():
+    answer = normalize_answer("je pense que c'est Mickey")
+    assert token_set_ratio(answer, ["mickey"]) == 1
+    assert token_set_ratio(["rouge", "ou", "bleu"], ["rouge"]) < 0.9
+
+
+@pytest.mark.parametrize(
+    "answer, gt, expected",
+    [
+        ("Micky", "Mickey", set()),
+        ("c'est Mickey", "Mickey", set()),
+        ("sept ans", "dix-sept ans", {"7"}),
+        ("dix-sept ans", "sept ans", {"17"}),
+        ("la princesse Aurore", "Aurora", {"princesse"}),
+        ("Aurora", "la princesse Aurore", set()),
+        ("le chat noir", "le chien noir", {"chat"}),
+    ],
+)
+def test_get_unmatched_tokens(answer, gt, expected):
+    assert (
+        get_unmatched_tokens(normalize_answer(answer), normalize_answer(gt))
+        == expected
+    )
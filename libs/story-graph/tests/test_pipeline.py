@@ -0,0 +1,130 @@
+import json
+import re
+from collections import Counter
+
+import pytest
+
+from bb.lib.story_graph import asker, resumer, writer
+from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.pipeline import (
+    ArtifactCache,
+    StoryPipeline,
+    get_audio_path,
+)
+
+STORY = "Part A||Part B||Part C||Part D"
+
+
+def respond(prompt: str) -> str:
+    """Answer the prompts of the Writer, the Asker and the Resumer."""
+    if prompt.startswith("Generate a story"):
+        return STORY
+    if prompt.startswith("Here are parts of a story"):
+        pairs = re.findall(r"- part (\d+), difficulty (\w+)", prompt)
+        return json.dumps(
+            {
+                "questions": [
+                    {
+                        "part": int(part),
+                        "difficulty": difficulty,
+                        "question": f"Question {part} {difficulty}?",
+                        "answer": "answer",
+                    }
+                    for part, difficulty in pairs
+                ]
+            }
+        )
+    return "Summary"
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, scripted_llm) -> StoryPipeline:
+    """A pipeline without audio stage, counting the LLM calls by caller."""
+    calls = Counter()
+
+    class CountingLLM(scripted_llm):
+        def _generate_text(self, prompt, timeout=None):
+            calls[self.caller] += 1
+            return super()._generate_text(prompt, timeout)
+
+    for module in [asker, resumer, writer]:
+        monkeypatch.setattr(
+            module, "get_llm", lambda **kwargs: CountingLLM(respond, **kwargs)
+        )
+    monkeypatch.setattr(
+        StoryGraph, "plot_graph", lambda self, path: open(path, "w").close()
+    )
+    pipeline = StoryPipeline(tmp_path, tts_model_name=None)
+    pipeline.calls = calls
+    return pipeline
+
+
+def test_artifact_cache(tmp_path):
+    cache = ArtifactCache(tmp_path)
+    key = cache.make_key("stage", {"b": 1, "a": 2})
+    assert key == cache.make_key("stage", {"a": 2, "b": 1})
+    assert key != cache.make_key("other", {"a": 2, "b": 1})
+    computed = []
+
+    def compute(path):
+        computed.append(path)
+        path.write_text("artifact")
+
+    path = cache.run("stage", {"a": 1}, compute)
+    assert cache.run("stage", {"a": 1}, compute) == path
+    assert path.read_text() == "artifact" and len(computed) == 1
+    assert cache.run("stage", {"a": 2}, compute) != path
+
+
+def test_artifact_cache_keeps_no_failed_artifact(tmp_path):
+    cache = ArtifactCache(tmp_path)
+
+    def compute(path):
+        path.write_text("partial")
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        cache.run("stage", {}, compute)
+    assert not cache.get_path("stage", cache.make_key("stage", {})).exists()
+
+
+def test_compile(pipeline, tmp_path):
+    graph_path = pipeline.compile("mickey", spec={"characters": ["Mickey"]})
+    assert graph_path == tmp_path / "story_graphs" / "mickey.json"
+    assert (tmp_path / "story_texts" / "mickey.txt").read_text() == STORY
+    for suffix in [".bin", ".svg"]:
+        assert (tmp_path / "story_graphs" / f"mickey{suffix}").exists()
+    graph = StoryGraph()
+    graph.load_graph(graph_path)
+    questions = graph.get_questions_by_part()
+    assert {part: len(questions[part]) for part in questions} == {
+        "Part A": 2,
+        "Part B": 2,
+        "Part C": 2,
+        "Part D": 0,
+    }
+    assert pipeline.calls == {"Writer": 1, "Asker": 1, "Resumer": 4}
+
+
+def test_compile_again_reuses_the_artifacts(pipeline):
+    spec = {"characters": ["Mickey"]}
+    pipeline.compile("mickey", spec=spec)
+    pipeline.calls.clear()
+    pipeline.compile("mickey", spec=spec)
+    assert pipeline.calls == {}
+
+
+def test_compile_edited_story(pipeline):
+    pipeline.compile("mickey", story=STORY)
+    pipeline.calls.clear()
+    pipeline.compile("mickey", story="Part A||Part B edited||Part C||Part D")
+    # Only the questions of the edited part and the summaries from the
+    # edited part on are generated again
+    assert pipeline.calls == {"Asker": 1, "Resumer": 3}
+
+
+def test_get_audio_path(tmp_path):
+    path = get_audio_path(tmp_path, "TTSCoqui", "French", "Bonjour")
+    assert path.parent == tmp_path / "audio_cache" / "TTSCoqui" / "French"
+    assert path == get_audio_path(tmp_path, "TTSCoqui", "French", "Bonjour")
+    assert path != get_audio_path(tmp_path, "TTSCoqui", "French", "Salut")
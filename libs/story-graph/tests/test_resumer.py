@@ -0,0 +1,87 @@
+import pytest
+
+from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.resumer import Resumer
+
+
+class FakeLLM:
+    """LLM numbering its answers, recording the prompts."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_text(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return f"Summary {len(self.prompts)}"
+
+
+def get_resumer() -> tuple[Resumer, FakeLLM]:
+    resumer = Resumer.__new__(Resumer)
+    resumer.llm = FakeLLM()
+    return resumer, resumer.llm
+
+
+def get_summaries(graph: StoryGraph) -> list[str]:
+    return [graph.get_node(f"story_{i}").summary for i in range(4)]
+
+
+def test_summarize_graph(story_graph):
+    resumer, llm = get_resumer()
+    resumer.summarize_graph(story_graph)
+
+    assert len(llm.prompts) == 4
+    assert get_summaries(story_graph) == [
+        "Summary 1",
+        "Summary 2",
+        "Summary 3",
+        "Summary 4",
+    ]
+    assert "Part A" in llm.prompts[0]
+    assert "Summary 1" in llm.prompts[1] and "Part B" in llm.prompts[1]
+
+
+def test_summarize_graph_reuses_the_unchanged_prefix(
+    story_graph, question_answer_list, tmp_path
+):
+    resumer, llm = get_resumer()
+    resumer.summarize_graph(story_graph)
+    story_graph.save_graph(tmp_path / "story.json")
+    previous_graph = StoryGraph()
+    previous_graph.load_graph(tmp_path / "story.json")
+
+    graph = StoryGraph()
+    graph.create_graph(
+        "Part A||Part B||Part X||Part D", question_answer_list, "French"
+    )
+    llm.prompts.clear()
+    indexes = []
+    resumer.summarize_graph(
+        graph, previous_graph, callback=lambda index, _: indexes.append(index)
+    )
+
+    # Only the edited part and the parts after it are summarized again
+    assert len(llm.prompts) == 2
+    assert get_summaries(graph)[:2] == ["Summary 1", "Summary 2"]
+    assert "Summary 2" in llm.prompts[0] and "Part X" in llm.prompts[0]
+    assert indexes == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("filename", ["story.json", "story.bin"])
+def test_summarize_graph_without_changes(
+    story_graph, question_answer_list, tmp_path, filename
+):
+    resumer, llm = get_resumer()
+    resumer.summarize_graph(story_graph)
+    story_graph.save_graph(tmp_path / filename)
+    previous_graph = StoryGraph()
+    previous_graph.load_graph(tmp_path / filename)
+
+    graph = StoryGraph()
+    graph.create_graph(
+        "Part A||Part B||Part C||Part D", question_answer_list, "French"
+    )
+    llm.prompts.clear()
+    resumer.summarize_graph(graph, previous_graph)
+
+    assert llm.prompts == []
+    assert get_summaries(graph) == get_summaries(story_graph)
@@ -0,0 +1,151 @@
+import pytest
+
+from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.session import (
+    CONTINUE,
+    CORRECT_ANSWER,
+    WRONG_ANSWER,
+    StorySession,
+    step,
+)
+from bb.lib.story_graph.utils import QuestionNode
+
+QUESTION_IDS = [
+    "question_0_0",
+    "question_0_1",
+    "question_0_2",
+    "question_1_0",
+    "question_1_1",
+    "question_1_2",
+    "question_2_0",
+]
+
+
+def get_baseline_next_question_node_id(
+    graph_nodes: dict, node_id: str, question_to_pass: list[str] | None = None
+) -> str | None:
+    """The `get_next_question_node_id` of the recursive traversal."""
+    story_node_id = node_id
+    if isinstance(graph_nodes[node_id], QuestionNode):
+        story_node_id = graph_nodes[node_id].parents[0]
+    question_node_ids = graph_nodes[story_node_id].children
+    question_dict = {"easy": [], "medium": [], "hard": []}
+    if question_to_pass is not None:
+        question_node_ids = [
+            question_node_id
+            for question_node_id in question_node_ids
+            if question_node_id not in question_to_pass
+        ]
+    for question_node_id in question_node_ids:
+        question_dict[graph_nodes[question_node_id].difficulty].append(
+            question_node_id
+        )
+    for difficulty in ["hard", "medium", "easy"]:
+        if len(question_dict[difficulty]) > 0:
+            return question_dict[difficulty][0]
+    return None
+
+
+def play_baseline(graph_nodes: dict, correct_ids: set[str]) -> list[str]:
+    """Visit the nodes like the recursive `start_story` did."""
+    visited = []
+    node_id = "story_0"
+    question_to_pass = []
+    while node_id is not None:
+        visited.append(node_id)
+        node = graph_nodes[node_id]
+        if not isinstance(node, QuestionNode):
+            node_id = get_baseline_next_question_node_id(graph_nodes, node_id)
+            question_to_pass = []
+        elif node_id in correct_ids:
+            node_id = node.children[0]
+        else:
+            question_to_pass.append(node_id)
+            node_id = (
+                get_baseline_next_question_node_id(
+                    graph_nodes, node_id, question_to_pass
+                )
+                or node.children[0]
+            )
+    return visited
+
+
+def play_session(story_graph, correct_ids: set[str]) -> list[str]:
+    """Visit the nodes by stepping a `StorySession`."""
+    visited = []
+    session = StorySession()
+    while not session.finished:
+        visited.append(session.node_id)
+        if not story_graph.is_question(session.node_id):
+            event = CONTINUE
+        elif session.node_id in correct_ids:
+            event = CORRECT_ANSWER
+        else:
+            event = WRONG_ANSWER
+        session = step(story_graph, session, event)
+    return visited
+
+
+@pytest.fixture(params=["graph", "compact", "binary"])
+def played_graph(request, story_graph, tmp_path):
+    """The story graph in each of the representations the players drive."""
+    if request.param == "graph":
+        return story_graph
+    if request.param == "compact":
+        return story_graph.to_compact()
+    path = tmp_path / "story.bin"
+    story_graph.save_graph(path, file_format="binary")
+    loaded_graph = StoryGraph()
+    loaded_graph.load_graph(path)
+    return loaded_graph
+
+
+@pytest.mark.parametrize(
+    "correct_ids",
+    [
+        set(),
+        set(QUESTION_IDS),
+        {"question_0_2", "question_1_1"},
+        {"question_0_0", "question_2_0"},
+        {"question_1_2"},
+    ],
+)
+def test_step_visits_the_baseline_order(
+    story_graph, played_graph, correct_ids
+):
+    expected = play_baseline(story_graph.graph_nodes, correct_ids)
+    assert play_session(played_graph, correct_ids) == expected
+
+
+def test_step_asks_hardest_first_then_falls_back(played_graph):
+    visited = play_session(played_graph, {"question_0_0", "question_1_2"})
+    assert visited == [
+        "story_0",
+        # Hard, then medium, then easy
+        "question_0_1",
+        "question_0_2",
+        "question_0_0",
+        "story_1",
+        # Same difficulty in the generation order
+        "question_1_0",
+        "question_1_1",
+        "question_1_2",
+        "story_2",
+        # All the questions failed, the story goes on
+        "question_2_0",
+        "story_3",
+    ]
+
+
+def test_step_rejects_invalid_events(played_graph):
+    with pytest.raises(ValueError):
+        step(played_graph, StorySession(), CORRECT_ANSWER)
+    with pytest.raises(ValueError):
+        step(played_graph, StorySession(node_id="question_0_1"), CONTINUE)
+    with pytest.raises(ValueError):
+        step(played_graph, StorySession(finished=True), CONTINUE)
+
+
+def test_session_round_trips_through_a_dictionary():
+    session = StorySession(node_id="question_1_1", failed_mask=0b1)
+    assert StorySession.from_dict(session.to_dict()) == session
@@ -0,0 +1,72 @@
+from bb.lib.story_graph.verdict_cache import (
+    VerdictCache,
+    get_default_verdict_cache,
+)
+
+
+def test_get_and_set(tmp_path):
+    cache = VerdictCache(tmp_path / "verdicts.sqlite")
+    assert cache.get("Part A", "Question?", "Mickey", "micky") is None
+    cache.set("Part A", "Question?", "Mickey", "micky", True)
+    cache.set("Part A", "Question?", "Mickey", "Donald", False)
+    assert cache.get("Part A", "Question?", "Mickey", "micky") is True
+    assert cache.get("Part A", "Question?", "Mickey", "Donald") is False
+    # Another question or story part is judged again
+    assert cache.get("Part A", "Other question?", "Mickey", "micky") is None
+    assert cache.get("Part B", "Question?", "Mickey", "micky") is None
+
+
+def test_keys_share_normalized_answers():
+    key = VerdictCache.make_key("Part A", "Question?", "Mickey", "la Souris")
+    assert key == VerdictCache.make_key(
+        "Part A", "Question?", "mickey !", "souris"
+    )
+    assert key != VerdictCache.make_key(
+        "Part A", "Question?", "Mickey", "le chat"
+    )
+
+
+def test_eviction(tmp_path):
+    cache = VerdictCache(tmp_path / "verdicts.sqlite", max_entries=2)
+    for answer in ["a", "b", "c"]:
+        cache.set("Part A", "Question?", "a", answer, True)
+    assert cache.get("Part A", "Question?", "a", "a") is None
+    assert cache.get("Part A", "Question?", "a", "c") is True
+
+
+def test_shared_between_processes(tmp_path):
+    VerdictCache(tmp_path / "verdicts.sqlite").set(
+        "Part A", "Question?", "Mickey", "micky", True
+    )
+    cache = VerdictCache(tmp_path / "verdicts.sqlite")
+    assert cache.get("Part A", "Question?", "Mickey", "micky") is True
+
+
+def test_default_verdict_cache(tmp_path, monkeypatch):
+    get_default_verdict_cache.cache_clear()
+    monkeypatch.delenv("BONBON_VERDICT_CACHE", raising=False)
+    assert get_default_verdict_cache() is None
+    get_default_verdict_cache.cache_clear()
+    monkeypatch.setenv("BONBON_VERDICT_CACHE", str(tmp_path / "v.sqlite"))
+    monkeypatch.setenv("BONBON_VERDICT_CACHE_SIZE", "5")
+    cache = get_default_verdict_cache()
+    assert cache.store.max_entries == 5
+    assert get_default_verdict_cache() is cache
+    get_default_verdict_cache.cache_clear()
+
+
+def test_answer_checker_caches_llm_verdicts(tmp_path, make_answer_checker):
+    cache = VerdictCache(tmp_path / "verdicts.sqlite")
+    checker = make_answer_checker(
+        lambda prompt: "True", verdict_cache=cache
+    )
+    first = checker.check("Part A", "Question?", "Mickey", "la souris")
+    second = checker.check("Part A", "Question?", "Mickey", "La souris !")
+    assert (first.tier, second.tier) == ("llm", "cache")
+    assert second.correct and len(checker.llm.prompts) == 1
+    # Invalid LLM responses are not cached
+    checker.llm.respond = lambda prompt: "Maybe"
+    checker.check("Part A", "Question?", "Mickey", "Minnie")
+    assert checker.check("Part A", "Question?", "Mickey", "Minnie").tier == (
+        "llm"
+    )
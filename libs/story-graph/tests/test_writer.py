@@ -0,0 +1,37 @@
+STORY = "Il était une fois||\nMickey||et Donald||dans une fusée||fin"
+
+
+def test_handle_breakpoints_keeps_the_requested_number(make_writer):
+    writer = make_writer(lambda prompt: STORY, number_of_breakpoints=2)
+    story = writer.handle_breakpoints(STORY)
+    assert story.count("||") == 2
+    assert story.replace("||", "") == STORY.replace("||", "")
+    assert writer.handle_breakpoints("a||b") == "a||b"
+
+
+def test_generate_story(make_writer):
+    writer = make_writer(lambda prompt: STORY, number_of_breakpoints=4)
+    assert writer.generate_story(characters=["Mickey"]) == STORY.replace(
+        "\n", " "
+    )
+    (prompt,) = writer.llm.prompts
+    assert "['Mickey']" in prompt and "Add only 4 breakpoints" in prompt
+
+
+def test_generate_story_stream(make_writer):
+    writer = make_writer(lambda prompt: STORY, number_of_breakpoints=2)
+    deltas = ["Il était une fois||\n", "Mickey||et Donald||", "dans une "]
+    deltas.append("fusée||fin")
+    writer.llm._stream_text = lambda prompt: iter(deltas)
+    stories = list(writer.generate_story_stream())
+    assert stories[:-1] == [
+        "Il était une fois|| ",
+        "Il était une fois|| Mickey||et Donald||",
+        "Il était une fois|| Mickey||et Donald||dans une ",
+        STORY.replace("\n", " "),
+    ]
+    # The breakpoints are only drawn once the story is complete
+    assert stories[-1].count("||") == 2
+    assert stories[-1].replace("||", "") == STORY.replace("||", "").replace(
+        "\n", " "
+    )
@@ -6,6 +6,7 @@ using the Writer class.
 
 import gradio as gr
 from pathlib import Path
+from typing import Iterator
 from bb.lib.story_graph.writer import Writer
 import os
 
@@ -18,8 +19,8 @@ def create_story(
     story_context: str,
     number_of_breakpoints: int,
     breakpoint_symbol: str,
-) -> str:
-    """Create a story using the Writer class.
+) -> Iterator[str]:
+    """Create a story using the Writer class, streaming it to the textbox.
 
     Parameters
     ----------
@@ -38,9 +39,9 @@ def create_story(
     breakpoint_symbol: str
         The symbol used to represent the breakpoints in the story.
 
-    Returns
-    -------
-    str, story
+    Yields
+    ------
+    str, the story generated so far, then the final story
     """
 
     characters = characters.lower().split(",")
@@ -49,8 +50,8 @@ def create_story(
         breakpoint_symbol=breakpoint_symbol,
     )
 
-    # Create story
-    story = writer.generate_story(
+    # Create story, the textbox is updated as the text arrives
+    yield from writer.generate_story_stream(
         number_phrases=number_phrases,
         characters=characters,
         age_of_the_audience=age_of_the_audience,
@@ -58,8 +59,6 @@ def create_story(
         story_context=story_context,
     )
 
-    return story
-
 
 def save_story(story: str, filename: str):
     writer = Writer()
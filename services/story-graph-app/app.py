@@ -1,49 +1,168 @@
+from bb.lib.large_language_model import RateLimiter
 from bb.lib.story_graph import Asker, StoryGraph
+from bb.lib.story_graph.resumer import Resumer
+from bb.service.story_graph_app.jobs import DONE, JobQueue
 import gradio as gr
 import os
 import json
 from pathlib import Path
 
+# Shared by all the question generations of the app to stay in the API limits
+RATE_LIMITER = RateLimiter()
+
 
 def get_available_stories():
     workspace_data = Path(os.getenv("BONBON_WORKSPACE_DATA")) / "story_texts"
     return [f.name for f in workspace_data.glob("*.txt")]
 
 
-def create_questions(story_path: str, language: str):
+def create_questions(story_path: str, language: str, report=None):
     story_full_path = (
         Path(os.getenv("BONBON_WORKSPACE_DATA")) / "story_texts" / story_path
     )
     with open(story_full_path, "r") as f:
         story = f.read()
-    asker = Asker()
+    # Only the parts edited since the saved graph get new questions and
+    # summaries
+    previous_graph_path = (
+        Path(os.getenv("BONBON_WORKSPACE_DATA"))
+        / "story_graphs"
+        / story_path.replace(".txt", ".json")
+    )
+    previous_graph = None
+    previous_questions = None
+    if previous_graph_path.exists():
+        previous_graph = StoryGraph(breakpoint_symbol="||")
+        previous_graph.load_graph(previous_graph_path)
+        if previous_graph.language == language:
+            previous_questions = previous_graph.get_questions_by_part()
+        else:
+            previous_graph = None
+    number_of_parts = story.count("||")
+    done_parts = []
+
+    def on_part_done(part_index, questions):
+        done_parts.append(part_index)
+        if report is not None:
+            report(
+                0.5 * len(done_parts) / number_of_parts,
+                f"Questions of part {part_index} ready "
+                f"({len(done_parts)}/{number_of_parts})",
+            )
+
+    def on_summary_done(part_index, summary):
+        if report is not None:
+            report(
+                0.5 + 0.45 * (part_index + 1) / (number_of_parts + 1),
+                f"Summary of part {part_index} ready "
+                f"({part_index + 1}/{number_of_parts + 1})",
+            )
+
+    asker = Asker(rate_limiter=RATE_LIMITER)
     all_questions = asker.generate_questions(
         story=story,
         breakpoint_symbol="||",
         questions_difficulty=["easy", "hard"],
+        batched=True,
+        previous_questions=previous_questions,
+        callback=on_part_done,
     )
 
     graph = StoryGraph(breakpoint_symbol="||")
     graph.create_graph(
         story=story, question_answer_list=all_questions, language=language
     )
+    # Resuming the story is a lookup of the summaries computed here
+    Resumer().summarize_graph(graph, previous_graph, callback=on_summary_done)
 
     story_dict = graph.get_story_dict()
     # Convert the dictionary to a JSON string with double quotes
     return json.dumps(story_dict, ensure_ascii=False, indent=2)
 
 
-def save_story_dict(story_dict: str, story_file_name: str):
+def save_story_dict(story_dict: str, story_file_name: str, report=None):
     story_name = story_file_name.replace(".txt", "")
     story_graph = StoryGraph()
-    story_graph.load_graph(story_dict)
+    story_graph.load_story_dict(json.loads(story_dict))
 
     folder = Path(os.getenv("BONBON_WORKSPACE_DATA")) / "story_graphs"
     if not folder.exists():
         folder.mkdir(parents=True)
-        
+
+    if report is not None:
+        report(0.5, "Plotting the story graph")
     story_graph.plot_graph(folder / f"{story_name}.svg")
     story_graph.save_graph(folder / f"{story_name}.json")
+    # Opened lazily by the story player
+    story_graph.save_graph(folder / f"{story_name}.bin", file_format="binary")
+    return str(folder / f"{story_name}.json")
+
+
+JOB_QUEUE = JobQueue(
+    os.getenv(
+        "BONBON_JOBS_DB",
+        str(
+            Path(os.getenv("BONBON_WORKSPACE_DATA", "."))
+            / "story_graph_jobs.sqlite"
+        ),
+    ),
+    handlers={
+        "create_questions": lambda params, report: create_questions(
+            params["story_path"], params["language"], report
+        ),
+        "save_story_dict": lambda params, report: save_story_dict(
+            params["story_dict"], params["story_file_name"], report
+        ),
+    },
+    workers=int(os.getenv("BONBON_JOB_WORKERS", "2")),
+)
+
+
+def submit_create_questions(story_path: str, language: str):
+    if not story_path:
+        raise gr.Error("Select a story first")
+    return JOB_QUEUE.submit(
+        "create_questions", {"story_path": story_path, "language": language}
+    )
+
+
+def submit_save_story_dict(story_dict: str, story_file_name: str):
+    if not story_dict or not story_file_name:
+        raise gr.Error("Create the questions of a story first")
+    return JOB_QUEUE.submit(
+        "save_story_dict",
+        {"story_dict": story_dict, "story_file_name": story_file_name},
+    )
+
+
+def cancel_job(job_id: str):
+    if job_id and not JOB_QUEUE.cancel(job_id):
+        gr.Warning("The job is already finished")
+
+
+def poll_job(job_id: str, loaded_job_id: str | None):
+    """Get the status of a job, and its story dict once the questions are done.
+
+    The story dict of a job is loaded only once, so that the edits made in the
+    textbox afterwards are kept.
+    """
+    if not job_id:
+        return "No job", gr.update(), loaded_job_id
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        return f"Unknown job: {job_id}", gr.update(), loaded_job_id
+    status = f"**{job.kind}** {job.status} {job.progress:.0%}: {job.message}"
+    if job.error:
+        status += f"\n\n{job.error}"
+    if job.kind == "save_story_dict" and job.status == DONE:
+        status += f"\n\nSaved to {job.result}"
+    if (
+        job.kind == "create_questions"
+        and job.status == DONE
+        and loaded_job_id != job.id
+    ):
+        return status, job.result, job.id
+    return status, gr.update(), loaded_job_id
 
 
 def create_demo():
@@ -74,21 +193,36 @@ def create_demo():
                 save_story_dict_button = gr.Button(
                     "Save Story Graph", variant="primary"
                 )
+            with gr.Column():
+                job_id = gr.Textbox(label="Job ID", interactive=True)
+                job_status = gr.Markdown("No job")
+                cancel_button = gr.Button("Cancel Job", variant="stop")
+
+        loaded_job_id = gr.State(None)
+        # Jobs run in the background, the status is polled
+        timer = gr.Timer(1.0)
 
         create_questions_button.click(
-            fn=create_questions,
+            fn=submit_create_questions,
             inputs=[story_dropdown, language],
-            outputs=[story_dict],
+            outputs=[job_id],
         )
         save_story_dict_button.click(
-            fn=save_story_dict,
+            fn=submit_save_story_dict,
             inputs=[story_dict, story_dropdown],
-            outputs=[],
+            outputs=[job_id],
+        )
+        cancel_button.click(fn=cancel_job, inputs=[job_id], outputs=[])
+        timer.tick(
+            fn=poll_job,
+            inputs=[job_id, loaded_job_id],
+            outputs=[job_status, story_dict, loaded_job_id],
         )
     return demo
 
 
 def main():
+    JOB_QUEUE.start()
     demo = create_demo()
     demo.launch()
 
@@ -0,0 +1,364 @@
+"""Background job queue of the story graph app.
+
+Question generation and graph saving take minutes on long stories, too long
+for a Gradio click handler. Jobs are stored in a SQLite database and run by a
+pool of worker threads. The UI submits a job, gets its id back at once, and
+polls its status, progress and result. A job can be cancelled while queued,
+or while running at its next progress report.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+# A handler runs a job from its parameters and reports its progress, between
+# 0 and 1, with a message. It returns the result of the job as a string.
+JobHandler = Callable[[dict, Callable[[float, str], None]], str]
+
+
+class JobCancelled(Exception):
+    """Raised by the progress report of a job whose cancellation was asked."""
+
+
+@dataclass
+class Job:
+    """A job of the queue.
+
+    Attributes
+    ----------
+    id (str): The id of the job.
+    kind (str): The handler running the job.
+    params (dict): The parameters of the handler.
+    status (str): One of queued, running, done, failed or cancelled.
+    progress (float): The progress of the job, between 0 and 1.
+    message (str): The last progress message.
+    result (str | None): The result of a done job.
+    error (str | None): The error of a failed job.
+    created_at (float): The submission time.
+    updated_at (float): The time of the last update.
+    """
+
+    id: str
+    kind: str
+    params: dict
+    status: str
+    progress: float
+    message: str
+    result: str | None
+    error: str | None
+    created_at: float
+    updated_at: float
+
+
+class JobQueue:
+    """SQLite-backed job queue with a pool of worker threads.
+
+    Several app processes can share the database, a queued job is claimed by
+    exactly one worker.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        handlers: dict[str, JobHandler],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+    ):
+        """Initialize the job queue, see `start`.
+
+        Parameters
+        ----------
+        path (str | Path): Path of the SQLite database file.
+        handlers (dict[str, JobHandler]): The handler of each job kind.
+        workers (int): The number of jobs run at once.
+        poll_interval (float): Seconds between two lookups of queued jobs,
+            jobs submitted by this process are picked up at once.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wake_up = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, "
+                "kind TEXT NOT NULL, "
+                "params TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "progress REAL NOT NULL, "
+                "message TEXT NOT NULL, "
+                "result TEXT, "
+                "error TEXT, "
+                "cancel_requested INTEGER NOT NULL, "
+                "owner_pid INTEGER, "
+                "created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_created_at "
+                "ON jobs (status, created_at)"
+            )
+
+    def submit(self, kind: str, params: dict) -> str:
+        """Queue a job.
+
+        Parameters
+        ----------
+        kind (str): The handler running the job.
+        params (dict): The JSON serializable parameters of the handler.
+
+        Returns
+        -------
+        str: The id of the job.
+
+        Raises
+        ------
+        ValueError: If no handler runs this kind of job.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Invalid job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO jobs VALUES "
+                "(?, ?, ?, ?, 0, '', NULL, NULL, 0, NULL, ?, ?)",
+                (job_id, kind, json.dumps(params), QUEUED, now, now),
+            )
+        self._wake_up.set()
+        return job_id
+
+    def get(self, job_id: str) -> Job | None:
+        """Get a job.
+
+        Parameters
+        ----------
+        job_id (str): The id of the job.
+
+        Returns
+        -------
+        Job | None: The job, None if unknown.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, kind, params, status, progress, message, result, "
+                "error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return self._to_job(row)
+
+    def list_jobs(self, limit: int = 20) -> list[Job]:
+        """Get the most recent jobs, the newest first.
+
+        Parameters
+        ----------
+        limit (int): The maximum number of jobs.
+
+        Returns
+        -------
+        list[Job]: The jobs.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, kind, params, status, progress, message, result, "
+                "error, created_at, updated_at FROM jobs "
+                "ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job.
+
+        A queued job is cancelled at once, a running job stops at its next
+        progress report.
+
+        Parameters
+        ----------
+        job_id (str): The id of the job.
+
+        Returns
+        -------
+        bool: Whether the job was still queued or running.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            queued = self._connection.execute(
+                "UPDATE jobs SET status = ?, message = 'Cancelled', "
+                "updated_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, job_id, QUEUED),
+            ).rowcount
+            running = self._connection.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (now, job_id, RUNNING),
+            ).rowcount
+        return bool(queued or running)
+
+    def start(self):
+        """Start the worker threads.
+
+        Running jobs left behind by a process that died are queued again.
+        """
+        if self._threads:
+            return
+        self._requeue_orphans()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run_worker,
+                name=f"job-worker-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stop the worker threads after their current job."""
+        self._stop.set()
+        self._wake_up.set()
+
+    def _run_worker(self):
+        """Run the queued jobs until stopped."""
+        while not self._stop.is_set():
+            job = self._claim()
+            if job is None:
+                self._wake_up.wait(self.poll_interval)
+                self._wake_up.clear()
+                continue
+            self._execute(job)
+
+    def _claim(self) -> Job | None:
+        """Claim the oldest queued job, None if there is none."""
+        with self._lock, self._connection:
+            while True:
+                row = self._connection.execute(
+                    "SELECT id FROM jobs WHERE status = ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is None:
+                    return None
+                # Another process may claim the same job first
+                claimed = self._connection.execute(
+                    "UPDATE jobs SET status = ?, owner_pid = ?, "
+                    "updated_at = ? WHERE id = ? AND status = ?",
+                    (RUNNING, os.getpid(), time.time(), row[0], QUEUED),
+                ).rowcount
+                if claimed:
+                    break
+        return self.get(row[0])
+
+    def _execute(self, job: Job):
+        """Run a claimed job and store its outcome."""
+
+        def report(progress: float, message: str):
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "UPDATE jobs SET progress = ?, message = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (progress, message, time.time(), job.id),
+                )
+                cancel_requested = self._connection.execute(
+                    "SELECT cancel_requested FROM jobs WHERE id = ?", (job.id,)
+                ).fetchone()[0]
+            if cancel_requested:
+                raise JobCancelled(job.id)
+
+        try:
+            report(0.0, "Started")
+            result = self.handlers[job.kind](job.params, report)
+        except JobCancelled:
+            self._finish(job.id, CANCELLED, message="Cancelled")
+        except Exception as error:
+            traceback.print_exc()
+            self._finish(job.id, FAILED, message="Failed", error=repr(error))
+        else:
+            self._finish(
+                job.id, DONE, message="Done", result=result, progress=1.0
+            )
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        message: str,
+        result: str | None = None,
+        error: str | None = None,
+        progress: float | None = None,
+    ):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, message = ?, result = ?, "
+                "error = ?, progress = COALESCE(?, progress), "
+                "updated_at = ? WHERE id = ?",
+                (status, message, result, error, progress, now, job_id),
+            )
+
+    def _requeue_orphans(self):
+        """Queue again the running jobs whose process is not alive."""
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                "SELECT id, owner_pid FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            for job_id, owner_pid in rows:
+                if owner_pid is not None and _is_alive(owner_pid):
+                    continue
+                self._connection.execute(
+                    "UPDATE jobs SET status = ?, progress = 0, "
+                    "message = 'Requeued', owner_pid = NULL, updated_at = ? "
+                    "WHERE id = ?",
+                    (QUEUED, time.time(), job_id),
+                )
+
+    @staticmethod
+    def _to_job(row: tuple) -> Job:
+        return Job(
+            id=row[0],
+            kind=row[1],
+            params=json.loads(row[2]),
+            status=row[3],
+            progress=row[4],
+            message=row[5],
+            result=row[6],
+            error=row[7],
+            created_at=row[8],
+            updated_at=row[9],
+        )
+
+
+def _is_alive(pid: int) -> bool:
+    """Whether a process of this machine is alive."""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,150 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+from bb.service.story_graph_app.jobs import (
+    CANCELLED,
+    DONE,
+    FAILED,
+    FINISHED_STATUSES,
+    QUEUED,
+    RUNNING,
+    Job,
+    JobQueue,
+)
+
+
+def wait_for(queue: JobQueue, job_id: str, statuses=FINISHED_STATUSES) -> Job:
+    """Wait until a job reaches one of the statuses."""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(f"Job {job_id} is still {job.status}")
+
+
+def echo(params: dict, report) -> str:
+    report(0.5, "Halfway")
+    return params["text"]
+
+
+def fail(params: dict, report) -> str:
+    raise KeyError("missing")
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    """Create started queues sharing a database, stopped after the test."""
+    queues = []
+
+    def make(handlers: dict | None = None, **kwargs) -> JobQueue:
+        kwargs.setdefault("poll_interval", 0.01)
+        queue = JobQueue(
+            tmp_path / "jobs.sqlite",
+            handlers or {"echo": echo, "fail": fail},
+            **kwargs,
+        )
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.stop()
+
+
+def test_job_runs_to_completion(make_queue):
+    queue = make_queue()
+    job_id = queue.submit("echo", {"text": "graph.json"})
+    assert queue.get(job_id).status == QUEUED
+    queue.start()
+    job = wait_for(queue, job_id)
+    assert (job.status, job.result, job.progress) == (DONE, "graph.json", 1)
+    assert job.params == {"text": "graph.json"}
+    assert queue.get("unknown") is None
+
+
+def test_failed_job_keeps_its_error(make_queue):
+    queue = make_queue()
+    queue.start()
+    job = wait_for(queue, queue.submit("fail", {}))
+    assert job.status == FAILED and "KeyError" in job.error
+
+
+def test_invalid_kind(make_queue):
+    with pytest.raises(ValueError, match="Invalid job kind"):
+        make_queue().submit("unknown", {})
+
+
+def test_cancel_queued_job(make_queue):
+    queue = make_queue()
+    job_id = queue.submit("echo", {"text": ""})
+    assert queue.cancel(job_id)
+    assert queue.get(job_id).status == CANCELLED
+    assert not queue.cancel(job_id)
+    queue.start()
+    time.sleep(0.05)
+    assert queue.get(job_id).status == CANCELLED
+
+
+def test_cancel_running_job_at_its_next_report(make_queue):
+    started = threading.Event()
+
+    def loop(params, report):
+        started.set()
+        while True:
+            report(0.1, "Looping")
+            time.sleep(0.01)
+
+    queue = make_queue({"loop": loop})
+    queue.start()
+    job_id = queue.submit("loop", {})
+    started.wait(5)
+    assert queue.get(job_id).status == RUNNING
+    assert queue.cancel(job_id)
+    assert wait_for(queue, job_id).status == CANCELLED
+
+
+def test_list_jobs(make_queue):
+    queue = make_queue()
+    job_ids = [queue.submit("echo", {"text": str(i)}) for i in range(3)]
+    assert [job.id for job in queue.list_jobs()] == job_ids[::-1]
+    assert [job.id for job in queue.list_jobs(limit=1)] == job_ids[-1:]
+
+
+def test_jobs_are_claimed_once_by_shared_queues(make_queue):
+    runs = []
+    lock = threading.Lock()
+
+    def record(params, report):
+        with lock:
+            runs.append(params["index"])
+        return ""
+
+    queues = [make_queue({"record": record}, workers=2) for _ in range(2)]
+    job_ids = [
+        queues[i % 2].submit("record", {"index": i}) for i in range(20)
+    ]
+    for queue in queues:
+        queue.start()
+    for job_id in job_ids:
+        assert wait_for(queues[0], job_id).status == DONE
+    assert sorted(runs) == list(range(20))
+
+
+def test_orphaned_jobs_are_requeued(make_queue):
+    queue = make_queue()
+    job_id = queue.submit("echo", {"text": "again"})
+    process = subprocess.Popen(["true"])
+    process.wait()
+    with queue._connection:
+        queue._connection.execute(
+            "UPDATE jobs SET status = ?, owner_pid = ? WHERE id = ?",
+            (RUNNING, process.pid, job_id),
+        )
+    queue.start()
+    job = wait_for(queue, job_id)
+    assert (job.status, job.result) == (DONE, "again")
@@ -1,6 +1,7 @@
 import os
 
 import gradio as gr
+from bb.service.story_player_app.feedback import get_feedback_bank
 from bb.service.story_player_app.utils import (
     get_available_stories,
     get_node_id_after_answer,
@@ -17,7 +18,8 @@ def create_demo():
         gr.Markdown("# Bonbon Story Player")
 
         story_graph = gr.State(None)
-        question_to_pass = gr.State(None)
+        # Serialized StorySession, the cursor of the listener in the story
+        session = gr.State(None)
         with gr.Row():
             with gr.Column():
                 story_dropdown = gr.Dropdown(
@@ -53,20 +55,20 @@ def create_demo():
         story_dropdown.change(
             fn=load_story,
             inputs=[story_dropdown],
-            outputs=[story_graph, play_button, current_story_node_id],
+            outputs=[story_graph, play_button, current_story_node_id, session],
         )
 
         play_button.click(
             fn=play_story,
             inputs=[
                 story_graph,
-                current_story_node_id,
-                question_to_pass,
+                session,
                 stt_model,
             ],
             outputs=[
                 audio_output,
                 current_story_node_id,
+                session,
                 play_button,
                 sound_recorder,
             ],
@@ -76,17 +78,16 @@ def create_demo():
             fn=get_node_id_after_answer,
             inputs=[
                 story_graph,
-                current_story_node_id,
+                session,
                 sound_recorder,
-                question_to_pass,
                 stt_model,
             ],
             outputs=[
                 audio_output,
                 current_story_node_id,
+                session,
                 play_button,
                 sound_recorder,
-                question_to_pass,
             ],
         )
 
@@ -94,5 +95,10 @@ def create_demo():
 
 
 if __name__ == "__main__":
+    # Fill and refresh the answer feedback bank of the default TTS backend
+    refresh_interval = float(os.getenv("BONBON_FEEDBACK_REFRESH_INTERVAL", "3600"))
+    get_feedback_bank(os.getenv("BONBON_FEEDBACK_TTS", "TTSElevenLabs")).start(
+        refresh_interval=refresh_interval or None
+    )
     demo = create_demo()
     demo.launch(allowed_paths=[BONBON_WORKSPACE_DATA])
@@ -0,0 +1,478 @@
+"""Pre-rendered answer feedback bank.
+
+The feedback played after an answer is the most latency sensitive moment of
+the app. Instead of generating and synthesizing a phrase on every answer, a
+bank of varied phrases per language and outcome is generated once with the
+LLM, rendered to audio with the TTS backend, and stored in the workspace.
+The bank is loaded at startup, a phrase is picked at random on each answer,
+and a background thread replaces phrases from time to time to keep variety.
+The phrases are requested as a JSON list and validated before rendering, and
+a replaced phrase is deleted one refresh later, so that an audio file just
+returned to a player is not deleted under it.
+"""
+
+import fcntl
+import json
+import os
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from bb.lib.large_language_model import BACKGROUND, get_llm
+from bb.lib.text_to_speech import get_tts_model
+
+LANGUAGES = ["French", "English"]
+OUTCOMES = ["correct", "incorrect"]
+
+# Length bounds of a phrase, in characters
+MIN_PHRASE_LENGTH = 5
+MAX_PHRASE_LENGTH = 160
+
+# Frequent words of each language, to check the language of a phrase
+LANGUAGE_WORDS = {
+    "French": {
+        "bravo",
+        "bien",
+        "bonne",
+        "mauvaise",
+        "reponse",
+        "réponse",
+        "tu",
+        "as",
+        "es",
+        "est",
+        "la",
+        "le",
+        "les",
+        "pas",
+        "fois",
+        "prochaine",
+        "dommage",
+        "super",
+        "c'est",
+        "une",
+    },
+    "English": {
+        "well",
+        "done",
+        "good",
+        "great",
+        "answer",
+        "you",
+        "the",
+        "is",
+        "not",
+        "next",
+        "time",
+        "wrong",
+        "right",
+        "correct",
+        "try",
+        "job",
+    },
+}
+
+# Structured output of the phrase generation
+PHRASES_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "feedback_phrases",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "phrases": {"type": "array", "items": {"type": "string"}}
+            },
+            "required": ["phrases"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def get_feedback_prompt(
+    answer_correct: bool, language: str, n: int = 1
+) -> str:
+    """Get the prompt generating answer feedback phrases.
+
+    Parameters
+    ----------
+    answer_correct (bool): Whether the feedback is for a correct answer.
+    language (str): The language of the feedback.
+    n (int): The number of different phrases to generate.
+
+    Returns
+    -------
+    str: The prompt.
+    """
+    if answer_correct:
+        prompt = (
+            "Create a short feedback for the correct answer. Like this one: "
+            "Well done !! You gave the correct answer. Give only the positive "
+            "feedback."
+        )
+    else:
+        prompt = (
+            "Create a super short feedback for the incorrect answer. "
+            "Give only the negative but encouraging feedback. Example "
+            "of the feedback: Unfortunately the answer is wrong, you will do "
+            "better next time. "
+        )
+    if language == "French":
+        prompt += " Give the feedback in French"
+    if n > 1:
+        prompt += f" Give {n} different feedbacks."
+    return prompt
+
+
+def is_valid_phrase(text: str, language: str) -> bool:
+    """Check that a generated phrase can be played as a feedback.
+
+    Parameters
+    ----------
+    text (str): The phrase.
+    language (str): The expected language of the phrase.
+
+    Returns
+    -------
+    bool: Whether the phrase is a single line within the length bounds, not
+        a preamble like "Voici 5 phrases :", and has more frequent words of
+        its language than of the other languages.
+    """
+    if "\n" in text or text.endswith(":"):
+        return False
+    if not MIN_PHRASE_LENGTH <= len(text) <= MAX_PHRASE_LENGTH:
+        return False
+    words = text.lower().replace("!", " ").replace(".", " ").split()
+    scores = {
+        name: sum(word in frequent_words for word in words)
+        for name, frequent_words in LANGUAGE_WORDS.items()
+    }
+    if language not in scores:
+        return True
+    return scores[language] > 0 and scores[language] >= max(scores.values())
+
+
+class FeedbackBank:
+    """Bank of answer feedback phrases pre-rendered to audio.
+
+    Phrases are stored in
+    `<data_path>/feedback_bank/<tts>/<language>/<outcome>` as audio files,
+    with a `phrases.json` manifest mapping the files to their text.
+
+    The player worker processes share the bank: the manifest is re-read and
+    merged under a file lock before each write, and an audio file is only
+    deleted by the process that rendered it, once a phrase removed by any
+    process has left its view of the bank. Processes filling the bank at
+    the same time may render a few phrases too many, the refreshes bring
+    the bank back to its size.
+    """
+
+    def __init__(
+        self,
+        data_path: str | Path,
+        tts_model_name: str,
+        size: int = 8,
+        languages: list[str] = LANGUAGES,
+    ):
+        """Initialize an empty bank, see `load` and `start`.
+
+        Parameters
+        ----------
+        data_path (str | Path): The workspace data folder.
+        tts_model_name (str): The TTS backend rendering the phrases.
+        size (int): The number of phrases per language and outcome.
+        languages (list[str]): The languages of the bank.
+        """
+        self.folder = Path(data_path) / "feedback_bank" / tts_model_name
+        self.tts_model_name = tts_model_name
+        self.size = size
+        self.languages = languages
+        self.llm = get_llm(
+            caller="FeedbackBank",
+            priority=BACKGROUND,
+            response_format=PHRASES_RESPONSE_FORMAT,
+            # Fresh phrases are wanted on every refresh
+            cache=None,
+        )
+        self.phrases = {}
+        # Audio files rendered by this process, the only ones it deletes
+        self._created = set()
+        # Audio files of the removed phrases, deleted on the next refresh
+        self._tombstones = []
+        self._lock = threading.Lock()
+        self._tts = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self):
+        """Load the phrases already rendered in the workspace.
+
+        Phrases whose audio file is missing are ignored. Audio files missing
+        from the manifest are kept, another process may be adding them.
+        """
+        for language in self.languages:
+            for outcome in OUTCOMES:
+                self._update_manifest(language, outcome)
+
+    def get_feedback(self, answer_correct: bool, language: str) -> Path | None:
+        """Pick a pre-rendered feedback at random.
+
+        Parameters
+        ----------
+        answer_correct (bool): Whether the answer was correct.
+        language (str): The language of the story.
+
+        Returns
+        -------
+        Path | None: The audio file of the feedback, None if the bank has
+            no phrase for this language and outcome yet.
+        """
+        key = (language, OUTCOMES[0] if answer_correct else OUTCOMES[1])
+        with self._lock:
+            file_names = list(self.phrases.get(key, {}))
+        while file_names:
+            path = self._get_folder(*key) / random.choice(file_names)
+            if path.exists():
+                return path
+            # Removed by another process, and deleted by the one that
+            # rendered it, before this process merged the manifest again
+            file_names.remove(path.name)
+        return None
+
+    def start(self, refresh_interval: float | None = 3600.0):
+        """Fill the bank and refresh it in a background thread.
+
+        Parameters
+        ----------
+        refresh_interval (float | None): Seconds between two refreshes, each
+            refresh replaces one phrase per language and outcome. None to
+            only fill the missing phrases.
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(refresh_interval,),
+            name="feedback-bank",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after its current rendering."""
+        self._stop.set()
+
+    def fill(self):
+        """Generate and render the missing phrases of every set."""
+        for language in self.languages:
+            for outcome in OUTCOMES:
+                # Count the phrases rendered by the other processes too
+                self._update_manifest(language, outcome)
+                with self._lock:
+                    missing = self.size - len(
+                        self.phrases.get((language, outcome), {})
+                    )
+                if missing > 0:
+                    texts = self._generate_phrases(language, outcome, missing)
+                    for text in texts:
+                        self._add_phrase(language, outcome, text)
+
+    def refresh(self):
+        """Replace one phrase at random in every set, to keep variety.
+
+        The phrases replaced by the previous refresh are deleted first, they
+        have not been picked since. Sets holding more phrases than the bank
+        size lose the extra ones.
+        """
+        with self._lock:
+            tombstones, self._tombstones = self._tombstones, []
+        for path in tombstones:
+            path.unlink(missing_ok=True)
+        for language in self.languages:
+            for outcome in OUTCOMES:
+                texts = self._generate_phrases(language, outcome, 1)
+                with self._lock:
+                    old_file_names = list(
+                        self.phrases.get((language, outcome), {})
+                    )
+                for text in texts:
+                    self._add_phrase(language, outcome, text)
+                with self._lock:
+                    extra = (
+                        len(self.phrases.get((language, outcome), {}))
+                        - self.size
+                    )
+                for file_name in random.sample(
+                    old_file_names, max(0, min(extra, len(old_file_names)))
+                ):
+                    self._remove_phrase(language, outcome, file_name)
+
+    def _run(self, refresh_interval: float | None):
+        """Fill the bank, then refresh it until stopped."""
+        try:
+            self.fill()
+        except Exception as error:
+            print(f"Failed to fill the feedback bank: {error!r}")
+        if refresh_interval is None:
+            return
+        while not self._stop.wait(refresh_interval):
+            try:
+                self.refresh()
+            except Exception as error:
+                print(f"Failed to refresh the feedback bank: {error!r}")
+
+    def _get_folder(self, language: str, outcome: str) -> Path:
+        return self.folder / language / outcome
+
+    def _generate_phrases(
+        self, language: str, outcome: str, n: int
+    ) -> list[str]:
+        """Generate up to `n` valid phrases with a single LLM call.
+
+        Invalid phrases are dropped, see `is_valid_phrase`, the missing ones
+        are requested again by the next fill or refresh.
+        """
+        prompt = get_feedback_prompt(outcome == OUTCOMES[0], language, n) + (
+            " The output should be a JSON object with the list of the "
+            "feedback phrases, without any other text."
+        )
+        # Fresh phrases are wanted, not the ones of the previous refresh
+        output = self.llm.generate_text(
+            prompt, use_cache=False, coalesce=False
+        )
+        try:
+            phrases = json.loads(output)["phrases"]
+        except (ValueError, TypeError, KeyError):
+            print(f"Invalid feedback phrases: {output!r}")
+            return []
+        if not isinstance(phrases, list):
+            return []
+        texts = [
+            phrase.strip()
+            for phrase in phrases
+            if isinstance(phrase, str)
+            and is_valid_phrase(phrase.strip(), language)
+        ]
+        return texts[:n]
+
+    def _get_tts(self, language: str):
+        """Get the TTS model of a language, created once."""
+        if language not in self._tts:
+            tts_model = get_tts_model(self.tts_model_name)
+            self._tts[language] = tts_model(language=language)
+        return self._tts[language]
+
+    def _add_phrase(self, language: str, outcome: str, text: str):
+        """Render a phrase and add it to its set."""
+        folder = self._get_folder(language, outcome)
+        folder.mkdir(parents=True, exist_ok=True)
+        file_name = f"{uuid.uuid4().hex}.wav"
+        self._get_tts(language).generate_audio(text, str(folder / file_name))
+        with self._lock:
+            self._created.add(folder / file_name)
+        self._update_manifest(language, outcome, added={file_name: text})
+
+    def _remove_phrase(self, language: str, outcome: str, file_name: str):
+        """Remove a phrase from its set, its audio file is deleted later.
+
+        The file may have just been returned by `get_feedback` to a player
+        that has not read it yet, it is deleted by the next `refresh` of the
+        process that rendered it.
+        """
+        self._update_manifest(language, outcome, removed=file_name)
+
+    @contextmanager
+    def _lock_manifest(self, language: str, outcome: str) -> Iterator[Path]:
+        """Hold the lock of a manifest shared by the worker processes.
+
+        Yields
+        ------
+        Path: The manifest path.
+        """
+        folder = self._get_folder(language, outcome)
+        folder.mkdir(parents=True, exist_ok=True)
+        with open(folder / "phrases.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield folder / "phrases.json"
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _update_manifest(
+        self,
+        language: str,
+        outcome: str,
+        added: dict[str, str] | None = None,
+        removed: str | None = None,
+    ):
+        """Merge changes into the manifest of a set and reload the set.
+
+        The manifest is re-read under the file lock, so that the phrases
+        added and removed by the other processes are kept. The files of
+        this process whose phrase left the set are deleted on the next
+        refresh.
+
+        Parameters
+        ----------
+        language (str): The language of the set.
+        outcome (str): The outcome of the set.
+        added (dict[str, str] | None): The phrases to add, by file name.
+        removed (str | None): The file name of a phrase to remove.
+        """
+        with self._lock_manifest(language, outcome) as manifest:
+            phrases = {}
+            if manifest.exists():
+                with open(manifest, "r") as f:
+                    phrases = json.load(f)
+            if added or removed:
+                phrases.update(added or {})
+                phrases.pop(removed, None)
+                tmp_path = manifest.with_suffix(".json.tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump(phrases, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, manifest)
+        folder = manifest.parent
+        with self._lock:
+            for file_name in self.phrases.get((language, outcome), {}):
+                path = folder / file_name
+                if file_name not in phrases and path in self._created:
+                    self._created.discard(path)
+                    self._tombstones.append(path)
+            self.phrases[(language, outcome)] = {
+                file_name: text
+                for file_name, text in phrases.items()
+                if (folder / file_name).exists()
+            }
+
+
+_FEEDBACK_BANKS = {}
+_FEEDBACK_BANKS_LOCK = threading.Lock()
+
+
+def get_feedback_bank(tts_model_name: str) -> FeedbackBank:
+    """Get the feedback bank of a TTS backend, loaded once per process.
+
+    The bank size is read from `BONBON_FEEDBACK_BANK_SIZE`.
+
+    Parameters
+    ----------
+    tts_model_name (str): The TTS backend.
+
+    Returns
+    -------
+    FeedbackBank: The loaded feedback bank.
+    """
+    with _FEEDBACK_BANKS_LOCK:
+        if tts_model_name not in _FEEDBACK_BANKS:
+            bank = FeedbackBank(
+                os.getenv("BONBON_WORKSPACE_DATA"),
+                tts_model_name,
+                size=int(os.getenv("BONBON_FEEDBACK_BANK_SIZE", "8")),
+            )
+            bank.load()
+            _FEEDBACK_BANKS[tts_model_name] = bank
+        return _FEEDBACK_BANKS[tts_model_name]
@@ -2,16 +2,32 @@ import os
 from pathlib import Path
 
 import numpy as np
-from bb.lib.llm.llm import LLMMistral
+
+from bb.lib.large_language_model import (
+    INTERACTIVE,
+    INTERACTIVE_RETRY_POLICY,
+    get_llm,
+)
 from bb.lib.speech_to_text.stt import STTWav2Vec2
 from bb.lib.story_graph.answer_checker import AnswerChecker
+from bb.lib.story_graph.compact import CompactStoryGraph
 from bb.lib.story_graph.graph import StoryGraph
-from bb.lib.story_graph.utils import QuestionNode
+from bb.lib.story_graph.pipeline import get_audio_path
+from bb.lib.story_graph.session import (
+    CORRECT_ANSWER,
+    WRONG_ANSWER,
+    StorySession,
+    step,
+)
 from bb.lib.text_to_speech import get_tts_model
+from bb.service.story_player_app.feedback import (
+    get_feedback_bank,
+    get_feedback_prompt,
+)
 
 
 class StoryPlayer:
-    def __init__(self, story_graph: StoryGraph):
+    def __init__(self, story_graph: StoryGraph | CompactStoryGraph):
         self.story_graph = story_graph
         self.data_path = Path(os.getenv("BONBON_WORKSPACE_DATA"))
 
@@ -21,31 +37,43 @@ class StoryPlayer:
         print(f"Playing story: {current_story_node_id}")
         node = self.story_graph.get_node(current_story_node_id)
 
-        # Generate audio for the story node content
         content = node.content
-        tts_model = get_tts_model(tts_model_name)
-        tts = tts_model(language=self.story_graph.language)
-        output_path = self.data_path / "current_story_node_content.wav"
-        tts.generate_audio(content, output_path)
-        print(f"Content generated: {content}")
+        # Audio pre-rendered when the story was compiled
+        output_path = get_audio_path(
+            self.data_path, tts_model_name, self.story_graph.language, content
+        )
+        if output_path.exists():
+            print(f"Content pre-rendered: {content}")
+        else:
+            # Generate audio for the story node content
+            tts_model = get_tts_model(tts_model_name)
+            tts = tts_model(language=self.story_graph.language)
+            output_path = self.data_path / "current_story_node_content.wav"
+            tts.generate_audio(content, output_path)
+            print(f"Content generated: {content}")
 
         children_node_ids = node.children
 
         return output_path, children_node_ids
 
-    def is_question_node(self, current_story_node_id: str) -> bool:
-        node = self.story_graph.get_node(current_story_node_id)
-        if isinstance(node, QuestionNode):
-            return True
-        else:
-            return False
-
-    def get_node_id_after_answer(
+    def answer_question(
         self,
-        current_question_node_id: str,
+        session: StorySession,
         sound_recorder: tuple[int, np.ndarray],
-        question_to_pass: list[str] | None = None,
-    ) -> tuple[bool, str, list[str]]:
+    ) -> tuple[bool, StorySession]:
+        """Check the recorded answer to the question and step the session.
+
+        Parameters
+        ----------
+        session (StorySession): The session, on a question node.
+        sound_recorder (tuple[int, np.ndarray]): The sampling rate and the
+            audio of the answer.
+
+        Returns
+        -------
+        tuple[bool, StorySession]: Whether the answer is correct, and the
+            session on the next question or story node.
+        """
         stt = STTWav2Vec2("French")
         sampling_rate, audio = sound_recorder
 
@@ -54,63 +82,45 @@ class StoryPlayer:
         )
 
         answer_checker = AnswerChecker()
-        parent_node_id = self.story_graph.get_node(
-            current_question_node_id
-        ).parents[0]
-        answer_correct = answer_checker.is_correct(
-            content=self.story_graph.get_node(parent_node_id).content,
-            question=self.story_graph.get_node(
-                current_question_node_id
-            ).content,
-            gt_answer=self.story_graph.get_node(
-                current_question_node_id
-            ).answer,
+        question_node = self.story_graph.get_node(session.node_id)
+        verdict = answer_checker.check(
+            content=self.story_graph.get_node(question_node.parents[0]).content,
+            question=question_node.content,
+            gt_answer=question_node.answer,
             listener_answer=transcription,
         )
+        answer_correct = verdict.correct
         print("--------------------------------")
         print(f"Answer is correct: {answer_correct}")
-        print(
-            f"Expected answer: {self.story_graph.get_node(current_question_node_id).answer}"
-        )
+        print(f"Decided by: {verdict.tier}")
+        print(f"Expected answer: {question_node.answer}")
         print(f"Listener answer: {transcription}")
         print("--------------------------------")
-        if answer_correct:
-            next_node_id = self.story_graph.get_node(
-                current_question_node_id
-            ).children[0]
-        else:
-            question_to_pass.append(current_question_node_id)
-            next_node_id = self.story_graph.get_next_question_node_id(
-                current_question_node_id, question_to_pass
-            )
-            if next_node_id is None:
-                next_node_id = self.story_graph.get_node(
-                    current_question_node_id
-                ).children[0]
-
-        return answer_correct, next_node_id, question_to_pass
+        session = step(
+            self.story_graph,
+            session,
+            CORRECT_ANSWER if answer_correct else WRONG_ANSWER,
+        )
+        return answer_correct, session
 
     def play_answer_feedback(
         self, answer_correct: bool, tts_model_name: str
     ) -> str:
-        # Generate prompt for the feedback
-        if answer_correct:
-            prompt = (
-                "Create a short feedback for the correct answer. Like this one: "
-                "Well done !! You gave the correct answer. Give only the positive feedback."
-            )
-        else:
-            prompt = (
-                "Create a super short feedback for the incorrect answer. "
-                "Give only the negative but encouraging feedback. Example "
-                "of the feedback: Unfortunately the answer is wrong, you will do "
-                "better next time. "
-            )
-
-        if self.story_graph.language == "French":
-            prompt += " Give the feedback in French"
+        # Pre-rendered feedback, no LLM call nor synthesis
+        feedback_path = get_feedback_bank(tts_model_name).get_feedback(
+            answer_correct, self.story_graph.language
+        )
+        if feedback_path is not None:
+            return feedback_path
+
+        # The bank is not filled yet, generate the feedback
+        prompt = get_feedback_prompt(answer_correct, self.story_graph.language)
         # Generate feedback text
-        llm = LLMMistral()
+        llm = get_llm(
+            retry_policy=INTERACTIVE_RETRY_POLICY,
+            caller="StoryPlayer",
+            priority=INTERACTIVE,
+        )
         text = llm.generate_text(prompt)
 
         # Generate audio for the feedback
@@ -3,6 +3,7 @@ from pathlib import Path
 
 import gradio as gr
 from bb.lib.story_graph.graph import StoryGraph
+from bb.lib.story_graph.session import CONTINUE, StorySession, step
 from bb.service.story_player_app.player import StoryPlayer
 
 # Configuration
@@ -21,39 +22,48 @@ def load_story(story_file):
     """Load the selected story file."""
     print(f"Loading story: {story_file}")
     story_graph = StoryGraph()
-    story_graph.load_graph(filename=STORY_DIRECTORY / story_file)
+    json_file = STORY_DIRECTORY / story_file
+    binary_file = json_file.with_suffix(".bin")
+    if binary_file.exists() and (
+        not json_file.exists()
+        or binary_file.stat().st_mtime >= json_file.stat().st_mtime
+    ):
+        # Memory mapped, only the nodes played are decoded. A binary file older
+        # than the JSON one is stale, the JSON graph was saved again alone.
+        story_graph.load_graph(filename=binary_file)
+    else:
+        story_graph.load_graph(filename=json_file)
+        # The player only reads the graph, routing is faster on the compact one
+        story_graph = story_graph.to_compact()
+    session = StorySession()
     play_button = gr.Button("Play the story", visible=True)
     current_story_node_id = gr.Textbox(
-        label="Current Story Node ID", visible=True, value="story_0"
+        label="Current Story Node ID", visible=True, value=session.node_id
     )
-    return story_graph, play_button, current_story_node_id
-
+    return story_graph, play_button, current_story_node_id, session.to_dict()
 
-def play_story(
-    story_graph, current_story_node_id, question_to_pass, stt_model
-):
-    """Play the story."""
-    story_player = StoryPlayer(story_graph)
-    audio_output, children_node_ids = story_player.play(
-        current_story_node_id, stt_model
-    )
 
-    # Case 1: End of story
-    if len(children_node_ids) == 0:
+def play_story(story_graph, session, stt_model):
+    """Play the node of the session, and step past it if it is a story node."""
+    session = StorySession.from_dict(session) if session else StorySession()
+    if session.finished:
         print("End of story")
-        return audio_output, None, None, None
+        return None, session.node_id, session.to_dict(), None, None
+
+    story_player = StoryPlayer(story_graph)
+    audio_output, _ = story_player.play(session.node_id, stt_model)
 
-    is_question_node = story_player.is_question_node(current_story_node_id)
-    new_story_node_id = current_story_node_id
-    if is_question_node:
+    if story_graph.is_question(session.node_id):
         play_button_visible = False
         sound_recorder_visible = True
     else:
+        session = step(story_graph, session, CONTINUE)
+        # Case 1: End of story
+        if session.finished:
+            print("End of story")
+            return audio_output, session.node_id, session.to_dict(), None, None
         play_button_visible = True
         sound_recorder_visible = False
-        new_story_node_id = story_player.story_graph.get_next_question_node_id(
-            current_story_node_id, question_to_pass
-        )
 
     play_button = gr.Button(
         "Continue the story", visible=play_button_visible, variant="primary"
@@ -66,24 +76,25 @@ def play_story(
         sources="microphone",
     )
 
-    return audio_output, new_story_node_id, play_button, sound_recorder
+    return (
+        audio_output,
+        session.node_id,
+        session.to_dict(),
+        play_button,
+        sound_recorder,
+    )
 
 
 def get_node_id_after_answer(
     story_graph,
-    current_question_node_id,
+    session,
     sound_recorder,
-    question_to_pass,
     stt_model,
 ):
     """Check if the answer is correct."""
-    if question_to_pass is None:
-        question_to_pass = []
     story_player = StoryPlayer(story_graph)
-    answer_correct, next_story_node_id, question_to_pass = (
-        story_player.get_node_id_after_answer(
-            current_question_node_id, sound_recorder, question_to_pass
-        )
+    answer_correct, session = story_player.answer_question(
+        StorySession.from_dict(session), sound_recorder
     )
     audio_output = story_player.play_answer_feedback(
         answer_correct, stt_model
@@ -103,8 +114,8 @@ def get_node_id_after_answer(
 
     return (
         audio_output,
-        next_story_node_id,
+        session.node_id,
+        session.to_dict(),
         play_button,
         sound_recorder,
-        question_to_pass,
     )
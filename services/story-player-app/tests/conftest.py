@@ -0,0 +1,54 @@
+import json
+import re
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from bb.service.story_player_app import feedback
+from bb.service.story_player_app.feedback import FeedbackBank
+
+
+class FakeLLM:
+    """LLM answering with numbered feedback phrases."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        match = re.search(r"Give (\d+) different", prompt)
+        n = int(match.group(1)) if match else 1
+        if "in French" in prompt:
+            phrase = "Bravo, c'est la bonne réponse {} !"
+        else:
+            phrase = "Well done, you gave the right answer {} !"
+        return json.dumps(
+            {"phrases": [phrase.format(f"{self.calls}.{i}") for i in range(n)]}
+        )
+
+
+class FakeTTS:
+    """TTS writing the phrase as the audio file."""
+
+    def __init__(self, language: str):
+        self.language = language
+
+    def generate_audio(self, text: str, path: str):
+        Path(path).write_text(text)
+
+
+@pytest.fixture
+def make_bank(tmp_path, monkeypatch) -> Callable[..., FeedbackBank]:
+    """Create feedback banks sharing a workspace, like worker processes."""
+    monkeypatch.setattr(feedback, "get_llm", lambda **kwargs: FakeLLM())
+    monkeypatch.setattr(
+        feedback, "get_tts_model", lambda tts_model_name: FakeTTS
+    )
+
+    def make(**kwargs) -> FeedbackBank:
+        kwargs.setdefault("size", 2)
+        kwargs.setdefault("languages", ["French"])
+        return FeedbackBank(tmp_path, "fake", **kwargs)
+
+    return make
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from bb.service.story_player_app.feedback import is_valid_phrase
+
+
+def read_manifest(bank, outcome: str = "correct") -> dict:
+    with open(bank._get_folder("French", outcome) / "phrases.json") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize(
+    "text, language, expected",
+    [
+        ("Bravo, c'est la bonne réponse !", "French", True),
+        ("Well done, you gave the right answer!", "French", False),
+        ("Voici 5 phrases :", "French", False),
+        ("Bravo !\nSuper !", "French", False),
+        ("Ok", "English", False),
+        ("Well done, you gave the right answer!", "English", True),
+    ],
+)
+def test_is_valid_phrase(text, language, expected):
+    assert is_valid_phrase(text, language) is expected
+
+
+def test_fill(make_bank):
+    bank = make_bank()
+    assert bank.get_feedback(True, "French") is None
+    bank.fill()
+    for outcome in ["correct", "incorrect"]:
+        assert len(read_manifest(bank, outcome)) == 2
+    path = bank.get_feedback(True, "French")
+    assert path.read_text() in read_manifest(bank).values()
+    # A full bank is not filled again
+    bank.fill()
+    assert bank.llm.calls == 2
+
+
+def test_refresh_deletes_replaced_phrases_one_refresh_later(make_bank):
+    bank = make_bank()
+    bank.fill()
+    old_files = set(read_manifest(bank))
+    bank.refresh()
+    manifest = read_manifest(bank)
+    assert len(manifest) == 2 and len(old_files & set(manifest)) == 1
+    (removed,) = old_files - set(manifest)
+    # A player may still be reading the replaced phrase
+    folder = bank._get_folder("French", "correct")
+    assert (folder / removed).exists()
+    bank.refresh()
+    assert not (folder / removed).exists()
+
+
+def test_banks_merge_their_phrases(make_bank):
+    bank_a = make_bank()
+    bank_b = make_bank()
+    bank_a.load()
+    bank_b.load()
+    bank_a._add_phrase("French", "correct", "Bravo, super !")
+    bank_b._add_phrase("French", "correct", "Bonne réponse !")
+    assert sorted(read_manifest(bank_a).values()) == [
+        "Bonne réponse !",
+        "Bravo, super !",
+    ]
+    assert len(bank_b.phrases[("French", "correct")]) == 2
+    # The filling bank counts the phrases of the other bank
+    bank_a.fill()
+    assert len(read_manifest(bank_a)) == 2
+
+
+def test_load_keeps_the_files_of_other_banks(make_bank):
+    bank_a = make_bank()
+    folder = bank_a._get_folder("French", "correct")
+    folder.mkdir(parents=True)
+    # Rendered by another bank which has not written the manifest yet
+    (folder / "rendering.wav").write_text("Bravo !")
+    bank_a.load()
+    assert (folder / "rendering.wav").exists()
+
+
+def test_only_the_rendering_bank_deletes_a_file(make_bank):
+    bank_a = make_bank(size=1)
+    bank_b = make_bank(size=1)
+    bank_a.load()
+    bank_b.load()
+    bank_a._add_phrase("French", "correct", "Bravo, super !")
+    (file_name,) = read_manifest(bank_a)
+    folder = bank_a._get_folder("French", "correct")
+    bank_b.load()
+    bank_b._remove_phrase("French", "correct", file_name)
+    bank_b.refresh()
+    bank_b.refresh()
+    assert file_name not in read_manifest(bank_a)
+    assert (folder / file_name).exists()
+    # Bank A notices the removal when it merges the manifest again, and
+    # deletes its file one refresh later
+    bank_a.refresh()
+    assert (folder / file_name).exists()
+    assert file_name not in bank_a.phrases[("French", "correct")]
+    bank_a.refresh()
+    assert not (folder / file_name).exists()
+
+
+def test_get_feedback_skips_deleted_files(make_bank):
+    bank = make_bank()
+    bank.fill()
+    folder = bank._get_folder("French", "correct")
+    deleted, kept = read_manifest(bank)
+    (folder / deleted).unlink()
+    for _ in range(10):
+        assert bank.get_feedback(True, "French") == folder / kept